@@ -0,0 +1,308 @@
+"""
+本地模拟的 JM 移动端 API 服务器，供基准测试使用，不访问真实网站
+
+按 jmcomic 的 api 客户端协议返回合成的本子、章节和图片：
+    /setting                       版本信息和 cookies
+    /album?id=                     本子详情（AES 加密的 JSON）
+    /chapter?id=                   章节详情
+    /chapter_view_template?id=     scramble_id
+    /media/photos/{章节}/{序号}     章节图片
+    /media/albums/{本子}.jpg        封面
+
+可以注入延迟、随机错误状态码和单连接带宽上限
+"""
+import base64
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# jmcomic 用于加密接口返回值的密钥（JmMagicConstants.APP_DATA_SECRET）
+APP_DATA_SECRET = "185Hcomic3PAPP7R"
+
+# 合成本子的起始ID，大于 421926 时 jmcomic 会按真实规则切割还原图片
+BASE_ALBUM_ID = 500000
+# 相邻两个本子的ID间隔，本子的章节ID为 本子ID+1 ... 本子ID+章节数
+ALBUM_ID_STEP = 1000
+SCRAMBLE_ID = 220980
+
+
+def encrypt_data(data, ts, secret=APP_DATA_SECRET):
+    """
+    按 jmcomic 的解密方式加密接口数据：AES-ECB，密钥为 md5(ts + secret)，PKCS7 填充后 base64 编码
+
+    Args:
+        data (dict): 接口数据
+        ts (str): 请求头 tokenparam 中的时间戳
+
+    Returns:
+        str: 加密后的字符串
+    """
+    from Crypto.Cipher import AES
+
+    key = hashlib.md5(f"{ts}{secret}".encode("utf-8")).hexdigest().encode("utf-8")
+    raw = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    padding = 16 - len(raw) % 16
+    raw += bytes([padding]) * padding
+    return base64.b64encode(AES.new(key, AES.MODE_ECB).encrypt(raw)).decode("ascii")
+
+
+def make_images(count, width, height, quality=80, seed=0):
+    """
+    生成用于返回的 webp 图片：白底上随机的线条、色块和少量噪点，压缩后的大小接近真实漫画页
+
+    Returns:
+        list: 图片数据
+    """
+    from PIL import Image, ImageDraw
+
+    images = []
+    rng = random.Random(seed)
+    for _ in range(count):
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        for _ in range(60):
+            box = sorted(rng.randint(0, width) for _ in range(2)), sorted(rng.randint(0, height) for _ in range(2))
+            shape = (box[0][0], box[1][0], box[0][1], box[1][1])
+            color = tuple(rng.randint(0, 255) for _ in range(3))
+            if rng.random() < 0.3:
+                draw.rectangle(shape, fill=color)
+            else:
+                draw.line(shape, fill=(0, 0, 0), width=rng.randint(1, 6))
+        noise = Image.effect_noise((width, height), 20).convert("RGB")
+        image = Image.blend(image, noise, 0.1)
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=quality)
+        images.append(buffer.getvalue())
+    return images
+
+
+class MockJmServer:
+    def __init__(self, albums=5, photos_per_album=4, images_per_photo=20, image_size=(800, 1200),
+                 latency=0.0, jitter=0.0, image_latency=None, error_rate=0.0, error_status=503,
+                 bytes_per_second=0, host="127.0.0.1", port=0, seed=0):
+        """
+        模拟服务器
+
+        Args:
+            albums (int): 本子数量
+            photos_per_album (int): 每个本子的章节数
+            images_per_photo (int): 每个章节的图片数
+            image_size (tuple): 图片宽高
+            latency (float): 每个请求的基础延迟（秒）
+            jitter (float): 随机增加的延迟上限（秒）
+            image_latency (float, optional): 图片请求的基础延迟，默认与 latency 相同
+            error_rate (float): 返回错误状态码的概率（0~1）
+            error_status (int): 注入的错误状态码，如 503、429
+            bytes_per_second (int): 单个连接的发送速率上限，为0时不限
+            host (str): 监听地址
+            port (int): 监听端口，为0时自动分配
+            seed (int): 随机数种子，相同参数下注入的错误和延迟可以复现
+        """
+        self.albums = albums
+        self.photos_per_album = photos_per_album
+        self.images_per_photo = images_per_photo
+        self.image_size = tuple(image_size)
+        self.latency = latency
+        self.jitter = jitter
+        self.image_latency = latency if image_latency is None else image_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.bytes_per_second = bytes_per_second
+        self.random = random.Random(seed)
+        self.images = make_images(8, *self.image_size, seed=seed)
+        self.cover = self.images[0]
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def address(self):
+        """host:port，用作 jmcomic 的客户端域名和图片域名"""
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def album_ids(self):
+        return [str(BASE_ALBUM_ID + index * ALBUM_ID_STEP) for index in range(self.albums)]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="mock-jm-server")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def record(self, kind, status, size):
+        with self.lock:
+            item = self.stats.setdefault(kind, {"requests": 0, "errors": 0, "bytes": 0})
+            item["requests"] += 1
+            item["bytes"] += size
+            if status >= 400:
+                item["errors"] += 1
+
+    def get_stats(self):
+        with self.lock:
+            return {kind: dict(item) for kind, item in self.stats.items()}
+
+    def decide_delay(self, kind):
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) if self.jitter else 0.0
+        return (self.image_latency if kind in ("image", "cover") else self.latency) + extra
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def find_album(self, album_id):
+        album_id = int(album_id)
+        index, offset = divmod(album_id - BASE_ALBUM_ID, ALBUM_ID_STEP)
+        if offset != 0 or not 0 <= index < self.albums:
+            return None
+        return album_id
+
+    def find_photo(self, photo_id):
+        photo_id = int(photo_id)
+        index, offset = divmod(photo_id - BASE_ALBUM_ID, ALBUM_ID_STEP)
+        if not 0 <= index < self.albums or not 1 <= offset <= self.photos_per_album:
+            return None
+        return BASE_ALBUM_ID + index * ALBUM_ID_STEP
+
+    def series(self, album_id):
+        return [
+            {"id": str(album_id + sort), "name": f"第{sort}话", "sort": str(sort)}
+            for sort in range(1, self.photos_per_album + 1)
+        ]
+
+    def album_data(self, album_id):
+        index = (album_id - BASE_ALBUM_ID) // ALBUM_ID_STEP
+        return {
+            "id": album_id,
+            "name": f"基准测试本子{index + 1}",
+            "author": [f"作者{index % 7}"],
+            "images": [],
+            "description": "基准测试用的合成数据",
+            "total_views": "1000",
+            "likes": "100",
+            "series": self.series(album_id),
+            "series_id": "0",
+            "comment_total": "0",
+            "tags": ["基准测试", f"标签{index % 5}"],
+            "works": [],
+            "actors": [],
+            "related_list": [],
+            "liked": False,
+            "is_favorite": False,
+            "total_photos": str(self.photos_per_album),
+            "addtime": "1700000000",
+        }
+
+    def photo_data(self, photo_id, album_id):
+        return {
+            "id": photo_id,
+            "series": self.series(album_id),
+            "tags": "",
+            "name": f"第{photo_id - album_id}话",
+            "images": [f"{index:05}.webp" for index in range(1, self.images_per_photo + 1)],
+            "series_id": str(album_id),
+            "is_favorite": False,
+            "liked": False,
+        }
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_body(self, kind, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if server.bytes_per_second:
+                    # 按带宽上限分块发送
+                    chunk = max(1024, server.bytes_per_second // 20)
+                    for start in range(0, len(body), chunk):
+                        self.wfile.write(body[start:start + chunk])
+                        time.sleep(len(body[start:start + chunk]) / server.bytes_per_second)
+                else:
+                    self.wfile.write(body)
+                server.record(kind, status, len(body))
+
+            def send_api(self, kind, data):
+                ts = (self.headers.get("tokenparam") or "").split(",")[0]
+                body = json.dumps({"code": 200, "data": encrypt_data(data, ts)}).encode("utf-8")
+                headers = {"Set-Cookie": "AVS=benchmark; path=/"} if kind == "setting" else None
+                self.send_body(kind, 200, body, "application/json", headers)
+
+            def send_not_found(self, kind):
+                body = json.dumps({"code": 404, "errorMsg": "not found"}).encode("utf-8")
+                self.send_body(kind, 404, body, "application/json")
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+                parts = [part for part in url.path.split("/") if part]
+                kind = self.classify(parts)
+
+                time.sleep(server.decide_delay(kind))
+                if kind != "other" and server.should_fail():
+                    headers = {"Retry-After": "1"} if server.error_status == 429 else None
+                    self.send_body(kind, server.error_status, b"error", "text/plain", headers)
+                    return
+
+                jm_id = (query.get("id") or ["0"])[0]
+                if kind == "setting":
+                    self.send_api(kind, {"jm3_version": "1.0.0"})
+                elif kind == "album":
+                    album_id = server.find_album(jm_id)
+                    if album_id is None:
+                        self.send_not_found(kind)
+                    else:
+                        self.send_api(kind, server.album_data(album_id))
+                elif kind == "chapter":
+                    album_id = server.find_photo(jm_id)
+                    if album_id is None:
+                        self.send_not_found(kind)
+                    else:
+                        self.send_api(kind, server.photo_data(int(jm_id), album_id))
+                elif kind == "scramble":
+                    body = f"<script>var scramble_id = {SCRAMBLE_ID};</script>".encode("utf-8")
+                    self.send_body(kind, 200, body, "text/html")
+                elif kind == "image":
+                    index = int(parts[-1].split(".")[0] or 0)
+                    self.send_body(kind, 200, server.images[index % len(server.images)], "image/webp")
+                elif kind == "cover":
+                    self.send_body(kind, 200, server.cover, "image/webp")
+                else:
+                    self.send_body(kind, 200, b"ok", "text/plain")
+
+            @staticmethod
+            def classify(parts):
+                if parts[:2] == ["media", "photos"] and len(parts) == 4:
+                    return "image"
+                if parts[:2] == ["media", "albums"]:
+                    return "cover"
+                if len(parts) == 1 and parts[0] in ("setting", "album", "chapter"):
+                    return parts[0]
+                if parts == ["chapter_view_template"]:
+                    return "scramble"
+                return "other"
+
+        return Handler
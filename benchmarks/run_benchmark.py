@@ -0,0 +1,563 @@
+"""
+离线基准测试：启动本地模拟服务器，让 JMComicManager 的解析、下载、PDF/长图 生成走完整流程，不访问真实网站
+
+用法:
+    python benchmarks/run_benchmark.py
+    python benchmarks/run_benchmark.py --albums 10 --photos 5 --images 30 --latency 0.05 --error-rate 0.02
+    python benchmarks/run_benchmark.py --output new.json --compare old.json
+
+结果（本子/分钟、图片/秒、p50/p99 延迟、峰值内存、CPU）输出到控制台并保存为 JSON，
+默认在 benchmarks/results 中，用 --compare 与之前版本的结果对比
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+from mock_server import MockJmServer  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块
+    resource = None
+
+
+def percentile(values, percent):
+    """线性插值的百分位数，没有数据时返回None"""
+    if not values:
+        return None
+    values = sorted(values)
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize_latency(values):
+    """延迟统计（秒）"""
+    if not values:
+        return {"count": 0, "p50": None, "p99": None, "mean": None, "max": None}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 4),
+        "p99": round(percentile(values, 99), 4),
+        "mean": round(sum(values) / len(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+def current_rss():
+    """当前进程（及子进程）的常驻内存字节数，无法获取时返回None"""
+    if psutil is not None:
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def children_peak_rss():
+    """已结束的子进程中最大的峰值内存字节数（PDF/长图 在子进程中生成）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ResourceSampler:
+    def __init__(self, interval=0.05):
+        """
+        后台定时采样内存，记录每个阶段的峰值
+
+        Args:
+            interval (float): 采样间隔（秒）
+        """
+        self.interval = interval
+        self.peak = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.loop, daemon=True, name="bench-sampler")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def sample(self):
+        rss = current_rss()
+        if rss is not None:
+            with self.lock:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+
+    def loop(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def reset(self):
+        """开始新的阶段，返回上一阶段的峰值"""
+        self.sample()
+        with self.lock:
+            peak, self.peak = self.peak, None
+        return peak
+
+
+class PhaseMeter:
+    def __init__(self, sampler):
+        """记录一个阶段的耗时、CPU 时间和峰值内存"""
+        self.sampler = sampler
+        self.wall = None
+        self.cpu = None
+        self.children_cpu = None
+        self.peak_rss = None
+
+    def __enter__(self):
+        self.sampler.reset()
+        self.started = time.perf_counter()
+        self.times = os.times()
+        return self
+
+    def __exit__(self, *exc):
+        times = os.times()
+        self.wall = time.perf_counter() - self.started
+        self.cpu = (times.user - self.times.user) + (times.system - self.times.system)
+        # 子进程的 CPU 时间在子进程结束后才计入（Windows 上始终为0）
+        self.children_cpu = (times.children_user - self.times.children_user) + \
+                            (times.children_system - self.times.children_system)
+        self.peak_rss = self.sampler.reset()
+        return False
+
+    def to_dict(self, albums, images=None, latencies=None):
+        result = {
+            "wall_seconds": round(self.wall, 4),
+            "albums": albums,
+            "albums_per_minute": round(albums / self.wall * 60, 2) if self.wall else None,
+            "latency": summarize_latency(latencies or []),
+            "cpu_seconds": round(self.cpu, 3),
+            "children_cpu_seconds": round(self.children_cpu, 3),
+            "cpu_percent": round((self.cpu + self.children_cpu) / self.wall * 100, 1) if self.wall else None,
+            "peak_rss_bytes": self.peak_rss,
+        }
+        if images is not None:
+            result["images"] = images
+            result["images_per_second"] = round(images / self.wall, 2) if self.wall else None
+        return result
+
+
+def classify_url(url):
+    """按路径区分请求类型，与模拟服务器的统计一致"""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if parts[:2] == ["media", "photos"]:
+        return "image"
+    if parts[:2] == ["media", "albums"]:
+        return "cover"
+    if parts in (["setting"], ["album"], ["chapter"]):
+        return parts[0]
+    if parts == ["chapter_view_template"]:
+        return "scramble"
+    return "other"
+
+
+class RequestTimer:
+    def __init__(self):
+        """按请求类型记录客户端看到的请求耗时（包含连接池、限速器的等待）"""
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind, seconds, error=False):
+        with self.lock:
+            if error:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+            else:
+                self.latencies.setdefault(kind, []).append(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.latencies = {}
+            self.errors = {}
+
+    def summary(self):
+        with self.lock:
+            kinds = set(self.latencies) | set(self.errors)
+            return {
+                kind: dict(summarize_latency(self.latencies.get(kind, [])), errors=self.errors.get(kind, 0))
+                for kind in sorted(kinds)
+            }
+
+
+class TimedPostman:
+    def __init__(self, postman, timer):
+        """包装 jmcomic 客户端的 Postman，记录每个请求的耗时"""
+        self.postman = postman
+        self.timer = timer
+
+    def __getattr__(self, name):
+        if name == "postman":
+            raise AttributeError(name)
+        return getattr(self.postman, name)
+
+    def request(self, method, url, **kwargs):
+        kind = classify_url(url)
+        started = time.perf_counter()
+        try:
+            resp = getattr(self.postman, method)(url, **kwargs)
+        except Exception:
+            self.timer.record(kind, time.perf_counter() - started, error=True)
+            raise
+        self.timer.record(kind, time.perf_counter() - started, error=resp.status_code >= 400)
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def copy(self):
+        return self.__class__(self.postman.copy(), self.timer)
+
+
+def configure_jmcomic(address):
+    """让 jmcomic 通过 http 访问模拟服务器，并关闭启动时联网更新域名"""
+    from jmcomic import JmModuleConfig
+
+    JmModuleConfig.PROT = "http://"
+    JmModuleConfig.DOMAIN_IMAGE_LIST = [address]
+    JmModuleConfig.DOMAIN_API_LIST = [address]
+    JmModuleConfig.FLAG_API_CLIENT_AUTO_UPDATE_DOMAIN = False
+
+
+def write_option(work_dir, address, post_process):
+    """在临时目录中写入 option.yml：使用默认插件配置，客户端指向模拟服务器"""
+    from option import OptionManager
+
+    option_manager = OptionManager(os.path.join(work_dir, "option.yml"))
+    option = option_manager.option
+    option["client"] = {"impl": "api", "domain": [address], "retry_times": 3}
+    option["log"] = False
+    if not post_process:
+        option["plugins"]["after_album"] = []
+    option_manager.save_option(option)
+    return option_manager.option_path
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    """
+    执行一次基准测试
+
+    Returns:
+        dict: 测试结果
+    """
+    server = MockJmServer(
+        albums=args.albums,
+        photos_per_album=args.photos,
+        images_per_photo=args.images,
+        image_size=args.image_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        image_latency=args.image_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        bytes_per_second=args.bandwidth,
+        seed=args.seed,
+    ).start()
+    work_dir = tempfile.mkdtemp(prefix="jmcrawler-bench-")
+    old_cwd = os.getcwd()
+    # 下载目录、队列、缓存等都按当前目录创建，放在临时目录中
+    os.chdir(work_dir)
+    sampler = ResourceSampler().start()
+    try:
+        configure_jmcomic(server.address)
+        from jm_manager import JMComicManager
+        from download_queue import STATUS_DONE
+
+        option_path = write_option(work_dir, server.address, not args.no_post_process)
+        manager = JMComicManager(
+            args.concurrency,
+            option_path=option_path,
+            domain_probe_interval=24 * 3600,
+            pool_options=args.pool_options,
+            post_process_options={"max_workers": args.post_workers, "max_pending": args.albums},
+        )
+        with PhaseMeter(sampler) as init_meter:
+            asyncio.run(manager.initialize())
+        if not manager.initialized:
+            raise Exception("JMComicManager 初始化失败")
+        timer = RequestTimer()
+        manager.client.postman = TimedPostman(manager.client.postman, timer)
+        album_ids = server.album_ids()
+        results = {"init_seconds": round(init_meter.wall, 4), "phases": {}, "requests": {}}
+
+        # 解析：逐个请求本子详情（相当于界面上的"解析"；旧版本没有 parse_album）
+        parse_album = getattr(manager, "parse_album", manager.get_album_detail)
+        parse_latencies = []
+        with PhaseMeter(sampler) as meter:
+            for album_id in album_ids:
+                started = time.perf_counter()
+                parse_album(album_id, refresh=True)
+                parse_latencies.append(time.perf_counter() - started)
+        results["phases"]["parse"] = meter.to_dict(len(album_ids), latencies=parse_latencies)
+        results["requests"]["parse"] = timer.summary()
+        timer.reset()
+
+        # 下载：全部加入下载队列，按设置的并发数下载
+        started_at, finished_at, processed_at = {}, {}, {}
+        all_finished = threading.Event()
+        all_processed = threading.Event()
+
+        def on_event(event, job):
+            now = time.perf_counter()
+            if event == "started":
+                started_at[job.album_id] = now
+            elif event == "finished":
+                finished_at[job.album_id] = now
+                if len(finished_at) == len(album_ids):
+                    all_finished.set()
+            elif event == "processed":
+                processed_at[job.album_id] = now
+                if len(processed_at) == len(album_ids):
+                    all_processed.set()
+
+        # 下载期间每隔 --probe-interval 秒解析一次，测量界面解析在满负载下的延迟
+        interactive_latencies = []
+
+        def probe_interactive():
+            index = 0
+            while not all_finished.wait(args.probe_interval):
+                started = time.perf_counter()
+                try:
+                    parse_album(album_ids[index % len(album_ids)], refresh=True)
+                except Exception as e:
+                    print(f"下载期间解析失败: {str(e)}")
+                    continue
+                interactive_latencies.append(time.perf_counter() - started)
+                index += 1
+
+        manager.queue.add_listener(on_event)
+        with PhaseMeter(sampler) as meter:
+            jobs = manager.enqueue_download(album_ids)
+            if args.probe_interval > 0:
+                prober = threading.Thread(target=probe_interactive, daemon=True, name="bench-probe")
+                prober.start()
+            all_finished.wait()
+        failed = [job for job in jobs if job.status != STATUS_DONE]
+        images = server.get_stats().get("image", {}).get("requests", 0) - \
+            server.get_stats().get("image", {}).get("errors", 0)
+        results["phases"]["download"] = meter.to_dict(
+            len(jobs) - len(failed),
+            images=images,
+            latencies=[finished_at[key] - started_at[key] for key in finished_at if key in started_at],
+        )
+        results["phases"]["download"]["interactive"] = summarize_latency(interactive_latencies)
+        results["phases"]["download"]["failed"] = [{"album_id": job.album_id, "error": job.error} for job in failed]
+        results["requests"]["download"] = timer.summary()
+
+        # PDF/长图：在后处理进程中执行，与下载重叠；这里等待剩余的转换完成并关闭进程
+        if not args.no_post_process:
+            download_done = time.perf_counter()
+            with PhaseMeter(sampler) as meter:
+                all_processed.wait(timeout=max(0.0, 600 - (time.perf_counter() - download_done)))
+                manager.wait_post_processing()
+                manager.post_processor.shutdown()
+            results["phases"]["post_process"] = meter.to_dict(
+                len(processed_at),
+                latencies=[processed_at[key] - finished_at[key] for key in processed_at if key in finished_at],
+            )
+            results["phases"]["post_process"]["children_peak_rss_bytes"] = children_peak_rss()
+
+        manager.domain_health.stop()
+        results["server"] = server.get_stats()
+        return results
+    finally:
+        sampler.stop()
+        server.stop()
+        os.chdir(old_cwd)
+        if args.keep:
+            print(f"临时目录保留在 {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# 对比时展示的指标：(阶段, 指标路径, 数值越大越好)
+COMPARE_METRICS = [
+    ("parse", "albums_per_minute", True),
+    ("parse", "latency.p50", False),
+    ("parse", "latency.p99", False),
+    ("download", "albums_per_minute", True),
+    ("download", "images_per_second", True),
+    ("download", "latency.p50", False),
+    ("download", "latency.p99", False),
+    ("download", "interactive.p50", False),
+    ("download", "interactive.p99", False),
+    ("download", "cpu_seconds", False),
+    ("download", "peak_rss_bytes", False),
+    ("post_process", "wall_seconds", False),
+    ("post_process", "children_cpu_seconds", False),
+    ("post_process", "children_peak_rss_bytes", False),
+]
+
+
+def get_metric(result, phase, path):
+    value = result.get("phases", {}).get(phase)
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(result, baseline):
+    """
+    与之前的结果对比
+
+    Returns:
+        list: 每项指标的 (名称, 旧值, 新值, 变化百分比, 是否变好)
+    """
+    rows = []
+    for phase, path, higher_is_better in COMPARE_METRICS:
+        old, new = get_metric(baseline, phase, path), get_metric(result, phase, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else None
+        improved = None if change is None else (change > 0) == higher_is_better
+        rows.append((f"{phase}.{path}", old, new, change, improved))
+    return rows
+
+
+def print_result(result):
+    print(f"初始化 {result['init_seconds']:.3f} 秒")
+    for phase, item in result["phases"].items():
+        line = f"{phase}: {item['wall_seconds']:.3f} 秒, {item['albums_per_minute']} 本/分钟"
+        if "images_per_second" in item:
+            line += f", {item['images_per_second']} 图/秒"
+        latency = item["latency"]
+        if latency["count"]:
+            line += f", p50 {latency['p50']:.3f} 秒, p99 {latency['p99']:.3f} 秒"
+        line += f", CPU {item['cpu_seconds'] + item['children_cpu_seconds']:.2f} 秒 ({item['cpu_percent']}%)"
+        if item["peak_rss_bytes"]:
+            line += f", 峰值内存 {item['peak_rss_bytes'] / 1024 / 1024:.1f} MB"
+        print(line)
+        interactive = item.get("interactive")
+        if interactive and interactive["count"]:
+            print(f"  下载期间解析 {interactive['count']} 次, p50 {interactive['p50']}, p99 {interactive['p99']}")
+        for failed in item.get("failed", []):
+            print(f"  失败 {failed['album_id']}: {failed['error']}")
+    for phase, kinds in result["requests"].items():
+        for kind, item in kinds.items():
+            if item["count"] or item["errors"]:
+                print(f"  {phase} 请求 {kind}: {item['count']} 次, p50 {item['p50']}, p99 {item['p99']}, 出错 {item['errors']}")
+
+
+def parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="JMCrawler 离线基准测试")
+    parser.add_argument("--albums", type=int, default=5, help="本子数量")
+    parser.add_argument("--photos", type=int, default=4, help="每个本子的章节数")
+    parser.add_argument("--images", type=int, default=20, help="每个章节的图片数")
+    parser.add_argument("--image-size", type=parse_size, default=(800, 1200), help="图片尺寸，如 800x1200")
+    parser.add_argument("--latency", type=float, default=0.02, help="服务器每个请求的延迟（秒）")
+    parser.add_argument("--image-latency", type=float, help="图片请求的延迟（秒），默认与 --latency 相同")
+    parser.add_argument("--jitter", type=float, default=0.01, help="随机增加的延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="请求返回错误状态码的概率")
+    parser.add_argument("--error-status", type=int, default=503, help="注入的错误状态码")
+    parser.add_argument("--bandwidth", type=int, default=0, help="单个连接的速率上限（字节/秒），0 为不限")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("-j", "--concurrency", type=int, default=2, help="同时下载的本子数")
+    parser.add_argument("--post-workers", type=int, default=1, help="PDF/长图 转换进程数")
+    parser.add_argument("--no-post-process", action="store_true", help="不生成 PDF/长图")
+    parser.add_argument("--probe-interval", type=float, default=0.5,
+                        help="下载期间每隔多少秒解析一次本子，测量满负载下的解析延迟，0 为不测")
+    parser.add_argument("--pool", type=json.loads, default={}, dest="pool_options",
+                        help='连接池参数（JSON），如 {"max_connections": 16}')
+    parser.add_argument("--label", help="结果的备注，如版本名")
+    parser.add_argument("-o", "--output", help="结果文件路径，默认为 benchmarks/results/时间.json")
+    parser.add_argument("--compare", help="与之前的结果文件对比")
+    parser.add_argument("--keep", action="store_true", help="保留临时下载目录")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    result = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare", "keep", "label")
+        },
+    }
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        result["jmcomic"] = version("jmcomic")
+    except PackageNotFoundError:
+        result["jmcomic"] = None
+    result.update(run(args))
+    print_result(result)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"与 {args.compare}（{baseline.get('label') or baseline.get('revision')}）对比:")
+        for name, old, new, change, improved in compare(result, baseline):
+            mark = "" if improved is None else ("↑" if improved else "↓")
+            change_text = "" if change is None else f"{change:+.1f}%"
+            print(f"  {name}: {old} -> {new} {change_text} {mark}")
+    failed = result["phases"]["download"]["failed"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # PDF/长图 转换在子进程中执行
+    multiprocessing.freeze_support()
+    sys.exit(main())
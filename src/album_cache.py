@@ -0,0 +1,134 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class AlbumCache:
+    def __init__(self, db_path=None, ttl=86400, max_entries=5000, memory_entries=128):
+        """
+        本子详情缓存：内存LRU + SQLite持久化，按条目过期
+
+        Args:
+            db_path (str, optional): 数据库路径，默认为 download/cache/album_detail.db
+            ttl (int): 条目有效期（秒）
+            max_entries (int): 磁盘缓存最大条目数，超出后淘汰最久未访问的条目
+            memory_entries (int): 内存LRU最大条目数
+        """
+        if db_path is None:
+            self.db_path = os.path.join(os.getcwd(), "download", "cache", "album_detail.db")
+        else:
+            self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS album_cache ("
+            "album_id TEXT PRIMARY KEY, data BLOB NOT NULL, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_album_cache_accessed ON album_cache(accessed_at)")
+        self.conn.commit()
+
+    def get(self, album_id):
+        """
+        读取缓存
+
+        Args:
+            album_id (str): 本子ID
+
+        Returns:
+            缓存的本子详情，不存在或已过期时返回None
+        """
+        album_id = str(album_id)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(album_id)
+            if entry is not None:
+                album, fetched_at = entry
+                if now - fetched_at < self.ttl:
+                    self.memory.move_to_end(album_id)
+                    self.hits += 1
+                    return album
+                del self.memory[album_id]
+
+            row = self.conn.execute(
+                "SELECT data, fetched_at FROM album_cache WHERE album_id = ?", (album_id,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.misses += 1
+                return None
+
+            try:
+                album = pickle.loads(row[0])
+            except Exception:
+                # 旧版本jmcomic写入的数据可能无法反序列化
+                self.conn.execute("DELETE FROM album_cache WHERE album_id = ?", (album_id,))
+                self.conn.commit()
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE album_cache SET accessed_at = ? WHERE album_id = ?", (now, album_id))
+            self.conn.commit()
+            self.remember(album_id, album, row[1])
+            self.hits += 1
+            return album
+
+    def put(self, album_id, album):
+        """
+        写入缓存
+
+        Args:
+            album_id (str): 本子ID
+            album: 本子详情
+        """
+        album_id = str(album_id)
+        now = time.time()
+        data = pickle.dumps(album, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.remember(album_id, album, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO album_cache (album_id, data, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (album_id, data, now, now),
+            )
+            self.evict()
+            self.conn.commit()
+
+    def invalidate(self, album_id):
+        """删除指定本子的缓存"""
+        album_id = str(album_id)
+        with self.lock:
+            self.memory.pop(album_id, None)
+            self.conn.execute("DELETE FROM album_cache WHERE album_id = ?", (album_id,))
+            self.conn.commit()
+
+    def remember(self, album_id, album, fetched_at):
+        # 需持有 self.lock
+        self.memory[album_id] = (album, fetched_at)
+        self.memory.move_to_end(album_id)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        # 需持有 self.lock：删除过期条目，再按最久未访问淘汰超出上限的条目
+        self.conn.execute("DELETE FROM album_cache WHERE fetched_at <= ?", (time.time() - self.ttl,))
+        count = self.conn.execute("SELECT COUNT(*) FROM album_cache").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM album_cache WHERE album_id IN "
+                "(SELECT album_id FROM album_cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,373 @@
+"""
+流式生成长图和PDF，内存占用只与单张图片大小有关，与本子页数无关
+
+替换 jmcomic 自带的 long_img、img2pdf 插件（插件名和参数不变）：
+    long_img: 逐张读取图片并按行写入PNG，超过 max_height 像素时分段输出为 {文件名}_1.png、{文件名}_2.png ...
+    img2pdf: 逐页写入PDF，JPEG图片原样嵌入不重新编码
+"""
+import os
+import struct
+import zlib
+
+from common import files_of_dir
+from jmcomic import JmModuleConfig
+from jmcomic.jm_plugin import Img2pdfPlugin, LongImgPlugin
+
+
+# 单个长图文件的默认最大高度（像素），为0时不分段
+DEFAULT_MAX_HEIGHT = 30000
+
+# PDF页面尺寸按 96 DPI 换算为点（1/72英寸）
+PDF_POINTS_PER_PIXEL = 72 / 96
+
+
+def collect_album_images(option, album, photo):
+    """
+    按下载目录规则收集本子（或章节）的全部图片路径
+
+    Returns:
+        list: 图片路径，按章节、文件名排序
+    """
+    photos = [photo] if album is None else list(album)
+    img_paths = []
+    for item in photos:
+        img_dir = option.decide_image_save_dir(item)
+        if not os.path.isdir(img_dir):
+            continue
+        img_paths += [path for path in files_of_dir(img_dir) if not os.path.basename(path).startswith(".")]
+    return img_paths
+
+
+def plan_segments(heights, max_height):
+    """
+    将连续的图片按高度分段，每段总高度不超过 max_height（单张超高的图片单独成段）
+
+    Args:
+        heights (list): 各图片高度
+        max_height (int): 每段最大高度，为0时不分段
+
+    Returns:
+        list: 每段的 (起始下标, 结束下标, 总高度)
+    """
+    segments = []
+    start = 0
+    total = 0
+    for index, height in enumerate(heights):
+        if max_height and total and total + height > max_height:
+            segments.append((start, index, total))
+            start, total = index, 0
+        total += height
+    if start < len(heights):
+        segments.append((start, len(heights), total))
+    return segments
+
+
+class PngStreamWriter:
+    def __init__(self, path, width, height):
+        """
+        逐行写入的RGB PNG文件，宽高需预先确定
+
+        Args:
+            path (str): 输出路径
+            width (int): 宽度
+            height (int): 总高度
+        """
+        self.file = open(path, "wb")
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self.compressor = zlib.compressobj(6)
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, tag, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(tag)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    def write_image(self, image):
+        """追加一张与输出同宽的RGB图片"""
+        stride = self.width * 3
+        data = image.tobytes()
+        # 每行前加滤波类型字节 0（不滤波）
+        raw = b"".join(b"\x00" + data[offset:offset + stride] for offset in range(0, len(data), stride))
+        self.rows += image.height
+        compressed = self.compressor.compress(raw)
+        if compressed:
+            self.write_chunk(b"IDAT", compressed)
+
+    def close(self):
+        try:
+            self.write_chunk(b"IDAT", self.compressor.flush())
+            self.write_chunk(b"IEND", b"")
+        finally:
+            self.file.close()
+        if self.rows != self.height:
+            raise Exception(f"长图高度不一致: 预计 {self.height}，实际 {self.rows}")
+
+
+def write_long_image(img_paths, output_path, max_height=DEFAULT_MAX_HEIGHT):
+    """
+    将图片纵向拼接为长图，宽度统一缩放到最窄图片的宽度
+
+    先只读取图片头获取尺寸，再逐张解码写入，同一时间只有一张图片在内存中
+
+    Args:
+        img_paths (list): 图片路径
+        output_path (str): 输出路径；分段时在文件名后加 _1、_2 ...
+        max_height (int): 每个文件的最大高度（像素），为0时不分段
+
+    Returns:
+        list: 生成的文件路径
+    """
+    from PIL import Image
+
+    try:
+        resample = Image.Resampling.LANCZOS
+    except AttributeError:
+        resample = Image.LANCZOS
+
+    sizes = []
+    for path in img_paths:
+        try:
+            with Image.open(path) as img:
+                sizes.append((path, img.width, img.height))
+        except IOError as e:
+            print(f"读取图片失败 {path}: {str(e)}")
+    if not sizes:
+        return []
+
+    width = min(w for _, w, _ in sizes)
+    heights = [h if w == width else max(1, int(h * width / w)) for _, w, h in sizes]
+    segments = plan_segments(heights, max_height)
+
+    stem, suffix = os.path.splitext(output_path)
+    output_paths = []
+    for number, (start, end, total) in enumerate(segments, 1):
+        path = output_path if len(segments) == 1 else f"{stem}_{number}{suffix}"
+        writer = PngStreamWriter(path, width, total)
+        try:
+            for (img_path, w, _), height in zip(sizes[start:end], heights[start:end]):
+                with Image.open(img_path) as img:
+                    img = img.convert("RGB")
+                    if w != width:
+                        img = img.resize((width, height), resample=resample)
+                    writer.write_image(img)
+        finally:
+            writer.close()
+        output_paths.append(path)
+    return output_paths
+
+
+class PdfStreamWriter:
+    def __init__(self, path):
+        """
+        逐页写入的PDF文件：每页一张图片，写完即释放，最后写入页面树和交叉引用表
+
+        Args:
+            path (str): 输出路径
+        """
+        self.file = open(path, "wb")
+        self.offsets = {}
+        # 1 号对象为目录，2 号对象为页面树，在 close 时写入
+        self.next_id = 3
+        self.page_ids = []
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def write_object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode("latin-1"))
+        self.file.write(body.encode("latin-1"))
+        if stream is not None:
+            self.file.write(b"\nstream\n")
+            self.file.write(stream)
+            self.file.write(b"\nendstream")
+        self.file.write(b"\nendobj\n")
+
+    def add_image(self, path):
+        """追加一页，JPEG原样嵌入，其他格式无损压缩后嵌入"""
+        from PIL import Image
+
+        with Image.open(path) as img:
+            width, height = img.size
+            if img.format == "JPEG" and img.mode in ("RGB", "L"):
+                color_space = "/DeviceRGB" if img.mode == "RGB" else "/DeviceGray"
+                image_filter = "/DCTDecode"
+                with open(path, "rb") as f:
+                    data = f.read()
+            else:
+                img = img.convert("L" if img.mode in ("1", "L") else "RGB")
+                color_space = "/DeviceRGB" if img.mode == "RGB" else "/DeviceGray"
+                image_filter = "/FlateDecode"
+                data = zlib.compress(img.tobytes(), 6)
+
+        image_id, content_id, page_id = self.next_id, self.next_id + 1, self.next_id + 2
+        self.next_id += 3
+
+        self.write_object(
+            image_id,
+            f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {color_space} /BitsPerComponent 8 /Filter {image_filter} /Length {len(data)} >>",
+            data,
+        )
+        page_width = width * PDF_POINTS_PER_PIXEL
+        page_height = height * PDF_POINTS_PER_PIXEL
+        content = f"q {page_width:.2f} 0 0 {page_height:.2f} 0 0 cm /Im0 Do Q".encode("latin-1")
+        self.write_object(content_id, f"<< /Length {len(content)} >>", content)
+        self.write_object(
+            page_id,
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.2f} {page_height:.2f}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>",
+        )
+        self.page_ids.append(page_id)
+
+    def close(self):
+        try:
+            kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+            self.write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>")
+            self.write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+
+            xref_offset = self.file.tell()
+            self.file.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode("latin-1"))
+            for obj_id in range(1, self.next_id):
+                self.file.write(f"{self.offsets[obj_id]:010d} 00000 n \n".encode("latin-1"))
+            self.file.write(
+                f"trailer\n<< /Size {self.next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+            )
+        finally:
+            self.file.close()
+
+
+def write_pdf(img_paths, output_path):
+    """
+    将图片逐页写入PDF
+
+    Args:
+        img_paths (list): 图片路径
+        output_path (str): 输出路径
+
+    Returns:
+        list: 成功写入的图片路径
+    """
+    written = []
+    writer = PdfStreamWriter(output_path)
+    try:
+        for path in img_paths:
+            try:
+                writer.add_image(path)
+                written.append(path)
+            except IOError as e:
+                print(f"读取图片失败 {path}: {str(e)}")
+    finally:
+        writer.close()
+    return written
+
+
+class StreamingLongImgPlugin(LongImgPlugin):
+    """流式生成长图，额外参数 max_height 为单个文件的最大高度（像素）"""
+
+    def invoke(self,
+               photo=None,
+               album=None,
+               downloader=None,
+               img_dir=None,
+               filename_rule='Pid',
+               delete_original_file=False,
+               dir_rule=None,
+               max_height=DEFAULT_MAX_HEIGHT,
+               **kwargs,
+               ):
+        if photo is None and album is None:
+            self.log('long_img必须运行在after_photo或after_album时', 'error')
+            return
+
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            self.warning_lib_not_install('PIL')
+            return
+
+        self.delete_original_file = delete_original_file
+        self.max_height = int(max_height or 0)
+        long_img_path = self.decide_filepath(album, photo, filename_rule, 'png', img_dir, dir_rule)
+
+        img_paths, output_paths = self.write_img_2_long_img(long_img_path, album, photo)
+        if not output_paths:
+            return
+
+        # 分段时实际生成的是 _1、_2 ... 文件，记录和输出这些路径
+        detail = album or photo
+        if downloader is not None and hasattr(downloader, "record_export_filepath"):
+            for path in output_paths:
+                downloader.record_export_filepath(detail, path)
+        if len(output_paths) > 1:
+            self.log(f'长图超过 {self.max_height} 像素，已分为 {len(output_paths)} 段')
+        self.log(f'{detail.alias_cn()}合并长图成功！[{detail}] → [{", ".join(output_paths)}]', 'finish')
+        self.execute_deletion(img_paths)
+
+    def write_img_2_long_img(self, long_img_path, album, photo):
+        """
+        Returns:
+            tuple: (参与拼接的图片路径, 生成的长图路径)，没有图片时均为空列表
+        """
+        img_paths = collect_album_images(self.option, album, photo)
+        if not img_paths:
+            self.log(f'所有文件夹都不存在图片，无法生成long_img：{long_img_path}', 'error')
+            return [], []
+        return img_paths, write_long_image(img_paths, long_img_path, self.max_height)
+
+
+class StreamingImg2pdfPlugin(Img2pdfPlugin):
+    """流式生成PDF，不依赖 img2pdf 库；加密仍需要 pikepdf"""
+    plugin_dependencies = ()
+
+    @classmethod
+    def required_dependencies_for(cls, kwargs: dict) -> tuple:
+        return ('pikepdf',) if kwargs.get('encrypt') else ()
+
+    def invoke(self,
+               photo=None,
+               album=None,
+               downloader=None,
+               pdf_dir=None,
+               filename_rule='Pid',
+               dir_rule=None,
+               delete_original_file=False,
+               encrypt=None,
+               **kwargs,
+               ):
+        if photo is None and album is None:
+            self.log('img2pdf必须运行在after_photo或after_album时', 'error')
+            return
+
+        self.delete_original_file = delete_original_file
+        pdf_filepath = self.decide_filepath(album, photo, filename_rule, 'pdf', pdf_dir, dir_rule)
+
+        img_paths = self.write_img_2_pdf(pdf_filepath, album, photo, encrypt)
+        if not img_paths:
+            return
+
+        detail = album or photo
+        if downloader is not None and hasattr(downloader, "record_export_filepath"):
+            downloader.record_export_filepath(detail, pdf_filepath)
+        self.log(f'合并PDF成功！[{detail}] → [{pdf_filepath}]', 'finish')
+        # 与原插件一致，删除原图时连同章节目录一起删除
+        self.execute_deletion(img_paths + sorted({os.path.dirname(path) for path in img_paths}))
+
+    def write_img_2_pdf(self, pdf_filepath, album, photo, encrypt):
+        img_paths = collect_album_images(self.option, album, photo)
+        if not img_paths:
+            self.log(f'所有文件夹都不存在图片，无法生成pdf：{pdf_filepath}', 'error')
+            return None
+
+        written = write_pdf(img_paths, pdf_filepath)
+        if encrypt:
+            self.encrypt_pdf(pdf_filepath, encrypt)
+        return written
+
+
+def register_streaming_plugins():
+    """用流式实现替换 jmcomic 自带的 long_img、img2pdf 插件"""
+    JmModuleConfig.register_plugin(StreamingLongImgPlugin)
+    JmModuleConfig.register_plugin(StreamingImg2pdfPlugin)
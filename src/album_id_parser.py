@@ -0,0 +1,79 @@
+import csv
+import io
+import os
+import re
+from typing import List, Optional
+
+
+# 一次扫描即可匹配所有支持的格式:
+#   1. 链接中的 /album/{id}
+#   2. 链接末尾的 /{id} 或 /{id}.html
+#   3. 以空白、逗号、分号分隔的纯数字或 JM{id}
+ALBUM_ID_PATTERN = re.compile(
+    r'/album/(\d+)'
+    r'|/(\d+)(?:\.html)?(?=[?#\s,;，；]|$)'
+    r'|(?<![^\s,;，；、])(?:jm)?(\d+)(?![^\s,;，；、])',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _match_id(match) -> str:
+    return match.group(1) or match.group(2) or match.group(3)
+
+
+def parse_album_id(input_str: str) -> Optional[str]:
+    """
+    解析单个输入的ID或URL
+
+    Args:
+        input_str (str): 本子ID、JM号或URL
+
+    Returns:
+        str: 本子ID，无法解析时返回None
+    """
+    input_str = input_str.strip()
+    # 如果是纯数字，直接返回
+    if input_str.isdigit():
+        return input_str
+
+    match = ALBUM_ID_PATTERN.search(input_str)
+    if match:
+        return _match_id(match)
+    return None
+
+
+def extract_album_ids(text: str, unique: bool = True) -> List[str]:
+    """
+    从任意文本中提取所有本子ID，按出现顺序去重
+
+    Args:
+        text (str): 粘贴的文本，每行或以逗号分隔的ID/URL
+        unique (bool): 为False时保留重复项，供批量导入统计重复数量
+
+    Returns:
+        list: 本子ID列表
+    """
+    album_ids = [_match_id(m) for m in ALBUM_ID_PATTERN.finditer(text)]
+    return list(dict.fromkeys(album_ids)) if unique else album_ids
+
+
+def read_album_id_text(file_path: str) -> str:
+    """
+    读取 .txt 或 .csv 文件内容，CSV 的每个单元格单独成行，避免跨列误匹配
+
+    Args:
+        file_path (str): 文件路径
+
+    Returns:
+        str: 可供 extract_album_ids 解析的文本
+    """
+    with open(file_path, "r", encoding="utf-8-sig", errors="ignore") as f:
+        content = f.read()
+
+    if os.path.splitext(file_path)[1].lower() != ".csv":
+        return content
+
+    cells = []
+    for row in csv.reader(io.StringIO(content)):
+        cells.extend(cell.strip() for cell in row)
+    return "\n".join(cells)
@@ -0,0 +1,284 @@
+import asyncio
+import json
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from album_id_parser import extract_album_ids
+from download_queue import MODE_DOWNLOAD, MODE_SYNC
+
+
+# 请求体的大小上限（字节），超出时返回 413
+MAX_BODY_SIZE = 1024 * 1024
+# 每个事件流订阅者最多积压的事件数，客户端读取过慢时断开，由客户端重新连接
+MAX_PENDING_EVENTS = 1000
+
+
+class ApiServer:
+    def __init__(self, manager, host="127.0.0.1", port=8765, token=None, metrics=True):
+        """
+        基于 asyncio 的本地 HTTP/JSON 控制接口
+
+        路由:
+            GET    /jobs             任务列表
+            POST   /jobs             提交任务 {"ids": [...], "text": "...", "mode": "download"|"sync", "skip_downloaded": false}
+            GET    /jobs/{job_id}    任务详情
+            DELETE /jobs/{job_id}    取消任务（运行中的任务立即中断）
+            POST   /jobs/{job_id}/pause  暂停任务
+            POST   /jobs/{job_id}/resume 恢复已暂停的任务
+            GET    /jobs/{job_id}/trace 任务追踪 (Chrome Trace JSON)
+            GET    /stats            队列统计
+            GET    /library          搜索书库 ?q=关键词&tag=&author=&downloaded=1|0&limit=50&offset=0
+            GET    /library/{album_id} 书库中的本子信息及已下载文件
+            GET    /events           任务事件流 (Server-Sent Events)
+            GET    /metrics          运行指标 (Prometheus 文本格式)
+
+        Args:
+            manager (JMComicManager): 下载引擎
+            host (str): 监听地址
+            port (int): 监听端口
+            token (str, optional): 设置后所有请求需携带 Authorization: Bearer {token}
+            metrics (bool): 是否提供 /metrics
+        """
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.token = token
+        self.metrics = metrics
+        self.loop = None
+        self.server = None
+        self.subscribers = set()
+        self.manager.queue.add_listener(self.on_queue_event)
+
+    async def start(self):
+        """启动HTTP服务"""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def publish(self, event, data):
+        """
+        向所有事件流订阅者推送事件，可在任意线程调用
+
+        Args:
+            event (str): 事件名
+            data (dict): 事件数据
+        """
+        if self.loop is None or not self.subscribers:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+        self.loop.call_soon_threadsafe(self.broadcast, message)
+
+    def broadcast(self, message):
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except asyncio.QueueFull:
+                # 积压过多，丢弃未发送的事件并通知 stream_events 断开
+                self.subscribers.discard(subscriber)
+                while not subscriber.empty():
+                    subscriber.get_nowait()
+                subscriber.put_nowait(None)
+
+    def on_queue_event(self, event, job):
+        self.publish(event, job.to_dict(include_progress=True))
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            # 先校验令牌和大小再读取请求体，未认证的客户端不能让服务分配任意大的缓冲区
+            if self.token and headers.get("authorization") != f"Bearer {self.token}":
+                await self.send_json(writer, HTTPStatus.UNAUTHORIZED, {"error": "unauthorized"})
+                return
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_SIZE:
+                await self.send_json(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "request body too large"})
+                return
+            body = await reader.readexactly(length) if length > 0 else b""
+
+            url = urlsplit(target)
+            path = url.path.rstrip("/") or "/"
+            if method == "GET" and path == "/events":
+                await self.stream_events(writer)
+                return
+            if method == "GET" and path == "/metrics" and self.metrics:
+                await self.send_text(writer, HTTPStatus.OK, await asyncio.to_thread(self.manager.metrics.render))
+                return
+
+            # 保存队列、查询书库等读写磁盘的操作不阻塞事件循环
+            status, payload = await asyncio.to_thread(self.route, method, path, body, parse_qs(url.query))
+            await self.send_json(writer, status, payload)
+        except (ValueError, json.JSONDecodeError) as e:
+            await self.send_json(writer, HTTPStatus.BAD_REQUEST, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            # 如队列、书库读写磁盘出错，返回 500 而不是直接断开连接
+            print(f"控制接口处理请求失败: {str(e)}")
+            try:
+                await self.send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+            except Exception:
+                pass
+        finally:
+            writer.close()
+
+    def route(self, method, path, body, query=None):
+        """
+        分发请求
+
+        Args:
+            query (dict, optional): 查询参数，parse_qs 的结果
+
+        Returns:
+            tuple: (HTTPStatus, 响应数据)
+        """
+        queue = self.manager.queue
+        parts = path.strip("/").split("/")
+
+        if parts == ["jobs"]:
+            if method == "GET":
+                return HTTPStatus.OK, {"jobs": [job.to_dict(include_progress=True) for job in queue.list_jobs()]}
+            if method == "POST":
+                return self.submit_jobs(json.loads(body or b"{}"))
+
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = queue.get_job(parts[1])
+            if job is None:
+                return HTTPStatus.NOT_FOUND, {"error": "job not found"}
+            if method == "GET":
+                return HTTPStatus.OK, job.to_dict(include_progress=True)
+            if method == "DELETE":
+                if not queue.cancel(job.job_id):
+                    return HTTPStatus.CONFLICT, {"error": f"job is {job.status}"}
+                return HTTPStatus.OK, job.to_dict(include_progress=True)
+
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] in ("pause", "resume") and method == "POST":
+            job = queue.get_job(parts[1])
+            if job is None:
+                return HTTPStatus.NOT_FOUND, {"error": "job not found"}
+            action = queue.pause if parts[2] == "pause" else queue.resume
+            if not action(job.job_id):
+                return HTTPStatus.CONFLICT, {"error": f"job is {job.status}"}
+            return HTTPStatus.OK, job.to_dict(include_progress=True)
+
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "trace" and method == "GET":
+            trace = self.manager.metrics.get_trace(parts[1])
+            if trace is None:
+                return HTTPStatus.NOT_FOUND, {"error": "trace not found"}
+            return HTTPStatus.OK, trace.to_dict()
+
+        elif parts == ["stats"] and method == "GET":
+            return HTTPStatus.OK, queue.stats()
+
+        elif parts == ["library"] and method == "GET":
+            return HTTPStatus.OK, self.search_library(query or {})
+
+        elif len(parts) == 2 and parts[0] == "library" and method == "GET":
+            if not parts[1].isdigit():
+                raise ValueError(f"invalid album id: {parts[1]}")
+            library = self.manager.get_library()
+            album = library.get_album(parts[1])
+            if album is None:
+                return HTTPStatus.NOT_FOUND, {"error": "album not found"}
+            album["files"] = library.list_files(parts[1])
+            return HTTPStatus.OK, album
+
+        else:
+            return HTTPStatus.NOT_FOUND, {"error": "not found"}
+
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "method not allowed"}
+
+    def submit_jobs(self, data):
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+
+        album_ids = extract_album_ids("\n".join(str(item) for item in data.get("ids", [])))
+        if data.get("text"):
+            album_ids = list(dict.fromkeys(album_ids + extract_album_ids(data["text"])))
+        if not album_ids:
+            raise ValueError("no album id found")
+
+        mode = data.get("mode", MODE_DOWNLOAD)
+        if mode not in (MODE_DOWNLOAD, MODE_SYNC):
+            raise ValueError(f"unknown mode: {mode}")
+
+        if data.get("skip_downloaded") and mode == MODE_DOWNLOAD:
+            jobs = self.manager.batch_enqueue(album_ids)["added"]
+        else:
+            jobs = self.manager.queue.enqueue_many(album_ids, mode)
+        return HTTPStatus.ACCEPTED, {"jobs": [job.to_dict(include_progress=True) for job in jobs]}
+
+    def search_library(self, query):
+        def param(name, default=None):
+            return query.get(name, [default])[0]
+
+        downloaded = param("downloaded")
+        albums = self.manager.get_library().search(
+            param("q", ""),
+            tag=param("tag"),
+            author=param("author"),
+            downloaded=None if downloaded is None else downloaded in ("1", "true"),
+            limit=int(param("limit", 50)),
+            offset=int(param("offset", 0)),
+        )
+        return {"albums": albums}
+
+    async def send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def send_text(self, writer, status, text):
+        body = text.encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def stream_events(self, writer):
+        """以 Server-Sent Events 推送任务事件，直到客户端断开"""
+        subscriber = asyncio.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.subscribers.add(subscriber)
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: keep-alive\r\n\r\n"
+            )
+            await writer.drain()
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 心跳，及时发现断开的连接
+                    message = b": ping\n\n"
+                if message is None:
+                    return
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self.subscribers.discard(subscriber)
@@ -1,44 +1,114 @@
+import asyncio
 import flet as ft
 import threading
 import time
-import re
 from typing import Optional
 from config import ConfigManager
 from jm_manager import JMComicManager
+from download_queue import (
+    MODE_SYNC, STATUS_CANCELLED, STATUS_DISPLAY, STATUS_DONE, STATUS_FAILED, STATUS_PAUSED, STATUS_PENDING,
+    STATUS_RUNNING,
+)
 from ui_components import UIComponents
-from settings_dialog import create_settings_dialog
-import asyncio
-import os
+from album_id_parser import extract_album_ids, parse_album_id
+from log_buffer import LogBuffer
+from download_progress import format_progress
+from ui_dispatcher import UIUpdateDispatcher
+from startup_profile import profiler
+
+
+# 关闭窗口时等待运行中任务中断的最长时间（秒）
+STOP_TIMEOUT = 5
 
 
 class JMComicApp:
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, started_at=None):
+        """
+        Args:
+            page (ft.Page): 页面
+            started_at (float, optional): 进程启动时的 time.perf_counter()，用于统计启动耗时
+        """
         self.page = page
-        self.config_manager = ConfigManager()
-        self.jm_manager = JMComicManager()
-        self.ui = UIComponents(page)
-        self.setup_page()
-        self.create_ui()
-        
-    async def initialize_jm_manager(self, progress_dialog=None):
-        """异步初始化JMComicManager"""
-        # 等待一帧，确保对话框显示
-        await asyncio.sleep(0.01)
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        # 从启动到界面可操作的耗时（秒）
+        self.interactive_seconds = None
+        with profiler.phase("读取配置"):
+            self.config_manager = ConfigManager()
+        with profiler.phase("创建 JMComicManager"):
+            self.jm_manager = self.create_jm_manager()
+        with profiler.phase("创建界面"):
+            self.ui = UIComponents(page)
+            # 后台线程只标记变化的控件，由调度器每帧统一发送
+            self.dispatcher = UIUpdateDispatcher(page, self.config_manager.get("ui.frame_interval", 0.05))
+            # 日志先写入有界缓冲区，每帧批量刷新到界面
+            self.log_buffer = LogBuffer(self.config_manager.get("log.capacity", 500))
+            # 下载队列每个任务一行，按 job_id 保留，只更新发生变化的行
+            self.queue_rows = {}
+            self.queue_view_lock = threading.Lock()
+            self.queue_view_resync = False
+            self.queue_view_changed = {}
+            self.setup_page()
+            self.create_ui()
+        # 下载队列在后台初始化时才加载，加载后刷新
+        self.jm_manager.add_queue_listener(self.on_queue_event)
+
+    def create_jm_manager(self):
+        return JMComicManager(
+            self.config_manager.get("max_concurrent_downloads", 2),
+            album_cache_ttl=self.config_manager.get("album_cache.ttl", 86400),
+            album_cache_size=self.config_manager.get("album_cache.max_entries", 5000),
+            domain_probe_interval=self.config_manager.get("domain_health.interval", 1800),
+            pool_options=self.config_manager.get("connection_pool", {}),
+            cover_cache_size=self.config_manager.get("cover_cache.max_bytes", 50 * 1024 * 1024),
+            prefetch_covers=self.config_manager.get("cover_cache.prefetch", True),
+            prefetch_cover_count=self.config_manager.get("cover_cache.prefetch_count", 5),
+            post_process_options=self.config_manager.get("post_process", {}),
+            concurrency_options=self.config_manager.get("download_concurrency", {}),
+            use_image_store=self.config_manager.get("image_store.enabled", False),
+            trace_jobs=self.config_manager.get("metrics.trace_jobs", 20),
+            trace_dir=self.config_manager.get("metrics.trace_dir"),
+            log=self.log,
+        )
         
+    async def initialize_jm_manager(self):
+        """
+        异步初始化JMComicManager，界面在此期间保持可操作，完成后启用下载相关按钮
+        """
         try:
             await self.jm_manager.initialize()
-            # 初始化完成后更新UI状态
+        except Exception as e:
+            self.log(f"初始化失败: {str(e)}")
+            self.ui.status_text.value = f"初始化失败: {str(e)}"
+            self.dispatcher.mark(self.ui.status_text)
+        else:
             if not self.jm_manager.available or not self.jm_manager.initialized:
                 self.ui.status_text.value = "错误: 未找到 jmcomic 库，请先安装: pip install jmcomic"
-                self.ui.download_button.disabled = True
-                self.ui.parse_button.disabled = True
                 self.ui.id_input.disabled = True
-                self.page.update()
-        finally:
-            # 关闭进度对话框
-            if progress_dialog:
-                self.page.close(progress_dialog)
-                self.page.update()
+                self.dispatcher.mark(self.ui.status_text, self.ui.id_input)
+            else:
+                self.set_download_actions_enabled(True)
+                self.ui.status_text.value = "就绪"
+                self.dispatcher.mark(self.ui.status_text)
+                ready_seconds = time.perf_counter() - self.started_at
+                self.log(
+                    f"启动完成: 界面可操作用时 {self.interactive_seconds:.2f} 秒，"
+                    f"下载功能就绪用时 {ready_seconds:.2f} 秒（后台初始化 {self.jm_manager.init_seconds:.2f} 秒）"
+                )
+                profiler.mark("下载功能就绪")
+        # 下载队列在后台初始化时加载
+        self.refresh_queue_view()
+
+        if profiler.enabled:
+            # 报告中包含导入 jmcomic 等后台初始化的耗时
+            await asyncio.to_thread(profiler.report)
+            self.log("启动耗时报告已保存到 logs/startup_profile.json")
+
+    def set_download_actions_enabled(self, enabled):
+        """启用或禁用需要 jmcomic 客户端的按钮"""
+        buttons = [self.ui.download_button, self.ui.parse_button, self.ui.import_button, self.ui.sync_button]
+        for button in buttons:
+            button.disabled = not enabled
+        self.dispatcher.mark(*buttons)
 
     def setup_page(self):
         """设置页面基本属性"""
@@ -58,6 +128,7 @@ class JMComicApp:
         # 设置窗口事件处理
         def window_event(e):
             if e.data == "close":
+                self.jm_manager.stop_running_jobs(STOP_TIMEOUT)
                 self.page.window.destroy()
         
         self.page.window.prevent_close = False
@@ -86,18 +157,28 @@ class JMComicApp:
             )
         )
         
-        # 检查jmcomic是否安装
+        # jmcomic 在后台初始化，完成前禁用下载相关按钮，输入框等仍可操作
+        self.set_download_actions_enabled(False)
         if not self.jm_manager.available:
             self.ui.status_text.value = "错误: 未找到 jmcomic 库，请先安装: pip install jmcomic"
-            self.ui.download_button.disabled = True
-            self.ui.parse_button.disabled = True
             self.ui.id_input.disabled = True
+        else:
+            self.ui.status_text.value = "正在初始化下载组件..."
 
         self.page.update()
+        self.interactive_seconds = time.perf_counter() - self.started_at
+        profiler.mark("界面可操作")
+        
+        # 启动界面更新调度
+        self.dispatcher.add_flush_hook(self.flush_logs)
+        self.dispatcher.add_flush_hook(self.flush_queue_view)
+        self.dispatcher.start()
         
         # 绑定按钮事件
         self.ui.download_button.on_click = self.start_download
         self.ui.parse_button.on_click = self.start_parse
+        self.ui.import_button.on_click = self.open_batch_import
+        self.ui.sync_button.on_click = self.start_sync_library
 
     def switch_theme(self, e):
         if self.page.theme_mode == "light":
@@ -113,6 +194,8 @@ class JMComicApp:
         
     def exit_app(self, e):
         self.page.window.visible = False
+        # 中断下载中的任务并放回队列，下次启动时从中断处继续
+        self.jm_manager.stop_running_jobs(STOP_TIMEOUT)
         self.page.window.destroy()
         
     def minimize_window(self, e):
@@ -125,18 +208,31 @@ class JMComicApp:
             print(f"错误详情: {traceback.format_exc()}")
 
     def open_settings(self, e):
-        """打开设置对话框"""
-        dlg = create_settings_dialog(self.page, self.config_manager)
+        """打开设置对话框（首次打开时才导入）"""
+        from settings_dialog import create_settings_dialog
+        dlg = create_settings_dialog(self.page, self.config_manager, on_save=self.apply_settings)
         self.page.dialog = dlg
         self.page.open(dlg)
         self.page.update()
 
+    def apply_settings(self):
+        """设置保存后应用运行时配置"""
+        self.jm_manager.set_max_concurrent_downloads(self.config_manager.get("max_concurrent_downloads", 2))
+
     def log(self, message: str):
-        """添加日志信息"""
-        timestamp = time.strftime("%H:%M:%S", time.localtime())
-        log_entry = ft.Text(f"[{timestamp}] {message}", selectable=True)
-        self.ui.logs.controls.append(log_entry)
-        self.page.update()
+        """添加日志信息（可在任意线程调用）"""
+        self.log_buffer.append(message)
+
+    def flush_logs(self):
+        """将缓冲区中的新日志一次性加入日志区域，只保留最近 capacity 条（每帧调用）"""
+        lines = self.log_buffer.drain()
+        if not lines:
+            return
+        controls = self.ui.logs.controls
+        controls.extend(ft.Text(line, selectable=True) for line in lines)
+        if len(controls) > self.log_buffer.capacity:
+            del controls[:len(controls) - self.log_buffer.capacity]
+        self.dispatcher.mark(self.ui.logs)
         
     def start_download(self, e):
         """开始下载任务"""
@@ -144,28 +240,25 @@ class JMComicApp:
         
         if not album_id:
             self.ui.status_text.value = "请输入本子ID或URL"
-            self.ui.status_text.update()
+            self.dispatcher.mark(self.ui.status_text)
             return
 
         # 解析ID
         parsed_id = self.parse_album_id(album_id)
         if not parsed_id:
             self.ui.status_text.value = "无法解析本子ID，请检查输入"
-            self.ui.status_text.update()
+            self.dispatcher.mark(self.ui.status_text)
             return
 
-        # 禁用按钮，显示进度条
-        self.ui.download_button.disabled = True
-        self.ui.download_button.update()
-        self.ui.progress_bar.visible = True
-        self.ui.progress_bar.update()
-        self.ui.status_text.value = f"正在下载本子 {parsed_id}..."
-        self.ui.status_text.update()
-
-        # 在后台线程中执行下载
-        thread = threading.Thread(target=self.download_album, args=(parsed_id,))
-        thread.daemon = True
-        thread.start()
+        # 加入下载队列，由工作线程池并发下载
+        job = self.jm_manager.enqueue_download([parsed_id])[0]
+        if job.status == STATUS_RUNNING:
+            self.ui.status_text.value = f"本子 {parsed_id} 正在下载中"
+        else:
+            self.ui.status_text.value = f"本子 {parsed_id} 已加入下载队列"
+            self.log(f"本子 {parsed_id} 已加入下载队列")
+        self.dispatcher.mark(self.ui.status_text)
+        self.refresh_queue_view()
         
     def start_parse(self, e):
         """开始解析任务（仅显示详情，不下载）"""
@@ -173,23 +266,22 @@ class JMComicApp:
         
         if not album_id:
             self.ui.status_text.value = "请输入本子ID或URL"
-            self.ui.status_text.update()
+            self.dispatcher.mark(self.ui.status_text)
             return
 
         # 解析ID
         parsed_id = self.parse_album_id(album_id)
         if not parsed_id:
             self.ui.status_text.value = "无法解析本子ID，请检查输入"
-            self.ui.status_text.update()
+            self.dispatcher.mark(self.ui.status_text)
             return
 
         # 禁用按钮，显示进度条
         self.ui.parse_button.disabled = True
-        self.ui.parse_button.update()
         self.ui.progress_bar.visible = True
-        self.ui.progress_bar.update()
+        self.ui.progress_bar.value = None
         self.ui.status_text.value = f"正在解析本子 {parsed_id}..."
-        self.ui.status_text.update()
+        self.dispatcher.mark(self.ui.parse_button, self.ui.progress_bar, self.ui.status_text)
 
         # 在后台线程中执行解析
         thread = threading.Thread(target=self.parse_album, args=(parsed_id,))
@@ -198,68 +290,227 @@ class JMComicApp:
 
     def parse_album_id(self, input_str: str) -> Optional[str]:
         """解析输入的ID或URL"""
-        # 如果是纯数字，直接返回
-        if input_str.isdigit():
-            return input_str
-        
-        # 如果是URL，尝试提取ID
-        # 匹配 /album/{id} 或 /{id} 格式
-        patterns = [
-            r'/album/(\d+)',
-            r'/(\d+)(?:\.html)?(?:\?|$)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, input_str)
-            if match:
-                return match.group(1)
-        
-        return None
+        return parse_album_id(input_str)
+
+    def open_batch_import(self, e):
+        """打开批量导入对话框（首次打开时才导入）"""
+        from batch_import_dialog import create_batch_import_dialog
+        dlg = create_batch_import_dialog(self.page, self.start_batch_import)
+        self.page.open(dlg)
+        self.page.update()
 
-    def download_album(self, album_id: str):
-        """下载本子"""
+    def start_batch_import(self, text: str, source: str):
+        """开始批量导入任务"""
+        self.ui.status_text.value = f"正在导入 ({source})..."
+        self.dispatcher.mark(self.ui.status_text)
+
+        # 在后台线程中解析并入队
+        thread = threading.Thread(target=self.batch_import, args=(text, source))
+        thread.daemon = True
+        thread.start()
+
+    def batch_import(self, text: str, source: str):
+        """解析文本中的所有本子ID并一次性加入下载队列"""
         try:
-            self.log(f"开始下载本子 {album_id}")
-            
-            # 检查jmcomic是否可用
-            if not self.jm_manager.available:
-                raise Exception("JMComic库不可用，请先安装: pip install jmcomic")
-            
-            # 获取书籍信息
-            self.log("正在获取书籍信息...")
-            album = self.jm_manager.get_album_detail(album_id)
-            
-            # 显示漫画详情
-            self.display_album_info(album)
-            
-            self.log(f"书籍标题: {album.name}")
-            self.log(f"章节数量: {len(album)}")
-            
-            # 更新UI
-            self.ui.status_text.value = f"正在下载《{album.name}》..."
-            self.ui.status_container.update()
-            
-            # 开始下载
-            self.log("开始下载...")
-            self.jm_manager.download_album(album_id)
-            
-            # 完成
-            self.log("下载完成!")
-            self.ui.status_text.value = "下载完成!"
-            
+            album_ids = extract_album_ids(text, unique=False)
+            if not album_ids:
+                self.ui.status_text.value = f"未在{source}中找到本子ID"
+                return
+
+            result = self.jm_manager.batch_enqueue(album_ids)
+            message = (
+                f"批量导入 ({source}): 解析到 {len(album_ids)} 个ID，"
+                f"新增 {len(result['added'])} 个，跳过重复 {result['duplicate']} 个、"
+                f"已下载 {result['downloaded']} 个、已在队列 {result['queued']} 个"
+            )
+            self.log(message)
+            self.ui.status_text.value = message
+            self.refresh_queue_view()
+
         except Exception as e:
-            self.log(f"下载出错: {str(e)}")
-            self.ui.status_text.value = f"下载出错: {str(e)}"
-        
+            self.log(f"批量导入出错: {str(e)}")
+            self.ui.status_text.value = f"批量导入出错: {str(e)}"
+
         finally:
-            # 恢复按钮状态
-            self.ui.download_button.disabled = False
-            self.ui.parse_button.disabled = False
-            self.ui.download_button.update()
-            self.ui.parse_button.update()
-            self.ui.progress_bar.visible = False
-            self.ui.progress_bar.update()
-            self.ui.status_container.update()
+            self.dispatcher.mark(self.ui.status_text)
+
+    def start_sync_library(self, e):
+        """开始同步下载目录中的全部本子"""
+        self.ui.status_text.value = "正在扫描下载目录..."
+        self.dispatcher.mark(self.ui.status_text)
+
+        # 在后台线程中扫描并入队
+        thread = threading.Thread(target=self.sync_library)
+        thread.daemon = True
+        thread.start()
+
+    def sync_library(self):
+        """将已下载的本子加入同步队列"""
+        try:
+            jobs = self.jm_manager.sync_library()
+            message = f"已将 {len(jobs)} 个本子加入同步队列" if jobs else "下载目录中没有可同步的本子"
+            self.log(message)
+            self.ui.status_text.value = message
+            self.refresh_queue_view()
+
+        except Exception as e:
+            self.log(f"同步出错: {str(e)}")
+            self.ui.status_text.value = f"同步出错: {str(e)}"
+
+        finally:
+            self.dispatcher.mark(self.ui.status_text)
+
+    def on_queue_event(self, event: str, job):
+        """处理下载队列事件（在工作线程中调用）"""
+        name = f"《{job.title}》" if job.title else job.album_id
+        if event == "added":
+            # 批量导入时同一帧内的新任务合并为一次增加行
+            self.refresh_queue_view()
+            return
+        elif event == "progress":
+            # 进度只更新该任务的行和总进度条
+            self.refresh_queue_view(job)
+            return
+        elif event == "started":
+            self.log(f"开始{'同步' if job.mode == MODE_SYNC else '下载'}本子 {job.album_id}")
+        elif event == "updated" and job.title:
+            self.log(f"书籍标题: {job.title}")
+        elif event == "finished":
+            if job.status == STATUS_DONE:
+                self.log(f"{name} {'同步' if job.mode == MODE_SYNC else '下载'}完成!")
+            elif job.status in (STATUS_PAUSED, STATUS_CANCELLED):
+                self.log(f"{name} {STATUS_DISPLAY[job.status]}")
+            else:
+                self.log(f"{name} 下载出错: {job.error}")
+        elif event in ("paused", "cancelled", "resumed"):
+            self.log(f"{name} {'已恢复' if event == 'resumed' else STATUS_DISPLAY[job.status]}")
+        elif event == "processed":
+            self.log(f"{name} {job.error}" if job.error else f"{name} PDF/长图生成完成")
+        self.refresh_queue_view(job)
+
+    def refresh_queue_view(self, job=None):
+        """
+        标记下载队列需要刷新，可在任意线程调用；同一帧内的多次调用合并处理
+
+        Args:
+            job (DownloadJob, optional): 只有该任务发生变化；为None时按队列重新增删行
+        """
+        with self.queue_view_lock:
+            if job is None:
+                self.queue_view_resync = True
+            else:
+                self.queue_view_changed[job.job_id] = job
+
+    def flush_queue_view(self):
+        """更新下载队列中变化的行、概况与总进度（每帧调用）"""
+        with self.queue_view_lock:
+            resync, self.queue_view_resync = self.queue_view_resync, False
+            changed, self.queue_view_changed = self.queue_view_changed, {}
+        if not resync and not changed:
+            return
+        if self.jm_manager.queue is None:
+            # 队列尚未加载
+            return
+
+        jobs = self.jm_manager.queue.list_jobs()
+        if resync:
+            self.sync_queue_rows(jobs)
+            changed = {job.job_id: job for job in jobs}
+        for job in changed.values():
+            self.update_queue_row(job)
+
+        stats = self.jm_manager.queue.stats()
+        paused = f"  已暂停: {stats[STATUS_PAUSED]}" if stats[STATUS_PAUSED] else ""
+        if stats[STATUS_PENDING] or stats[STATUS_RUNNING]:
+            summary = (
+                f"下载中: {stats[STATUS_RUNNING]}  等待中: {stats[STATUS_PENDING]}  "
+                f"已完成: {stats[STATUS_DONE]}  失败: {stats[STATUS_FAILED]}{paused}"
+            )
+        else:
+            summary = f"队列空闲  已完成: {stats[STATUS_DONE]}  失败: {stats[STATUS_FAILED]}{paused}"
+        if self.ui.queue_summary.value != summary:
+            self.ui.queue_summary.value = summary
+            self.dispatcher.mark(self.ui.queue_summary)
+
+        running = [job for job in jobs if job.status == STATUS_RUNNING]
+        # 所有运行中任务的平均完成比例；尚未获取到进度时显示为不确定进度
+        fractions = [job.progress["fraction"] for job in running if job.progress]
+        value = sum(fractions) / len(running) if fractions else None
+        if self.ui.progress_bar.visible != bool(running) or self.ui.progress_bar.value != value:
+            self.ui.progress_bar.visible = bool(running)
+            self.ui.progress_bar.value = value
+            self.dispatcher.mark(self.ui.progress_bar)
+
+    def sync_queue_rows(self, jobs):
+        """按队列增删行，已有的行保留；行没有变化时不发送列表"""
+        if [job.job_id for job in jobs] == list(self.queue_rows):
+            return
+        self.queue_rows = {job.job_id: self.queue_rows.get(job.job_id) or self.create_queue_row(job) for job in jobs}
+        self.ui.queue_list.controls = list(self.queue_rows.values())
+        self.dispatcher.mark(self.ui.queue_list)
+
+    def create_queue_row(self, job):
+        # row.data 记录按钮对应的状态
+        return ft.Row(
+            [ft.Text(self.format_queue_row(job), selectable=True, expand=True), *self.create_job_actions(job)],
+            data=job.status,
+        )
+
+    def format_queue_row(self, job):
+        return (
+            f"JM{job.album_id} {job.title or ''}  [{STATUS_DISPLAY[job.status]}]"
+            + (f"  {format_progress(job.progress)}" if job.status == STATUS_RUNNING and job.progress else "")
+            + (f"  {job.error}" if job.error else "")
+        )
+
+    def update_queue_row(self, job):
+        """更新单个任务的行：状态变化时更换按钮并发送整行，否则只发送文字"""
+        row = self.queue_rows.get(job.job_id)
+        if row is None:
+            # 行尚未加入（如其他入口添加的任务），下一帧重新对齐
+            self.refresh_queue_view()
+            return
+        label = row.controls[0]
+        text = self.format_queue_row(job)
+        if row.data != job.status:
+            row.data = job.status
+            label.value = text
+            row.controls = [label, *self.create_job_actions(job)]
+            self.dispatcher.mark(row)
+        elif label.value != text:
+            label.value = text
+            self.dispatcher.mark(label)
+
+    def create_job_actions(self, job):
+        """任务的暂停、恢复、取消按钮"""
+        queue = self.jm_manager.queue
+        actions = []
+        if job.status in (STATUS_PENDING, STATUS_RUNNING):
+            actions.append(ft.IconButton(
+                icon=ft.Icons.PAUSE,
+                tooltip="暂停",
+                icon_size=18,
+                on_click=lambda e, job_id=job.job_id: self.control_job(queue.pause, job_id),
+            ))
+        elif job.status == STATUS_PAUSED:
+            actions.append(ft.IconButton(
+                icon=ft.Icons.PLAY_ARROW,
+                tooltip="继续",
+                icon_size=18,
+                on_click=lambda e, job_id=job.job_id: self.control_job(queue.resume, job_id),
+            ))
+        if job.status in (STATUS_PENDING, STATUS_RUNNING, STATUS_PAUSED):
+            actions.append(ft.IconButton(
+                icon=ft.Icons.CLOSE,
+                tooltip="取消",
+                icon_size=18,
+                on_click=lambda e, job_id=job.job_id: self.control_job(queue.cancel, job_id),
+            ))
+        return actions
+
+    def control_job(self, action, job_id):
+        """暂停、恢复或取消任务；运行中的任务在下载线程中断后更新状态（由队列事件刷新对应的行）"""
+        action(job_id)
 
     def parse_album(self, album_id: str):
         """解析本子信息（仅显示详情，不下载）"""
@@ -272,7 +523,7 @@ class JMComicApp:
             
             # 获取书籍信息
             self.log("正在获取书籍信息...")
-            album = self.jm_manager.get_album_detail(album_id)
+            album = self.jm_manager.parse_album(album_id)
             
             # 显示漫画详情
             self.display_album_info(album)
@@ -292,11 +543,9 @@ class JMComicApp:
             # 恢复按钮状态
             self.ui.parse_button.disabled = False
             self.ui.download_button.disabled = False
-            self.ui.parse_button.update()
-            self.ui.download_button.update()
-            self.ui.progress_bar.visible = False
-            self.ui.progress_bar.update()
-            self.ui.status_container.update()
+            # 进度条是否显示由队列状态决定
+            self.refresh_queue_view()
+            self.dispatcher.mark(self.ui.parse_button, self.ui.download_button, self.ui.status_text)
 
     def display_album_info(self, album):
         """显示漫画详情信息"""
@@ -304,11 +553,6 @@ class JMComicApp:
         while len(self.ui.album_info.controls) > 2:
             self.ui.album_info.controls.pop()
         
-        # 创建封面保存路径 (在 download/cache 目录下)
-        cache_dir = os.path.join(os.getcwd(), "download", "cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        cover_path = os.path.join(cache_dir, f"{album.album_id}_cover.jpg")
-        
         # 先创建一个占位的封面显示区域
         cover_container = ft.Container(
             content=ft.Container(
@@ -365,16 +609,25 @@ class JMComicApp:
             self.ui.album_info.controls.append(description_container)
         
         self.ui.album_info.visible = True
-        self.page.update()
-        
-        cover_container.content = ft.Image(
-                src=self.jm_manager.get_album_cover(album.album_id),
-                width=120,
-                height=160,
-                fit=ft.ImageFit.CONTAIN,
-            )
+        self.dispatcher.mark(self.ui.album_info)
         
-        self.page.update()
+        # 封面在后台下载到本地缓存（download/cache），已缓存时直接使用本地文件
+        self.page.run_task(self.load_cover, album.album_id, cover_container)
+
+    async def load_cover(self, album_id, cover_container):
+        """异步加载封面并替换占位符"""
+        try:
+            cover_path = await self.jm_manager.cover_cache.get_async(album_id)
+            cover_container.content = ft.Image(
+                    src=cover_path,
+                    width=120,
+                    height=160,
+                    fit=ft.ImageFit.CONTAIN,
+                )
+        except Exception as e:
+            self.log(f"封面加载失败: {str(e)}")
+            cover_container.content.content = ft.Text("封面加载失败", size=12)
+        self.dispatcher.mark(cover_container)
 
     def show_about(self, e):
         """显示关于对话框"""
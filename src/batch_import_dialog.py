@@ -0,0 +1,78 @@
+import flet as ft
+import os
+from album_id_parser import read_album_id_text
+
+
+def create_batch_import_dialog(page: ft.Page, on_import):
+    """
+    创建批量导入对话框
+
+    Args:
+        page (ft.Page): 页面
+        on_import (callable): 接收 (text, source) 的导入回调，source 为"粘贴"或文件名
+    """
+    # 粘贴区域
+    text_field = ft.TextField(
+        label="粘贴本子ID或URL（每行一个，或以逗号分隔）",
+        multiline=True,
+        min_lines=12,
+        max_lines=12,
+        width=500,
+    )
+
+    def close_dlg(e=None):
+        dlg.open = False
+        page.update()
+
+    # 从文件导入
+    def pick_file_result(e: ft.FilePickerResultEvent):
+        if not e.files:
+            return
+        file_path = e.files[0].path
+        try:
+            text = read_album_id_text(file_path)
+        except Exception as ex:
+            page.open(ft.SnackBar(content=ft.Text(f"读取文件失败: {str(ex)}")))
+            return
+        close_dlg()
+        on_import(text, os.path.basename(file_path))
+
+    def pick_file(e):
+        file_picker = ft.FilePicker(on_result=pick_file_result)
+        page.overlay.append(file_picker)
+        page.update()
+        file_picker.pick_files(
+            dialog_title="选择ID列表文件",
+            allowed_extensions=["txt", "csv"],
+        )
+
+    def import_text(e):
+        text = text_field.value or ""
+        if not text.strip():
+            return
+        close_dlg()
+        on_import(text, "粘贴")
+
+    dlg = ft.AlertDialog(
+        modal=True,
+        title=ft.Text("批量导入"),
+        content=ft.Column(
+            [
+                text_field,
+                ft.ElevatedButton(
+                    "从文件导入 (.txt / .csv)",
+                    icon=ft.Icons.UPLOAD_FILE,
+                    on_click=pick_file,
+                ),
+            ],
+            tight=True,
+            width=500,
+        ),
+        actions=[
+            ft.TextButton("取消", on_click=close_dlg),
+            ft.TextButton("导入", on_click=import_text),
+        ],
+        actions_alignment=ft.MainAxisAlignment.END,
+    )
+
+    return dlg
@@ -0,0 +1,290 @@
+"""
+JMCrawler 命令行入口，不依赖 Flet，可在无显示环境的服务器上运行
+
+用法:
+    python src/cli.py download 350234 https://18comic.vip/album/123456/
+    python src/cli.py import ids.txt
+    python src/cli.py sync [ID ...]
+    python src/cli.py serve --port 8765
+    python src/cli.py prune-store
+    python src/cli.py search 关键词 --tag 标签
+"""
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import threading
+import time
+from config import ConfigManager
+from jm_manager import JMComicManager
+from album_id_parser import extract_album_ids, read_album_id_text
+from download_queue import MODE_SYNC, STATUS_CANCELLED, STATUS_DONE, STATUS_PAUSED
+from download_progress import format_progress, format_bytes
+from api_server import ApiServer
+
+
+def log(message: str):
+    """输出带时间戳的日志"""
+    timestamp = time.strftime("%H:%M:%S", time.localtime())
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def create_manager(args) -> JMComicManager:
+    """按配置创建并初始化 JMComicManager"""
+    config_manager = ConfigManager(args.config)
+    manager = JMComicManager(
+        args.concurrency or config_manager.get("max_concurrent_downloads", 2),
+        album_cache_ttl=config_manager.get("album_cache.ttl", 86400),
+        album_cache_size=config_manager.get("album_cache.max_entries", 5000),
+        domain_probe_interval=config_manager.get("domain_health.interval", 1800),
+        pool_options=config_manager.get("connection_pool", {}),
+        post_process_options=config_manager.get("post_process", {}),
+        concurrency_options=config_manager.get("download_concurrency", {}),
+        use_image_store=config_manager.get("image_store.enabled", False),
+        trace_jobs=config_manager.get("metrics.trace_jobs", 20),
+        trace_dir=args.trace_dir or config_manager.get("metrics.trace_dir"),
+        option_path=args.option,
+        log=log,
+    )
+    if not manager.available:
+        log("错误: 未找到 jmcomic 库，请先安装: pip install jmcomic")
+        sys.exit(2)
+    # 命令行在入队前就需要下载队列，不必推迟到 initialize
+    manager.setup_components()
+    manager.queue.add_listener(log_queue_event)
+    return manager
+
+
+# 每个任务上次打印进度的时间
+progress_logged_at = {}
+PROGRESS_LOG_INTERVAL = 5
+# 中断时等待运行中的任务停止的最长时间（秒）
+STOP_TIMEOUT = 10
+
+
+def log_queue_event(event: str, job):
+    """打印下载队列事件，下载进度每个任务最多每 PROGRESS_LOG_INTERVAL 秒打印一次"""
+    action = "同步" if job.mode == MODE_SYNC else "下载"
+    name = f"《{job.title}》" if job.title else job.album_id
+    if event == "progress":
+        now = time.time()
+        if now - progress_logged_at.get(job.job_id, 0) >= PROGRESS_LOG_INTERVAL:
+            progress_logged_at[job.job_id] = now
+            log(f"{name} {format_progress(job.progress)}")
+    elif event == "started":
+        log(f"开始{action}本子 {job.album_id}")
+    elif event == "updated" and job.title:
+        log(f"书籍标题: {job.title}")
+    elif event == "finished":
+        if job.status == STATUS_DONE:
+            log(f"{name} {action}完成")
+        elif job.status == STATUS_PAUSED:
+            log(f"{name} 已暂停")
+        elif job.status == STATUS_CANCELLED:
+            log(f"{name} 已取消")
+        else:
+            log(f"{name} {action}出错: {job.error}")
+    elif event == "processed":
+        log(f"{name} {job.error}" if job.error else f"{name} PDF/长图生成完成")
+
+
+async def start_manager(manager: JMComicManager) -> bool:
+    """
+    初始化 JMComicManager 并启动下载队列
+
+    Returns:
+        bool: 是否成功，失败时已输出原因
+    """
+    try:
+        await manager.initialize()
+    except Exception as e:
+        log(f"初始化失败: {str(e)}")
+        return False
+    if not manager.initialized or not manager.queue.started:
+        log("初始化失败: JMComic库不可用，请检查 jmcomic 安装和选项文件")
+        return False
+    return True
+
+
+def wait_jobs(manager: JMComicManager, jobs) -> int:
+    """
+    启动队列并等待指定任务全部结束
+
+    Returns:
+        int: 进程退出码，有任务失败时为1，初始化失败时为2
+    """
+    if not jobs:
+        return 0
+
+    job_ids = {job.job_id for job in jobs}
+    done = threading.Event()
+
+    def on_event(event, job):
+        if event == "finished" and not any(
+            j.active for j in manager.queue.list_jobs() if j.job_id in job_ids
+        ):
+            done.set()
+
+    manager.queue.add_listener(on_event)
+    if not asyncio.run(start_manager(manager)):
+        return 2
+    # 任务可能在监听器注册前已经结束
+    if not any(job.active for job in jobs):
+        done.set()
+
+    try:
+        while not done.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        log("已中断，正在停止下载中的任务...")
+        manager.stop_running_jobs(STOP_TIMEOUT)
+        log("未完成的任务保留在队列中，下次运行时从中断处继续")
+        return 130
+
+    if manager.post_processor.pending_count():
+        log("等待 PDF/长图 生成完成...")
+        manager.wait_post_processing()
+
+    failed = [job for job in jobs if job.status != STATUS_DONE]
+    log(f"共 {len(jobs)} 个任务，成功 {len(jobs) - len(failed)} 个，失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+
+def collect_album_ids(values) -> list:
+    """从命令行参数中提取本子ID"""
+    return extract_album_ids("\n".join(values))
+
+
+def cmd_download(args) -> int:
+    album_ids = collect_album_ids(args.ids)
+    if args.file:
+        album_ids = list(dict.fromkeys(album_ids + extract_album_ids(read_album_id_text(args.file))))
+    if not album_ids:
+        log("没有可下载的本子ID")
+        return 2
+
+    manager = create_manager(args)
+    return wait_jobs(manager, manager.enqueue_download(album_ids))
+
+
+def cmd_import(args) -> int:
+    album_ids = extract_album_ids(read_album_id_text(args.file), unique=False)
+    manager = create_manager(args)
+    result = manager.batch_enqueue(album_ids)
+    log(
+        f"解析到 {len(album_ids)} 个ID，新增 {len(result['added'])} 个，跳过重复 {result['duplicate']} 个、"
+        f"已下载 {result['downloaded']} 个、已在队列 {result['queued']} 个"
+    )
+    return wait_jobs(manager, result["added"])
+
+
+def cmd_sync(args) -> int:
+    manager = create_manager(args)
+    if args.ids:
+        jobs = manager.queue.enqueue_many(collect_album_ids(args.ids), MODE_SYNC)
+    else:
+        jobs = manager.sync_library()
+    log(f"已将 {len(jobs)} 个本子加入同步队列")
+    return wait_jobs(manager, jobs)
+
+
+def cmd_serve(args) -> int:
+    manager = create_manager(args)
+
+    async def serve():
+        if not await start_manager(manager):
+            return 2
+        log(f"下载队列已启动，同时下载 {manager.queue.max_workers} 个本子，按 Ctrl+C 退出")
+        if args.no_api:
+            await asyncio.Event().wait()
+        metrics = not args.no_metrics and ConfigManager(args.config).get("metrics.endpoint", True)
+        server = ApiServer(manager, args.host, args.port, args.token, metrics=metrics)
+        await server.start()
+        log(f"控制接口: http://{args.host}:{args.port}/jobs")
+        await server.serve_forever()
+
+    try:
+        return asyncio.run(serve())
+    except KeyboardInterrupt:
+        manager.stop_running_jobs(STOP_TIMEOUT)
+        log("已退出，未完成的任务保留在队列中")
+    return 0
+
+
+def cmd_prune_store(args) -> int:
+    manager = create_manager(args)
+    store = manager.get_image_store()
+    removed, freed = store.prune()
+    store.close()
+    log(f"已删除 {removed} 个不再被引用的仓库图片，释放 {format_bytes(freed)}")
+    return 0
+
+
+def cmd_search(args) -> int:
+    manager = create_manager(args)
+    library = manager.get_library()
+    if args.rebuild:
+        result = manager.rebuild_library()
+        if result is not None:
+            log(f"书库索引已更新: 重新扫描 {result['scanned']} 个，未变化 {result['unchanged']} 个，移除 {result['removed']} 个")
+    albums = library.search(" ".join(args.keywords), tag=args.tag, author=args.author, limit=args.limit)
+    for album in albums:
+        state = f"已下载 {album['file_count']} 个文件 {format_bytes(album['total_bytes'])}" if album["downloaded"] else "未下载"
+        print(f"JM{album['album_id']} 《{album['name']}》 {album['author']} [{', '.join(album['tags'])}] {state}")
+    stats = library.stats()
+    log(f"找到 {len(albums)} 个结果（书库共 {stats['albums']} 个本子，已下载 {stats['downloaded']} 个）")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="jmcrawler", description="JMCrawler 命令行下载工具")
+    parser.add_argument("--option", help="jmcomic 选项文件路径，默认为当前目录下的option.yml")
+    parser.add_argument("--config", help="应用配置文件路径，默认为当前目录下的config.json")
+    parser.add_argument("-j", "--concurrency", type=int, help="同时下载的本子数")
+    parser.add_argument("--trace-dir", help="把每个任务的耗时追踪保存为 Chrome Trace JSON 的目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    download_parser = subparsers.add_parser("download", help="下载本子")
+    download_parser.add_argument("ids", nargs="*", help="本子ID、JM号或URL")
+    download_parser.add_argument("-f", "--file", help="从 .txt/.csv 文件读取ID")
+    download_parser.set_defaults(func=cmd_download)
+
+    import_parser = subparsers.add_parser("import", help="批量导入，跳过已下载和已在队列中的本子")
+    import_parser.add_argument("file", help=".txt/.csv 文件")
+    import_parser.set_defaults(func=cmd_import)
+
+    sync_parser = subparsers.add_parser("sync", help="同步已下载的本子，只下载新增或未完成的章节")
+    sync_parser.add_argument("ids", nargs="*", help="本子ID，默认同步下载目录中的全部本子")
+    sync_parser.set_defaults(func=cmd_sync)
+
+    serve_parser = subparsers.add_parser("serve", help="常驻运行，持续处理下载队列并提供HTTP控制接口")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="控制接口监听地址")
+    serve_parser.add_argument("--port", type=int, default=8765, help="控制接口监听端口")
+    serve_parser.add_argument("--token", help="控制接口访问令牌")
+    serve_parser.add_argument("--no-api", action="store_true", help="不启动控制接口")
+    serve_parser.add_argument("--no-metrics", action="store_true", help="控制接口不提供 /metrics")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    search_parser = subparsers.add_parser("search", help="搜索书库中的本子")
+    search_parser.add_argument("keywords", nargs="*", help="关键词，匹配标题、作者、标签或简介")
+    search_parser.add_argument("--tag", help="按标签筛选")
+    search_parser.add_argument("--author", help="按作者筛选")
+    search_parser.add_argument("--limit", type=int, default=50, help="最多显示的结果数")
+    search_parser.add_argument("--rebuild", action="store_true", help="搜索前按下载目录增量更新索引")
+    search_parser.set_defaults(func=cmd_search)
+
+    prune_parser = subparsers.add_parser("prune-store", help="清理图片仓库中已没有本子引用的图片")
+    prune_parser.set_defaults(func=cmd_prune_store)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    # PDF/长图 转换在子进程中执行，打包后的程序需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import threading
+from contextlib import contextmanager
+
+
+# 延迟超过基线的倍数或窗口内出错比例超过阈值时，并发数乘以 DECREASE_FACTOR
+LATENCY_TOLERANCE = 1.5
+ERROR_THRESHOLD = 0.05
+DECREASE_FACTOR = 0.7
+# 基线（最低的窗口中位延迟）每个窗口向当前值放宽的比例，避免一次偶然的低延迟让之后一直判定为拥塞
+BASELINE_DRIFT = 0.01
+
+
+class AdaptiveLimit:
+    def __init__(self, initial=8, minimum=1, maximum=32, window=20):
+        """
+        加性增、乘性减（AIMD）的并发上限：每收集一个窗口的样本调整一次，
+        延迟和出错率正常且并发已用满时上限加1，延迟明显升高或出错增多时上限乘以 DECREASE_FACTOR
+
+        Args:
+            initial (int): 初始上限
+            minimum (int): 最小上限
+            maximum (int): 最大上限
+            window (int): 每次调整所需的最少样本数（上限更高时按上限数量收集）
+        """
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.limit = float(min(self.maximum, max(self.minimum, int(initial))))
+        self.window = max(1, int(window))
+        self.in_flight = 0
+        self.samples = []
+        # 本窗口内是否出现过并发已满（上限是瓶颈时才增加）
+        self.saturated = False
+        self.baseline = None
+        self.condition = threading.Condition()
+
+    @property
+    def current(self):
+        return int(self.limit)
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.saturated = True
+                self.condition.wait()
+            self.in_flight += 1
+            if self.in_flight >= int(self.limit):
+                self.saturated = True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record(self, latency, error=False):
+        """
+        记录一次请求的结果
+
+        Args:
+            latency (float): 耗时（秒）
+            error (bool): 是否出错（包括被限流后重试成功）
+        """
+        with self.condition:
+            self.samples.append((latency, error))
+            if len(self.samples) >= max(self.window, int(self.limit)):
+                self.adjust()
+
+    def adjust(self):
+        # 需持有 self.condition
+        samples, self.samples = self.samples, []
+        saturated, self.saturated = self.saturated, self.in_flight >= int(self.limit)
+        errors = sum(1 for _, error in samples if error)
+        latencies = sorted(latency for latency, error in samples if not error)
+        median = latencies[len(latencies) // 2] if latencies else None
+        if median is not None:
+            if self.baseline is None:
+                self.baseline = median
+            else:
+                self.baseline = min(median, self.baseline * (1 + BASELINE_DRIFT))
+
+        if errors / len(samples) > ERROR_THRESHOLD or (
+                median is not None and median > self.baseline * LATENCY_TOLERANCE):
+            self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+        elif saturated and self.limit < self.maximum:
+            self.limit = min(self.maximum, self.limit + 1)
+            self.condition.notify_all()
+
+
+class DownloadConcurrency:
+    def __init__(self, photos=4, images_per_album=12, max_images=16, min_images=2, initial_images=6,
+                 adaptive=True):
+        """
+        本子内的下载并发：同时下载的章节数、每个本子同时下载的图片数，以及所有本子合计的图片并发上限
+
+        合计上限由 AdaptiveLimit 按图片请求的延迟和出错率在 min_images ~ max_images 之间自动调整
+
+        Args:
+            photos (int): 每个本子同时下载的章节数
+            images_per_album (int): 每个本子同时下载的图片数
+            max_images (int): 所有本子合计同时下载的图片数上限
+            min_images (int): 自动调整时的最小图片并发数
+            initial_images (int): 自动调整的初始图片并发数
+            adaptive (bool): 为False时合计并发固定为 max_images
+        """
+        self.photos = max(1, int(photos))
+        self.images_per_album = max(1, int(images_per_album))
+        if adaptive:
+            self.image_limit = AdaptiveLimit(initial_images, min_images, max_images)
+        else:
+            self.image_limit = AdaptiveLimit(max_images, max_images, max_images)
+
+    def for_album(self, photos=None, images=None):
+        """
+        单个本子的并发控制
+
+        Args:
+            photos (int, optional): 覆盖同时下载的章节数
+            images (int, optional): 覆盖本子内同时下载的图片数
+
+        Returns:
+            AlbumConcurrency
+        """
+        return AlbumConcurrency(self, photos or self.photos, images or self.images_per_album)
+
+
+class AlbumConcurrency:
+    def __init__(self, shared, photos, images):
+        """
+        单个本子的并发控制，由 ManagedDownloader 使用
+
+        Args:
+            shared (DownloadConcurrency): 所有本子共用的并发控制
+            photos (int): 同时下载的章节数
+            images (int): 本子内同时下载的图片数
+        """
+        self.shared = shared
+        self.photos = max(1, int(photos))
+        self.images = max(1, int(images))
+        self.semaphore = threading.BoundedSemaphore(self.images)
+
+    def batch_count(self, apply_name, default):
+        """
+        jmcomic 每批（本子的章节、章节的图片）启动的线程数
+
+        章节内的图片线程数取本子的图片上限，实际同时下载的数量由 image_slot 限制
+
+        Args:
+            apply_name (str): jmcomic 批量执行的方法名
+            default (int): 选项中的线程数
+        """
+        if apply_name == "download_by_photo_detail":
+            return self.photos
+        if apply_name == "download_by_image_detail":
+            return self.images
+        return default
+
+    @contextmanager
+    def image_slot(self):
+        """先占本子内的名额，再占全局名额，避免等待本子名额时占住全局名额"""
+        self.semaphore.acquire()
+        try:
+            with self.shared.image_limit.slot():
+                yield
+        finally:
+            self.semaphore.release()
+
+    def record(self, latency, error=False):
+        self.shared.image_limit.record(latency, error)
@@ -17,6 +17,52 @@ class ConfigManager:
         self.default_config = {
                 "theme": "dark",
                 "first_run": True,
+                "max_concurrent_downloads": 2,
+                "album_cache": {
+                    "ttl": 86400,
+                    "max_entries": 5000,
+                },
+                "log": {
+                    "capacity": 500,
+                },
+                "connection_pool": {
+                    "max_connections": 16,
+                    "per_host": 6,
+                    "http2": None,
+                    "reserved": 1,
+                },
+                "cover_cache": {
+                    "max_bytes": 50 * 1024 * 1024,
+                    "prefetch": True,
+                    "prefetch_count": 5,
+                },
+                "post_process": {
+                    "max_workers": 1,
+                    "max_pending": 4,
+                    "use_processes": True,
+                },
+                "download_concurrency": {
+                    "photos": 4,
+                    "images_per_album": 12,
+                    "max_images": 16,
+                    "min_images": 2,
+                    "initial_images": 6,
+                    "adaptive": True,
+                },
+                "image_store": {
+                    "enabled": False,
+                },
+                "domain_health": {
+                    "interval": 1800,
+                },
+                "metrics": {
+                    "endpoint": True,
+                    "trace_jobs": 20,
+                    "trace_dir": None,
+                },
+                "ui": {
+                    "frame_interval": 0.05,
+                },
                 }
         self.config = self.load_config()
         
@@ -114,8 +160,3 @@ class ConfigManager:
         重新加载配置文件
         """
         self.config = self.load_config()
-    
-
-
-# 全局配置管理器实例
-config_manager = ConfigManager()
\ No newline at end of file
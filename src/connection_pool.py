@@ -0,0 +1,152 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from common import AbstractPostman
+from scheduler import PrioritySemaphore, current_lane
+from job_control import current_control
+
+# curl 写回调返回该值时中止传输（curl_cffi.curl.CURL_WRITEFUNC_ERROR）
+CURL_WRITEFUNC_ERROR = 0xFFFFFFFF
+
+
+class ConnectionPool:
+    def __init__(self, max_connections=16, per_host=6, http2=None, reserved=1):
+        """
+        共享的 HTTP 连接池：复用 curl_cffi 会话，避免每个请求重新建立 TCP 连接和 TLS 握手
+
+        每个会话持有一个 curl 句柄及其连接缓存，请求时从池中取出、用完归还（后进先出，优先复用刚用过的热连接）
+
+        等待连接时按请求所属的通道（见 scheduler）排队：界面解析优先于封面，封面优先于批量下载
+
+        Args:
+            max_connections (int): 会话（同时进行的请求）上限
+            per_host (int): 同一主机同时进行的请求上限
+            http2 (bool, optional): True 强制使用 HTTP/2，False 只用 HTTP/1.1，None 由 curl 协商
+            reserved (int): 每低一级的通道少用的会话数，批量下载占满连接池时界面解析仍可立即发出
+        """
+        self.max_connections = max(1, int(max_connections))
+        self.per_host = max(1, int(per_host))
+        self.http2 = http2
+        self.slots = PrioritySemaphore(self.max_connections, reserved)
+        self.sessions = []
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+    def new_session(self):
+        from curl_cffi import requests
+        kwargs = {}
+        if self.http2 is not None:
+            kwargs["http_version"] = "v2" if self.http2 else "v1"
+        # 关闭线程本地句柄，会话可以在下载线程之间传递而不丢失连接缓存
+        return requests.Session(use_thread_local_curl=False, **kwargs)
+
+    def host_slot(self, host):
+        with self.lock:
+            slot = self.host_slots.get(host)
+            if slot is None:
+                slot = self.host_slots[host] = PrioritySemaphore(self.per_host)
+            return slot
+
+    @contextmanager
+    def session(self, url):
+        """
+        借出一个会话，受全局和单主机并发上限约束
+
+        Args:
+            url (str): 请求地址，用于确定主机
+        """
+        lane = current_lane()
+        with self.host_slot(urlsplit(url).netloc).slot(lane), self.slots.slot(lane):
+            # 占到名额时必有空闲会话或可以新建（会话数不超过名额数）
+            with self.lock:
+                session = self.sessions.pop() if self.sessions else None
+            if session is None:
+                session = self.new_session()
+            try:
+                yield session
+            finally:
+                with self.lock:
+                    self.sessions.append(session)
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            session.close()
+
+
+class PooledPostman(AbstractPostman):
+    postman_key = "jmcrawler_pooled"
+
+    def __init__(self, kwargs, pool=None):
+        """
+        通过共享连接池发送请求的 Postman，替换 jmcomic 客户端默认的 Postman
+
+        Args:
+            kwargs (dict): 请求元数据（headers、cookies、proxies、impersonate 等），与原 Postman 共用同一个字典
+            pool (ConnectionPool): 连接池
+        """
+        super().__init__(kwargs)
+        self.pool = pool or ConnectionPool()
+
+    def request(self, method, url, **kwargs):
+        kwargs = self.before_request(kwargs)
+        control = current_control()
+        if control is not None:
+            control.check()
+        with self.pool.session(url) as session:
+            if control is None:
+                return getattr(session, method)(url, **kwargs)
+            return self.request_abortable(session, method, url, control, kwargs)
+
+    @staticmethod
+    def request_abortable(session, method, url, control, kwargs):
+        """
+        分块接收响应体，任务被暂停或取消时中止传输并抛出 JobStopped，及时释放连接和带宽
+
+        Args:
+            control (JobControl): 当前任务的控制信号
+        """
+        chunks = []
+
+        def on_content(chunk):
+            if control.stopped:
+                return CURL_WRITEFUNC_ERROR
+            chunks.append(chunk)
+            return len(chunk)
+
+        try:
+            resp = getattr(session, method)(url, content_callback=on_content, **kwargs)
+        except Exception:
+            control.check()
+            raise
+        resp.content = b"".join(chunks)
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def copy(self):
+        return self.__class__(self.meta_data.copy(), self.pool)
+
+
+def install_connection_pool(client, pool):
+    """
+    让 jmcomic 客户端改用共享连接池；只支持 curl_cffi 类型的 Postman，其他类型保持不变
+
+    Args:
+        client (JmcomicClient): jmcomic 客户端
+        pool (ConnectionPool): 连接池
+
+    Returns:
+        bool: 是否已替换
+    """
+    root = client.postman.get_root_postman()
+    if not getattr(root, "postman_key", "").startswith("curl_cffi"):
+        return False
+    client.postman = PooledPostman(root.get_meta_data(), pool)
+    return True
@@ -0,0 +1,158 @@
+import asyncio
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CoverCache:
+    def __init__(self, fetch, cache_dir=None, max_bytes=50 * 1024 * 1024, size=(120, 160), max_workers=2):
+        """
+        本地封面缓存：下载封面并缩小到显示尺寸后保存，之后直接使用本地文件，总大小超出上限时按最近最少使用淘汰
+
+        Args:
+            fetch (callable): 下载封面原图的函数，接收本子ID，返回图片字节
+            cache_dir (str, optional): 缓存目录，默认为当前目录下的download/cache
+            max_bytes (int): 缓存总大小上限（字节）
+            size (tuple): 缩略图最大宽高
+            max_workers (int): 后台下载线程数
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.getcwd(), "download", "cache")
+        self.cache_dir = cache_dir
+        self.fetch = fetch
+        self.max_bytes = max_bytes
+        self.size = tuple(size)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cover")
+        self.lock = threading.Lock()
+        # 本子ID -> 文件大小，按访问顺序排列，最近访问的在末尾
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.load_entries()
+
+    def load_entries(self):
+        """扫描缓存目录，按修改时间（即上次访问时间）恢复LRU顺序"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith("_cover.jpg"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len("_cover.jpg")], stat.st_size))
+        for _, album_id, size in sorted(files):
+            self.entries[album_id] = size
+            self.total_bytes += size
+
+    def get_cover_path(self, album_id):
+        return os.path.join(self.cache_dir, f"{album_id}_cover.jpg")
+
+    def get(self, album_id):
+        """
+        读取已缓存的封面
+
+        Args:
+            album_id (str): 本子ID
+
+        Returns:
+            str: 本地文件路径，未缓存时返回None
+        """
+        album_id = str(album_id)
+        with self.lock:
+            if album_id not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(album_id)
+        path = self.get_cover_path(album_id)
+        try:
+            # 用修改时间记录访问顺序，重启后仍可按LRU淘汰
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(album_id, 0)
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return path
+
+    def fetch_cover(self, album_id):
+        """
+        下载封面并缩小保存（在后台线程中执行）
+
+        Returns:
+            str: 本地文件路径
+        """
+        from PIL import Image
+
+        album_id = str(album_id)
+        data = self.fetch(album_id)
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            image.thumbnail(self.size, Image.LANCZOS)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.get_cover_path(album_id)
+            tmp_path = f"{path}.tmp"
+            image.save(tmp_path, "JPEG", quality=85)
+        os.replace(tmp_path, path)
+
+        size = os.path.getsize(path)
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(album_id, 0)
+            self.entries[album_id] = size
+        self.evict()
+        return path
+
+    def submit(self, album_id):
+        """
+        提交后台下载，同一本子同时只下载一次
+
+        Returns:
+            concurrent.futures.Future: 结果为本地文件路径
+        """
+        album_id = str(album_id)
+        with self.lock:
+            future = self.pending.get(album_id)
+            if future is None:
+                future = self.executor.submit(self.fetch_cover, album_id)
+                self.pending[album_id] = future
+                future.add_done_callback(lambda _: self.pending.pop(album_id, None))
+        return future
+
+    async def get_async(self, album_id):
+        """
+        获取封面，未缓存时在后台线程中下载，不阻塞事件循环
+
+        Returns:
+            str: 本地文件路径
+        """
+        path = self.get(album_id)
+        if path is not None:
+            return path
+        return await asyncio.wrap_future(self.submit(album_id))
+
+    def prefetch(self, album_ids):
+        """在后台预取尚未缓存的封面，失败时忽略"""
+        for album_id in album_ids:
+            album_id = str(album_id)
+            with self.lock:
+                cached = album_id in self.entries
+            if not cached:
+                self.submit(album_id)
+
+    def evict(self):
+        """淘汰最久未使用的封面，直到总大小不超过上限"""
+        while True:
+            with self.lock:
+                if self.total_bytes <= self.max_bytes or len(self.entries) <= 1:
+                    return
+                album_id, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+            try:
+                os.remove(self.get_cover_path(album_id))
+            except OSError as e:
+                print(f"删除封面缓存失败: {str(e)}")
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 连续失败达到该次数的域名视为不可用，排在最后
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def urllib_request(url, timeout):
+    """默认的探测请求，返回HTTP状态码（urllib 导入较慢，在探测时才导入）"""
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        # 有响应即说明域名可达，状态码交给调用方判断
+        return e.code
+
+
+class DomainHealth:
+    def __init__(self, cache_path=None, interval=1800, timeout=5, max_workers=8):
+        """
+        域名健康检测：并行探测各域名的延迟，按延迟和错误率排序，结果缓存到磁盘
+
+        启动时先使用缓存的结果排序，探测在后台线程中进行，不阻塞启动
+
+        Args:
+            cache_path (str, optional): 探测结果缓存文件，默认为当前目录下的download/cache/domain_health.json
+            interval (float): 定时重新探测的间隔（秒），为0时只在启动时探测一次
+            timeout (float): 单个域名的探测超时（秒）
+            max_workers (int): 并行探测的线程数
+        """
+        if cache_path is None:
+            cache_path = os.path.join(os.getcwd(), "download", "cache", "domain_health.json")
+        self.cache_path = cache_path
+        self.interval = interval
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.request = urllib_request
+        # {类别: {域名: {"latency", "successes", "failures", "consecutive_failures", "checked_at"}}}
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.load_cache()
+
+    def load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self.stats = json.load(f)
+        except Exception as e:
+            print(f"读取域名探测缓存失败: {str(e)}")
+
+    def save_cache(self):
+        with self.lock:
+            data = json.dumps(self.stats, ensure_ascii=False, indent=2)
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"保存域名探测结果失败: {str(e)}")
+
+    def record(self, kind, domain, latency=None, error=False):
+        """
+        记录一次请求结果，探测和实际的图片、封面请求都会调用（资源不存在的404不计为失败）
+
+        Args:
+            kind (str): 域名类别，如 "client"、"image"
+            domain (str): 域名
+            latency (float, optional): 响应延迟（秒），只有探测结果会更新延迟
+            error (bool): 是否失败
+        """
+        with self.lock:
+            entry = self.stats.setdefault(kind, {}).setdefault(domain, {
+                "latency": None,
+                "successes": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "checked_at": None,
+            })
+            # 衰减旧的计数，使错误率反映近期情况
+            entry["successes"] *= 0.9
+            entry["failures"] *= 0.9
+            if error:
+                entry["failures"] += 1
+                entry["consecutive_failures"] += 1
+            else:
+                entry["successes"] += 1
+                entry["consecutive_failures"] = 0
+            if latency is not None:
+                if entry["latency"] is None:
+                    entry["latency"] = latency
+                else:
+                    entry["latency"] = entry["latency"] * 0.7 + latency * 0.3
+            entry["checked_at"] = time.time()
+
+    def score(self, kind, domain):
+        """
+        域名得分，越小越好：延迟按错误率加权，不可用或未探测过的域名排在后面
+        """
+        entry = self.stats.get(kind, {}).get(domain)
+        if entry is not None and entry["consecutive_failures"] >= MAX_CONSECUTIVE_FAILURES:
+            return (2, entry["consecutive_failures"])
+        if entry is None or entry["latency"] is None:
+            return (1, 0)
+        total = entry["successes"] + entry["failures"]
+        error_rate = entry["failures"] / total if total else 0
+        return (0, entry["latency"] * (1 + 4 * error_rate))
+
+    def rank(self, kind, domains):
+        """
+        按得分排序域名，得分相同时保持原顺序
+
+        Args:
+            kind (str): 域名类别
+            domains (list): 候选域名
+
+        Returns:
+            list: 排序后的域名
+        """
+        with self.lock:
+            return sorted(domains, key=lambda domain: self.score(kind, domain))
+
+    def best(self, kind, domains):
+        """得分最好的域名"""
+        ranked = self.rank(kind, domains)
+        return ranked[0] if ranked else None
+
+    def is_healthy(self, kind, domain):
+        with self.lock:
+            return self.score(kind, domain)[0] == 0
+
+    def probe_domain(self, kind, domain):
+        """探测单个域名，状态码为5xx或请求异常视为失败"""
+        started = time.time()
+        try:
+            status = self.request(f"https://{domain}/", self.timeout)
+            error = status >= 500
+        except Exception:
+            error = True
+        latency = time.time() - started
+        self.record(kind, domain, None if error else latency, error)
+
+    def probe_all(self, targets):
+        """
+        并行探测全部域名并保存结果
+
+        Args:
+            targets (dict): {类别: 域名列表}
+        """
+        jobs = [(kind, domain) for kind, domains in targets.items() for domain in domains]
+        if not jobs:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            list(executor.map(lambda job: self.probe_domain(*job), jobs))
+        self.save_cache()
+
+    def start(self, get_targets, request=None, on_update=None):
+        """
+        启动后台探测线程：立即探测一次，之后每 interval 秒重新探测
+
+        Args:
+            get_targets (callable): 返回 {类别: 域名列表}
+            request (callable, optional): 探测请求 request(url, timeout) -> 状态码，默认使用 urllib
+            on_update (callable, optional): 每轮探测完成后调用
+        """
+        if request is not None:
+            self.request = request
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        def loop():
+            while not self.stop_event.is_set():
+                try:
+                    self.probe_all(get_targets())
+                    if on_update is not None:
+                        on_update()
+                except Exception as e:
+                    print(f"域名探测失败: {str(e)}")
+                if not self.interval or self.stop_event.wait(self.interval):
+                    break
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def file_sha1(file_path, chunk_size=1024 * 1024):
+    """计算文件的SHA1"""
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class AlbumManifest:
+    def __init__(self, album_id, manifest_dir, flush_interval=1.0):
+        """
+        单个本子的下载完成清单，记录已完成的章节与图片（路径、大小、SHA1）
+
+        Args:
+            album_id (str): 本子ID
+            manifest_dir (str): 清单文件所在目录
+            flush_interval (float): 两次写盘的最小间隔（秒），章节完成时总会写盘
+        """
+        self.album_id = str(album_id)
+        self.manifest_path = os.path.join(manifest_dir, f"{self.album_id}.json")
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = False
+        self.last_flush = 0.0
+        os.makedirs(manifest_dir, exist_ok=True)
+        self.data = self.load_manifest()
+
+    def load_manifest(self):
+        """
+        加载清单文件
+
+        Returns:
+            dict: 清单数据
+        """
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"读取下载清单失败: {str(e)}")
+        return {"album_id": self.album_id, "completed": False, "photos": {}}
+
+    def save_manifest(self):
+        """原子地写入清单文件（先写临时文件再替换）"""
+        with self.write_lock:
+            with self.lock:
+                content = json.dumps(self.data, ensure_ascii=False)
+                self.dirty = False
+                self.last_flush = time.time()
+
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, self.manifest_path)
+
+    def flush(self, force=False):
+        """有未保存的变更且距上次写盘超过间隔时写盘"""
+        if self.dirty and (force or time.time() - self.last_flush >= self.flush_interval):
+            self.save_manifest()
+
+    def photo_entry(self, photo_id):
+        # 需持有 self.lock
+        return self.data["photos"].setdefault(str(photo_id), {"completed": False, "images": {}})
+
+    @property
+    def exists(self):
+        """清单文件是否存在（本子是否由带清单的版本下载过，包括未下载完的）"""
+        return os.path.exists(self.manifest_path)
+
+    @property
+    def completed(self):
+        return self.data.get("completed", False)
+
+    def has_photo(self, photo_id):
+        """清单中是否有该章节的记录"""
+        with self.lock:
+            return str(photo_id) in self.data["photos"]
+
+    def is_image_complete(self, photo_id, filename, file_path=None):
+        """
+        图片是否已完成：清单中有记录且磁盘文件大小一致
+
+        Args:
+            photo_id (str): 章节ID
+            filename (str): 图片文件名
+            file_path (str, optional): 实际保存路径，默认使用清单中记录的路径
+        """
+        with self.lock:
+            photo = self.data["photos"].get(str(photo_id))
+            record = photo["images"].get(filename) if photo else None
+        if record is None:
+            return False
+        file_path = file_path or record["path"]
+        try:
+            return os.path.getsize(file_path) == record["size"]
+        except OSError:
+            return False
+
+    def is_photo_skipped(self, photo_id):
+        """章节是否被插件跳过（如图片过少的章节），跳过的章节按已完成处理"""
+        with self.lock:
+            photo = self.data["photos"].get(str(photo_id))
+            return bool(photo and photo.get("skipped", False))
+
+    def is_photo_complete(self, photo_id):
+        """章节是否已完成：标记为完成且所有图片文件仍然存在；被跳过的章节视为已完成"""
+        with self.lock:
+            photo = self.data["photos"].get(str(photo_id))
+            if not photo or not photo["completed"]:
+                return False
+            if photo.get("skipped", False):
+                return True
+            images = list(photo["images"].items())
+        return all(self.is_image_complete(photo_id, filename) for filename, _ in images)
+
+    def record_image(self, photo_id, filename, file_path, sha1=None):
+        """
+        记录一张已完成的图片
+
+        Args:
+            photo_id (str): 章节ID
+            filename (str): 图片文件名
+            file_path (str): 保存路径
+            sha1 (str, optional): 已计算好的SHA1，默认读取文件计算
+        """
+        record = {
+            "path": file_path,
+            "size": os.path.getsize(file_path),
+            "sha1": sha1 or file_sha1(file_path),
+        }
+        with self.lock:
+            self.photo_entry(photo_id)["images"][filename] = record
+            self.dirty = True
+        self.flush()
+
+    def record_photo(self, photo_id, image_count):
+        """
+        章节结束时调用，图片全部记录在案才标记为完成
+
+        Args:
+            photo_id (str): 章节ID
+            image_count (int): 章节的图片总数
+        """
+        with self.lock:
+            photo = self.photo_entry(photo_id)
+            photo["completed"] = len(photo["images"]) >= image_count
+            photo["image_count"] = image_count
+            self.dirty = True
+        self.flush(force=True)
+
+    def record_skipped_photo(self, photo_id):
+        """
+        记录被插件跳过的章节（jmcomic 跳过的章节不会调用 after_photo），按已完成处理
+
+        Args:
+            photo_id (str): 章节ID
+        """
+        with self.lock:
+            photo = self.photo_entry(photo_id)
+            photo["completed"] = True
+            photo["skipped"] = True
+            self.dirty = True
+        self.flush(force=True)
+
+    def record_album(self, photo_ids):
+        """
+        本子结束时调用，所有章节完成（或被跳过）才标记为完成
+
+        Args:
+            photo_ids (list): 本子的全部章节ID
+        """
+        with self.lock:
+            photos = self.data["photos"]
+            self.data["completed"] = all(
+                photos.get(str(photo_id), {}).get("completed", False) for photo_id in photo_ids
+            )
+            self.dirty = True
+        self.flush(force=True)
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+
+
+class DownloadProgress:
+    def __init__(self, album_id, on_change=None, interval=0.5, window=5.0):
+        """
+        单个本子的下载进度，由下载器回调在各下载线程中更新
+
+        图片总数只有在章节详情获取后才知道，尚未获取的章节按已知章节的平均图片数估算
+
+        Args:
+            album_id (str): 本子ID
+            on_change (callable, optional): 进度变化时调用，接收 snapshot() 的结果；两次调用至少间隔 interval 秒
+            interval (float): 进度通知的最小间隔（秒）
+            window (float): 计算瞬时速度的时间窗口（秒）
+        """
+        self.album_id = str(album_id)
+        self.on_change = on_change
+        self.interval = interval
+        self.window = window
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.finished_at = None
+        self.photos_total = 0
+        self.photos_done = 0
+        self.photos_known = 0
+        self.images_total = 0
+        self.images_done = 0
+        self.images_skipped = 0
+        self.bytes_done = 0
+        self.current_photo = None
+        # (时间戳, 累计字节数) 采样，用于计算瞬时速度
+        self.samples = deque([(self.started_at, 0)])
+        self.last_notify = 0
+
+    def set_photos(self, count):
+        """本次需要下载的章节数（已过滤掉已完成的章节）"""
+        with self.lock:
+            self.photos_total = count
+        self.notify(force=True)
+
+    def add_photo(self, photo_id, image_count, skipped=0):
+        """
+        章节详情获取完成
+
+        Args:
+            photo_id (str): 章节ID
+            image_count (int): 章节图片总数
+            skipped (int): 已完成而跳过的图片数
+        """
+        with self.lock:
+            self.photos_known += 1
+            self.images_total += image_count
+            self.images_done += skipped
+            self.images_skipped += skipped
+            self.current_photo = str(photo_id)
+        self.notify()
+
+    def image_done(self, size=0):
+        """
+        一张图片下载完成
+
+        Args:
+            size (int): 写入的字节数，未实际下载（已存在）时为0
+        """
+        with self.lock:
+            self.images_done += 1
+            if size:
+                self.bytes_done += size
+                now = time.time()
+                self.samples.append((now, self.bytes_done))
+                while len(self.samples) > 2 and now - self.samples[0][0] > self.window:
+                    self.samples.popleft()
+        self.notify()
+
+    def photo_done(self, photo_id):
+        with self.lock:
+            self.photos_done += 1
+        self.notify()
+
+    def finish(self):
+        with self.lock:
+            self.finished_at = time.time()
+        self.notify(force=True)
+
+    @property
+    def estimated_images_total(self):
+        # 需持有 self.lock
+        if self.photos_known == 0:
+            return 0
+        unknown = max(0, self.photos_total - self.photos_known)
+        return self.images_total + round(self.images_total / self.photos_known * unknown)
+
+    def snapshot(self):
+        """
+        当前进度
+
+        Returns:
+            dict: 章节/图片完成数、字节数、当前章节、瞬时与平均速度（字节/秒）、预计剩余时间（秒）及完成比例
+        """
+        with self.lock:
+            now = self.finished_at or time.time()
+            elapsed = max(now - self.started_at, 1e-6)
+            oldest_time, oldest_bytes = self.samples[0]
+            if self.finished_at is None and now - oldest_time > 0:
+                speed = (self.bytes_done - oldest_bytes) / (now - oldest_time)
+            else:
+                speed = 0
+            downloaded = self.images_done - self.images_skipped
+            avg_speed = self.bytes_done / elapsed
+
+            total = self.estimated_images_total
+            fraction = min(1.0, self.images_done / total) if total else 0.0
+            if self.finished_at is not None:
+                fraction = 1.0
+            eta = None
+            if self.finished_at is None and downloaded and total > self.images_done:
+                eta = (total - self.images_done) * elapsed / downloaded
+
+            return {
+                "album_id": self.album_id,
+                "photos_done": self.photos_done,
+                "photos_total": self.photos_total,
+                "images_done": self.images_done,
+                "images_total": total,
+                "images_skipped": self.images_skipped,
+                "bytes_done": self.bytes_done,
+                "current_photo": self.current_photo,
+                "speed": speed,
+                "avg_speed": avg_speed,
+                "eta": eta,
+                "fraction": fraction,
+                "elapsed": elapsed,
+            }
+
+    def notify(self, force=False):
+        if self.on_change is None:
+            return
+        now = time.time()
+        with self.lock:
+            if not force and now - self.last_notify < self.interval:
+                return
+            self.last_notify = now
+        try:
+            self.on_change(self.snapshot())
+        except Exception as e:
+            print(f"进度通知失败: {str(e)}")
+
+
+def format_bytes(size):
+    """将字节数格式化为 B/KB/MB/GB"""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.1f}{unit}" if unit != "B" else f"{int(size)}B"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def format_progress(progress):
+    """
+    将进度快照格式化为一行文字
+
+    Args:
+        progress (dict): DownloadProgress.snapshot() 的结果
+
+    Returns:
+        str: 如 "章节 1/3  图片 40/120  2.3MB  560.0KB/s (平均 480.2KB/s)  剩余 1分20秒"
+    """
+    text = (
+        f"章节 {progress['photos_done']}/{progress['photos_total']}  "
+        f"图片 {progress['images_done']}/{progress['images_total']}  "
+        f"{format_bytes(progress['bytes_done'])}  "
+        f"{format_bytes(progress['speed'])}/s (平均 {format_bytes(progress['avg_speed'])}/s)"
+    )
+    if progress.get("eta") is not None:
+        minutes, seconds = divmod(int(progress["eta"]), 60)
+        text += f"  剩余 {minutes}分{seconds}秒" if minutes else f"  剩余 {seconds}秒"
+    return text
@@ -0,0 +1,438 @@
+import json
+import os
+import threading
+import time
+import uuid
+from job_control import JobControl, JobStopped, STOP_PAUSE
+
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+STATUS_PAUSED = "paused"
+
+# 任务模式
+MODE_DOWNLOAD = "download"
+MODE_SYNC = "sync"
+
+STATUS_DISPLAY = {
+    STATUS_PENDING: "等待中",
+    STATUS_RUNNING: "下载中",
+    STATUS_DONE: "已完成",
+    STATUS_FAILED: "失败",
+    STATUS_CANCELLED: "已取消",
+    STATUS_PAUSED: "已暂停",
+}
+
+
+class DownloadJob:
+    def __init__(self, album_id, job_id=None, status=STATUS_PENDING, title=None,
+                 error=None, created_at=None, finished_at=None, mode=MODE_DOWNLOAD):
+        """
+        下载任务
+
+        Args:
+            album_id (str): 本子ID
+            job_id (str, optional): 任务ID，默认自动生成
+            status (str): 任务状态
+            title (str, optional): 本子标题，获取详情后填充
+            error (str, optional): 失败原因
+            created_at (float, optional): 入队时间戳
+            finished_at (float, optional): 结束时间戳
+            mode (str): 任务模式，"download" 完整下载，"sync" 只下载新增或未完成的章节
+        """
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.album_id = str(album_id)
+        self.status = status
+        self.title = title
+        self.error = error
+        self.created_at = created_at or time.time()
+        self.finished_at = finished_at
+        self.mode = mode
+        # 最近一次进度快照（见 DownloadProgress.snapshot），重新运行时清空
+        self.progress = None
+        # 运行中任务的暂停、取消信号，每次开始运行时新建
+        self.control = None
+
+    @property
+    def active(self):
+        """任务是否仍在队列中（等待或运行）"""
+        return self.status in (STATUS_PENDING, STATUS_RUNNING)
+
+    def to_dict(self, include_progress=False):
+        """
+        Args:
+            include_progress (bool): 是否附带进度快照；进度只用于界面和控制接口展示，不写入队列文件
+        """
+        data = {
+            "job_id": self.job_id,
+            "album_id": self.album_id,
+            "status": self.status,
+            "title": self.title,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "mode": self.mode,
+        }
+        if include_progress:
+            data["progress"] = self.progress
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["album_id"],
+            job_id=data.get("job_id"),
+            status=data.get("status", STATUS_PENDING),
+            title=data.get("title"),
+            error=data.get("error"),
+            created_at=data.get("created_at"),
+            finished_at=data.get("finished_at"),
+            mode=data.get("mode", MODE_DOWNLOAD),
+        )
+
+
+class DownloadQueue:
+    def __init__(self, handler, queue_path=None, max_workers=2):
+        """
+        持久化的下载队列，由有界工作线程池并发执行
+
+        Args:
+            handler (callable): 执行单个任务的函数，接收 DownloadJob，抛出异常视为失败
+            queue_path (str, optional): 队列文件路径，默认为当前目录下的download_queue.json
+            max_workers (int): 同时运行的最大任务数
+        """
+        if queue_path is None:
+            self.queue_path = os.path.join(os.getcwd(), "download_queue.json")
+        else:
+            self.queue_path = queue_path
+        self.handler = handler
+        self.max_workers = max(1, int(max_workers))
+        self.jobs = []
+        self.listeners = []
+        self.running_count = 0
+        self.started = False
+        self.condition = threading.Condition()
+        self.save_lock = threading.Lock()
+        self.workers = []
+        self.load_queue()
+
+    def load_queue(self):
+        """
+        从文件加载队列，上次退出时仍在运行的任务重新置为等待
+        """
+        if not os.path.exists(self.queue_path):
+            return
+
+        try:
+            with open(self.queue_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"读取下载队列失败: {str(e)}")
+            return
+
+        for item in data.get("jobs", []):
+            job = DownloadJob.from_dict(item)
+            if job.status == STATUS_RUNNING:
+                job.status = STATUS_PENDING
+            self.jobs.append(job)
+
+    def save_queue(self):
+        """
+        原子地保存队列到文件（先写临时文件再替换）
+        """
+        with self.save_lock:
+            with self.condition:
+                data = {"jobs": [job.to_dict() for job in self.jobs]}
+
+            tmp_path = f"{self.queue_path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.queue_path)
+            except Exception as e:
+                print(f"保存下载队列失败: {str(e)}")
+
+    def add_listener(self, listener):
+        """
+        注册任务事件监听器
+
+        Args:
+            listener (callable): 接收 (event, job)，event 为 "added"、"started"、"updated"、"progress"、"finished"、"processed"（PDF/长图生成完成）、"cancelled"、"paused"、"resumed"；
+                运行中的任务被暂停或取消时以 "finished" 通知，状态为 paused 或 cancelled
+        """
+        self.listeners.append(listener)
+
+    def emit(self, event, job):
+        for listener in list(self.listeners):
+            try:
+                listener(event, job)
+            except Exception as e:
+                print(f"队列事件处理失败: {str(e)}")
+
+    def enqueue(self, album_id, mode=MODE_DOWNLOAD):
+        """
+        添加单个下载任务
+
+        Args:
+            album_id (str): 本子ID
+            mode (str): 任务模式
+
+        Returns:
+            DownloadJob: 新任务；若该本子已在队列中则返回已有任务
+        """
+        return self.enqueue_many([album_id], mode)[0]
+
+    def enqueue_many(self, album_ids, mode=MODE_DOWNLOAD):
+        """
+        批量添加下载任务，已在队列中的本子不会重复添加，已暂停的本子恢复下载
+
+        Args:
+            album_ids (list): 本子ID列表
+            mode (str): 任务模式
+
+        Returns:
+            list: 与album_ids一一对应的任务列表
+        """
+        result = []
+        added = []
+        resumed = []
+        with self.condition:
+            active = {job.album_id: job for job in self.jobs if job.active or job.status == STATUS_PAUSED}
+            for album_id in album_ids:
+                album_id = str(album_id)
+                job = active.get(album_id)
+                if job is None:
+                    job = DownloadJob(album_id, mode=mode)
+                    self.jobs.append(job)
+                    active[album_id] = job
+                    added.append(job)
+                elif job.status == STATUS_PAUSED:
+                    job.status = STATUS_PENDING
+                    resumed.append(job)
+                result.append(job)
+            self.condition.notify_all()
+
+        if added or resumed:
+            self.save_queue()
+            for job in added:
+                self.emit("added", job)
+            for job in resumed:
+                self.emit("resumed", job)
+        return result
+
+    def get_job(self, job_id):
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id == job_id:
+                    return job
+        return None
+
+    def list_jobs(self):
+        with self.condition:
+            return list(self.jobs)
+
+    def pending_jobs(self, limit):
+        """
+        排在最前的等待中任务
+
+        Args:
+            limit (int): 最多返回的数量
+
+        Returns:
+            list: 任务列表
+        """
+        jobs = []
+        with self.condition:
+            for job in self.jobs:
+                if job.status == STATUS_PENDING:
+                    jobs.append(job)
+                    if len(jobs) >= limit:
+                        break
+        return jobs
+
+    def stats(self):
+        """
+        统计各状态任务数
+
+        Returns:
+            dict: 状态 -> 数量
+        """
+        counts = {status: 0 for status in STATUS_DISPLAY}
+        with self.condition:
+            for job in self.jobs:
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def cancel(self, job_id):
+        """
+        取消任务：等待中、已暂停的任务直接取消；运行中的任务发出取消信号，
+        下载线程中断后状态变为已取消（已下载的图片保留在清单中，之后重新下载时跳过）
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            bool: 是否已取消；任务不存在或已结束时返回False
+        """
+        return self.stop_job(job_id, STATUS_CANCELLED)
+
+    def pause(self, job_id):
+        """
+        暂停任务：等待中的任务不再开始；运行中的任务发出暂停信号，中断后状态变为已暂停，
+        释放下载线程和带宽，恢复后按下载清单从中断处继续
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            bool: 是否已暂停；任务不存在或不在等待、运行状态时返回False
+        """
+        return self.stop_job(job_id, STATUS_PAUSED)
+
+    def stop_job(self, job_id, status):
+        allowed = (STATUS_PENDING, STATUS_RUNNING, STATUS_PAUSED) if status == STATUS_CANCELLED else \
+            (STATUS_PENDING, STATUS_RUNNING)
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None or job.status not in allowed:
+                return False
+            control = job.control if job.status == STATUS_RUNNING else None
+            if control is None:
+                job.status = status
+                if status == STATUS_CANCELLED:
+                    job.finished_at = time.time()
+
+        if control is not None:
+            # 状态由 run_job 在下载线程中断后更新
+            if status == STATUS_PAUSED:
+                control.pause()
+            else:
+                control.cancel()
+            return True
+        self.save_queue()
+        self.emit(status, job)
+        return True
+
+    def resume(self, job_id):
+        """
+        恢复已暂停的任务，重新排队
+
+        Returns:
+            bool: 是否已恢复；任务不存在或未暂停时返回False
+        """
+        with self.condition:
+            job = self.get_job(job_id)
+            if job is None or job.status != STATUS_PAUSED:
+                return False
+            job.status = STATUS_PENDING
+            self.condition.notify_all()
+
+        self.save_queue()
+        self.emit("resumed", job)
+        return True
+
+    def clear_finished(self):
+        """移除已结束的任务（保留已暂停的任务）"""
+        with self.condition:
+            self.jobs = [job for job in self.jobs if job.active or job.status == STATUS_PAUSED]
+        self.save_queue()
+
+    def set_max_workers(self, max_workers):
+        """
+        调整并发上限，立即生效
+
+        Args:
+            max_workers (int): 同时运行的最大任务数
+        """
+        with self.condition:
+            self.max_workers = max(1, int(max_workers))
+            self.spawn_workers()
+            self.condition.notify_all()
+
+    def start(self):
+        """启动工作线程，开始处理队列中的任务"""
+        with self.condition:
+            self.started = True
+            self.spawn_workers()
+            self.condition.notify_all()
+
+    def halt(self):
+        """不再开始新的任务，正在运行的任务不受影响（再次调用 start 后继续）"""
+        with self.condition:
+            self.started = False
+
+    def spawn_workers(self):
+        # 需持有 self.condition
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+        while len(self.workers) < self.max_workers:
+            worker = threading.Thread(target=self.worker_loop, daemon=True)
+            self.workers.append(worker)
+            worker.start()
+
+    def next_job(self):
+        # 需持有 self.condition
+        if not self.started or self.running_count >= self.max_workers:
+            return None
+        for job in self.jobs:
+            if job.status == STATUS_PENDING:
+                return job
+        return None
+
+    def worker_loop(self):
+        while True:
+            with self.condition:
+                job = self.next_job()
+                while job is None:
+                    # 并发上限调低后，多余的线程退出
+                    if len(self.workers) > self.max_workers:
+                        self.workers.remove(threading.current_thread())
+                        return
+                    self.condition.wait()
+                    job = self.next_job()
+                job.status = STATUS_RUNNING
+                job.error = None
+                job.progress = None
+                job.control = JobControl()
+                self.running_count += 1
+
+            self.save_queue()
+            self.emit("started", job)
+            self.run_job(job)
+
+    def run_job(self, job):
+        try:
+            self.handler(job)
+            job.status = STATUS_DONE
+        except JobStopped as e:
+            job.status = STATUS_PAUSED if e.reason == STOP_PAUSE else STATUS_CANCELLED
+        except Exception as e:
+            job.status = STATUS_FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self.condition:
+                job.control = None
+                self.running_count -= 1
+                self.condition.notify_all()
+            self.save_queue()
+            self.emit("finished", job)
+
+    def update_job(self, job, event="updated"):
+        """任务信息（如标题）变化后调用，持久化并通知监听器"""
+        self.save_queue()
+        self.emit(event, job)
+
+    def report_progress(self, job, progress):
+        """
+        更新任务的下载进度并通知监听器（不写盘）
+
+        Args:
+            job (DownloadJob): 任务
+            progress (dict): 进度快照
+        """
+        job.progress = progress
+        self.emit("progress", job)
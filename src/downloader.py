@@ -0,0 +1,255 @@
+from jmcomic import JmDownloader, JmModuleConfig
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from metrics import current_trace, trace_local, use_trace
+from job_control import use_control
+
+
+class ManagedDownloader(JmDownloader):
+    """
+    JMComicManager 使用的下载器，在 JmDownloader 的基础上接入应用自身的缓存、断点续传等功能
+    """
+
+    def __init__(self, option, client=None, album=None, manifest=None, photo_ids=None, progress=None,
+                 domain_health=None, image_store=None, metrics=None, trace=None, concurrency=None, control=None):
+        """
+        Args:
+            option: JmOption
+            client (JmcomicClient, optional): 共用的客户端（及其连接池），默认由 option 创建
+            album (JmAlbumDetail, optional): 已获取的本子详情，传入后下载时不再重复请求
+            manifest (AlbumManifest, optional): 下载完成清单，用于跳过已完成的章节和图片
+            photo_ids (set, optional): 只下载这些章节，用于同步模式
+            progress (DownloadProgress, optional): 下载进度，在各回调中更新
+            domain_health (DomainHealth, optional): 域名健康检测，用于选择图片域名并记录失败
+            image_store (ImageStore, optional): 图片仓库，已收录的图片直接链接，不再下载
+            metrics (AppMetrics, optional): 运行指标，记录图片、插件的耗时
+            trace (JobTrace, optional): 任务追踪，章节、图片线程中的请求和耗时记录到其中
+            concurrency (AlbumConcurrency, optional): 本子内的章节、图片并发，默认按 option 的 download.threading
+            control (JobControl, optional): 任务的暂停、取消信号，章节、图片开始前以及请求时检查
+        """
+        # create_client 在父类构造函数中调用
+        self.shared_client = client
+        super().__init__(option)
+        self.album = album
+        self.manifest = manifest
+        self.photo_ids = photo_ids
+        self.progress = progress
+        self.domain_health = domain_health
+        self.image_store = image_store
+        self.metrics = metrics
+        self.trace = trace
+        self.concurrency = concurrency
+        self.control = control
+
+    def create_client(self):
+        if self.shared_client is not None:
+            return self.shared_client
+        return super().create_client()
+
+    def download_album(self, album_id):
+        if self.album is None or str(self.album.album_id) != str(album_id):
+            return super().download_album(album_id)
+
+        # 复用已获取的本子详情，跳过一次网络请求
+        album = self.album
+        if hasattr(self, "begin_manifest"):
+            # jmcomic>=2.7 需要为顶层下载登记下载清单
+            self.begin_manifest(album)
+            try:
+                self.download_by_album_detail(album)
+            finally:
+                self.finish_manifest(album)
+        else:
+            self.download_by_album_detail(album)
+        return album
+
+    @contextmanager
+    def track_plugins(self, stage):
+        """记录回调（主要是 jmcomic 插件）的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            if self.metrics is not None:
+                self.metrics.plugin_seconds.observe(end - begin, stage)
+            trace = current_trace()
+            if trace is not None:
+                trace.add_span(stage, "plugin", begin, end)
+
+    def execute_on_condition(self, iter_objs, apply, count_batch, *args, **kwargs):
+        if self.concurrency is not None:
+            count_batch = self.concurrency.batch_count(getattr(apply, "__name__", ""), count_batch)
+        return super().execute_on_condition(iter_objs, apply, count_batch, *args, **kwargs)
+
+    def check_stopped(self):
+        """任务被暂停或取消时中断当前章节、图片"""
+        if self.control is None or not self.control.stopped:
+            return
+        if hasattr(JmDownloader, "raise_if_cancelled"):
+            # jmcomic>=2.7 抛出其 DownloadCancelledException，不计为下载失败
+            self.raise_if_cancelled()
+        self.control.check()
+
+    def download_by_photo_detail(self, photo):
+        self.check_stopped()
+        # 章节在 jmcomic 的线程池中下载，需要在该线程中设置任务追踪和控制信号
+        with use_trace(self.trace), use_control(self.control):
+            if self.trace is None:
+                return super().download_by_photo_detail(photo)
+            with self.trace.span(f"章节 {photo.photo_id}", "photo", photo_id=photo.photo_id):
+                return super().download_by_photo_detail(photo)
+
+    def do_filter(self, detail):
+        if detail.is_album():
+            return self.filter_photos(super().do_filter(detail))
+        if detail.is_photo():
+            return self.filter_images(detail, super().do_filter(detail))
+        return super().do_filter(detail)
+
+    def filter_photos(self, photos):
+        """过滤掉同步模式未选中的章节以及清单中已完成的章节（连章节详情也不再请求）"""
+        if self.photo_ids is not None:
+            photos = [photo for photo in photos if photo.photo_id in self.photo_ids]
+        if self.manifest is not None:
+            photos = [photo for photo in photos if not self.manifest.is_photo_complete(photo.photo_id)]
+        if self.progress is not None:
+            self.progress.set_photos(len(photos))
+        return photos
+
+    def filter_images(self, photo, images):
+        """过滤掉清单中已完成且文件完好的图片"""
+        pending = images
+        if self.manifest is not None:
+            pending = [
+                image for image in images
+                if not self.manifest.is_image_complete(
+                    photo.photo_id,
+                    image.filename,
+                    self.option.decide_image_filepath(image),
+                )
+            ]
+        if self.progress is not None:
+            self.progress.add_photo(photo.photo_id, len(images), len(images) - len(pending))
+        return pending
+
+    def before_album(self, album):
+        with self.track_plugins("before_album"):
+            super().before_album(album)
+
+    def before_photo(self, photo):
+        with self.track_plugins("before_photo"):
+            super().before_photo(photo)
+        if getattr(photo, "skip", False):
+            # 被插件跳过的章节不会再调用 after_photo，在此记为完成，否则本子永远不会标记为完成
+            if self.manifest is not None:
+                self.manifest.record_skipped_photo(photo.photo_id)
+            if self.progress is not None:
+                self.progress.photo_done(photo.photo_id)
+            return
+        if self.domain_health is not None and photo.data_original_domain in JmModuleConfig.DOMAIN_IMAGE_LIST:
+            # 移动端客户端随机选择图片域名，改为当前最快的可用域名；域名连续失败后下一章节自动换用其他域名
+            photo.data_original_domain = self.domain_health.best("image", JmModuleConfig.DOMAIN_IMAGE_LIST)
+
+    def get_image_key(self, image, img_save_path):
+        return self.image_store.image_key(image, img_save_path, self.option.decide_download_image_decode(image))
+
+    def before_image(self, image, img_save_path):
+        if self.image_store is not None and not (image.exists and image.cache):
+            if self.image_store.link_known(self.get_image_key(image, img_save_path), img_save_path):
+                # 仓库中已有该图片，按“已存在”处理，跳过下载
+                image.exists = image.cache = True
+            else:
+                self.image_store.release(img_save_path)
+        super().before_image(image, img_save_path)
+
+    def download_by_image_detail(self, image):
+        slot = self.concurrency.image_slot() if self.concurrency is not None else nullcontext()
+        with use_trace(self.trace), use_control(self.control), slot:
+            self.check_stopped()
+            trace_local.last_request_end = None
+            trace_local.request_errors = 0
+            # 开始前就已存在且按缓存复用的文件不会被改写，其余情况中断时都可能留下未写完的文件
+            img_save_path = self.option.decide_image_filepath(image)
+            reusable = os.path.exists(img_save_path) and self.option.decide_download_cache(image)
+            begin = time.perf_counter()
+            try:
+                result = super().download_by_image_detail(image)
+            except Exception:
+                if not reusable:
+                    self.remove_partial_image(img_save_path)
+                if self.control is not None and self.control.stopped:
+                    # 被暂停或取消而中止的请求不计为失败
+                    raise
+                if self.domain_health is not None:
+                    self.domain_health.record("image", image.from_photo.data_original_domain, error=True)
+                if self.metrics is not None:
+                    self.metrics.images.inc("failed")
+                if self.concurrency is not None:
+                    self.concurrency.record(time.perf_counter() - begin, error=True)
+                raise
+            self.record_image_timing(image, begin, time.perf_counter())
+            if trace_local.last_request_end is not None:
+                # 只按图片请求本身调整并发、记录域名状态，本地已有而未请求的图片不计入
+                if self.domain_health is not None:
+                    self.domain_health.record("image", image.from_photo.data_original_domain)
+                if self.concurrency is not None:
+                    self.concurrency.record(trace_local.last_request_end - begin, error=trace_local.request_errors > 0)
+            return result
+
+    def remove_partial_image(self, path):
+        """下载失败或中断时删除本次写入、可能未完成的图片文件，避免之后被当作已下载的图片跳过"""
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"删除未完成的图片失败: {str(e)}")
+
+    def record_image_timing(self, image, begin, end):
+        """记录单张图片的耗时；请求结束之后的部分为解码和写入"""
+        if getattr(image, "skip", False):
+            return
+        reused = getattr(image, "exists", False) and getattr(image, "cache", False)
+        request_end = None if reused else trace_local.last_request_end
+        if self.metrics is not None:
+            self.metrics.images.inc("reused" if reused else "downloaded")
+            self.metrics.image_seconds.observe(end - begin, "total")
+            if request_end is not None:
+                self.metrics.image_seconds.observe(end - request_end, "save")
+        if self.trace is not None:
+            self.trace.add_span(f"图片 {image.filename}", "image", begin, end, reused=reused)
+            if request_end is not None:
+                self.trace.add_span("解码/写入", "image", request_end, end)
+
+    def after_image(self, image, img_save_path):
+        super().after_image(image, img_save_path)
+        sha1 = None
+        if self.image_store is not None:
+            try:
+                # 已是仓库文件硬链接的图片不再重复收录
+                if os.stat(img_save_path).st_nlink == 1:
+                    sha1 = self.image_store.ingest(self.get_image_key(image, img_save_path), img_save_path)
+            except Exception as e:
+                print(f"图片收录到仓库失败: {str(e)}")
+        if self.manifest is not None:
+            self.manifest.record_image(image.from_photo.photo_id, image.filename, img_save_path, sha1)
+        if self.progress is not None:
+            # 本地已存在而未下载的图片不计入下载字节数
+            reused = getattr(image, "exists", False) and getattr(image, "cache", False)
+            size = 0 if reused or not os.path.exists(img_save_path) else os.path.getsize(img_save_path)
+            self.progress.image_done(size)
+
+    def after_photo(self, photo):
+        if self.manifest is not None:
+            self.manifest.record_photo(photo.photo_id, len(photo))
+        if self.progress is not None:
+            self.progress.photo_done(photo.photo_id)
+        with self.track_plugins("after_photo"):
+            super().after_photo(photo)
+
+    def after_album(self, album):
+        if self.manifest is not None:
+            self.manifest.record_album([photo.photo_id for photo in album])
+        with self.track_plugins("after_album"):
+            super().after_album(album)
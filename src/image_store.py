@@ -0,0 +1,206 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from download_manifest import file_sha1
+
+
+class ImageStore:
+    def __init__(self, store_dir):
+        """
+        按内容寻址的图片仓库：每张图片按SHA1只保存一份，本子目录中的图片是指向仓库文件的硬链接
+
+        索引数据库记录 图片标识（章节ID/文件名）-> SHA1，已收录的图片再次下载时直接链接，不再请求网络；
+        不同本子中内容相同的图片（重新上传、合集、汉化版）共用同一份文件
+
+        Args:
+            store_dir (str): 仓库目录，需与下载目录在同一文件系统上才能使用硬链接
+        """
+        self.store_dir = store_dir
+        self.db_path = os.path.join(store_dir, "index.db")
+        os.makedirs(store_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        # link_known 的命中、未命中次数
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha1 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                image_key TEXT PRIMARY KEY,
+                sha1 TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS images_sha1 ON images (sha1);
+            """
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def image_key(image, save_path, decoded=True):
+        """
+        图片标识：章节ID/文件名，加上保存格式和是否解码，同一张图片按不同设置保存时互不混用
+
+        Args:
+            image (JmImageDetail): 图片
+            save_path (str): 保存路径
+            decoded (bool): 是否还原了分割打乱的图片
+        """
+        suffix = os.path.splitext(save_path)[1].lower()
+        return f"{image.aid}/{image.filename}>{suffix}{'' if decoded else ':raw'}"
+
+    def get_blob_path(self, sha1):
+        return os.path.join(self.store_dir, sha1[:2], sha1)
+
+    def find_blob(self, sha1):
+        """
+        仓库中的文件路径，文件缺失或大小不符时返回None
+
+        Returns:
+            tuple: (路径, 大小) 或 None
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT size FROM blobs WHERE sha1 = ?", (sha1,)).fetchone()
+        if row is None:
+            return None
+        path = self.get_blob_path(sha1)
+        try:
+            if os.path.getsize(path) == row[0]:
+                return path, row[0]
+        except OSError:
+            pass
+        return None
+
+    def lookup(self, image_key):
+        """
+        按图片标识查找仓库文件
+
+        Returns:
+            str: 仓库文件路径，未收录时返回None
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT sha1 FROM images WHERE image_key = ?", (image_key,)).fetchone()
+        if row is None:
+            return None
+        blob = self.find_blob(row[0])
+        return blob[0] if blob else None
+
+    def link_known(self, image_key, target_path):
+        """
+        图片已收录时直接链接到目标路径，代替下载
+
+        Returns:
+            bool: 是否已链接
+        """
+        blob_path = self.lookup(image_key)
+        linked = blob_path is not None
+        if linked:
+            try:
+                if not (os.path.exists(target_path) and os.path.samefile(blob_path, target_path)):
+                    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                    self.place(blob_path, target_path)
+            except OSError as e:
+                print(f"链接仓库图片失败: {str(e)}")
+                linked = False
+        with self.lock:
+            if linked:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return linked
+
+    @staticmethod
+    def place(src, dst):
+        """将 src 以硬链接的方式放到 dst（原子替换），不支持硬链接时复制"""
+        tmp_path = f"{dst}.link"
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+    def ingest(self, image_key, file_path):
+        """
+        收录刚下载的图片：内容已在仓库中时把文件换成指向仓库文件的硬链接，否则将文件链接进仓库
+
+        Args:
+            image_key (str): 图片标识
+            file_path (str): 下载保存的文件
+
+        Returns:
+            str: 文件的SHA1
+        """
+        sha1 = file_sha1(file_path)
+        blob = self.find_blob(sha1)
+        if blob is not None:
+            if not os.path.samefile(blob[0], file_path):
+                self.place(blob[0], file_path)
+        else:
+            blob_path = self.get_blob_path(sha1)
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            self.place(file_path, blob_path)
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO blobs (sha1, size, created_at) VALUES (?, ?, ?)",
+                    (sha1, os.path.getsize(blob_path), time.time()),
+                )
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO images (image_key, sha1) VALUES (?, ?)", (image_key, sha1))
+            self.conn.commit()
+        return sha1
+
+    def release(self, file_path):
+        """
+        即将覆盖写入的文件若是仓库文件的硬链接，先断开链接，避免改写仓库和其他本子中的同一文件
+        """
+        try:
+            if os.stat(file_path).st_nlink > 1:
+                os.remove(file_path)
+        except OSError:
+            pass
+
+    def prune(self):
+        """
+        删除已没有本子引用（硬链接数为1）的仓库文件及其索引
+
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT sha1, size FROM blobs").fetchall()
+        removed = []
+        freed = 0
+        for sha1, size in rows:
+            path = self.get_blob_path(sha1)
+            try:
+                if os.stat(path).st_nlink > 1:
+                    continue
+                os.remove(path)
+                freed += size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"删除仓库文件失败: {str(e)}")
+                continue
+            removed.append((sha1,))
+        with self.lock:
+            self.conn.executemany("DELETE FROM images WHERE sha1 = ?", removed)
+            self.conn.executemany("DELETE FROM blobs WHERE sha1 = ?", removed)
+            self.conn.commit()
+        return len(removed), freed
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,46 +1,728 @@
+import importlib.util
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
 from typing import Optional
-from option import OptionManager
+from download_queue import MODE_SYNC, STATUS_DONE, STATUS_PENDING, STATUS_RUNNING
+from download_manifest import AlbumManifest
+from download_progress import DownloadProgress
+from metrics import AppMetrics, current_trace, use_trace
+from concurrency import DownloadConcurrency
+from scheduler import LANE_COVER, LANE_INTERACTIVE, use_lane
+from job_control import JobStopped, current_control, use_control
+from startup_profile import profiler
 
-try:
+# jmcomic 及其网络库导入较慢，这里只检查是否已安装，在 initialize 的后台线程中再导入
+JMCOMIC_AVAILABLE = importlib.util.find_spec("jmcomic") is not None
+
+# 最多记住多少个尝试过预取封面的本子，超出时忘记最久未用到的
+COVER_PREFETCHED_LIMIT = 1000
+
+
+def load_jmcomic():
+    """
+    导入 jmcomic，并用流式实现替换长图、PDF插件（内存占用与本子页数无关）
+
+    Returns:
+        module: jmcomic
+    """
     import jmcomic
-    from jmcomic import  JmModuleConfig
-    JMCOMIC_AVAILABLE = True
-except ImportError:
-    JMCOMIC_AVAILABLE = False
+    from album_export import register_streaming_plugins
+    register_streaming_plugins()
+    return jmcomic
+
+
+def is_not_found(error):
+    """
+    请求是否因资源不存在（HTTP 404）而失败；jmcomic 重试全部失败时，每次重试都是404才算
+
+    Args:
+        error (Exception): jmcomic 抛出的异常
+    """
+    errors = getattr(error, "errors", None)
+    if errors:
+        return all(is_not_found(item.get("error")) for item in errors)
+    try:
+        return error.resp.http_code == 404
+    except Exception:
+        return False
 
 
 class JMComicManager:
-    def __init__(self):
+    def __init__(self, max_concurrent_downloads=2, album_cache_ttl=86400, album_cache_size=5000, option_path=None,
+                 domain_probe_interval=1800, pool_options=None, cover_cache_size=50 * 1024 * 1024,
+                 prefetch_covers=False, post_process_options=None, use_image_store=False, trace_jobs=20,
+                 trace_dir=None, concurrency_options=None, prefetch_cover_count=5, log=None):
         self.available = JMCOMIC_AVAILABLE
+        self.option_path = option_path
         self.option = None
+        # 去掉了 PDF/长图 插件的下载用选项，转换交给后处理进程
+        self.download_option = None
+        self.post_process_option = None
         self.client = None
+        self.client_domains = []
         self.initialized = False
-    
+        # initialize 的耗时（秒）
+        self.init_seconds = None
+        # 以下读写磁盘的组件在 setup_components 中创建（界面启动时在后台线程中执行），创建前为None
+        # 域名延迟探测，请求优先发往最快的可用域名
+        self.domain_health = None
+        self.domain_probe_interval = domain_probe_interval
+        # 详情、封面、图片请求共用的连接池，参数见 ConnectionPool，初始化时创建
+        self.pool_options = pool_options or {}
+        self.connection_pool = None
+        # 下载限速器，初始化时按 option.yml 的 rate_limit 创建
+        self.rate_limiter = None
+        # 运行中的提示（如被限流）写入的日志函数，界面和命令行传入各自的日志，默认 print
+        self.log = log or print
+        # 本子详情缓存，避免解析、下载时重复请求
+        self.album_cache = None
+        self.album_cache_options = {"ttl": album_cache_ttl, "max_entries": album_cache_size}
+        # 封面缩略图缓存；prefetch_covers 为True时在后台预取排在最前的 prefetch_cover_count 个等待中任务的封面
+        self.cover_cache = None
+        self.cover_cache_size = cover_cache_size
+        self.prefetch_covers = prefetch_covers
+        self.prefetch_cover_count = max(1, int(prefetch_cover_count))
+        # 已预取的等待中任务，以及尝试过预取的本子（失败时不再重试），按最近用到的顺序排列，最多 COVER_PREFETCHED_LIMIT 个
+        self.cover_prefetch_jobs = []
+        self.cover_prefetched = OrderedDict()
+        self.cover_prefetch_lock = threading.Lock()
+        # PDF、长图转换队列，参数见 PostProcessor
+        self.post_processor = None
+        self.post_process_options = post_process_options or {}
+        # 按内容寻址的图片仓库（可选），在下载目录确定后创建
+        self.use_image_store = use_image_store
+        self.image_store = None
+        # 书库索引，记录解析过的本子信息和已下载的文件
+        self.library = None
+        # 本子内章节、图片的下载并发，所有本子合计的图片并发自动调整，参数见 DownloadConcurrency
+        self.concurrency = DownloadConcurrency(**(concurrency_options or {}))
+        # 下载队列，初始化完成后才开始处理任务；创建前注册的监听器在创建时加入
+        self.queue = None
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self.queue_listeners = [self.on_queue_event]
+        self.components_lock = threading.Lock()
+        # 运行指标（控制接口 /metrics）和任务追踪，参数见 AppMetrics
+        self.metrics = AppMetrics(trace_jobs=trace_jobs, trace_dir=trace_dir, log=self.log)
+
+    def setup_components(self):
+        """
+        创建下载队列（读取队列文件）、详情缓存（打开 SQLite）、域名探测（读取探测结果）等组件，重复调用时不再创建
+
+        界面在 initialize 的后台线程中调用，首帧前不读写磁盘；命令行创建 JMComicManager 后立即调用
+        """
+        with self.components_lock:
+            if self.queue is not None:
+                return
+            from album_cache import AlbumCache
+            from cover_cache import CoverCache
+            from domain_health import DomainHealth
+            from download_queue import DownloadQueue
+            from post_processor import PostProcessor
+
+            with profiler.phase("读取缓存与下载队列"):
+                self.domain_health = DomainHealth(interval=self.domain_probe_interval)
+                self.album_cache = AlbumCache(**self.album_cache_options)
+                self.cover_cache = CoverCache(self.fetch_cover_image, max_bytes=self.cover_cache_size)
+                self.post_processor = PostProcessor(**self.post_process_options)
+                queue = DownloadQueue(self.run_download_job, max_workers=self.max_concurrent_downloads)
+                for listener in self.queue_listeners:
+                    queue.add_listener(listener)
+                self.queue = queue
+            self.setup_metrics()
+
+    def add_queue_listener(self, listener):
+        """
+        注册下载队列事件监听器，队列尚未创建时在创建后加入
+
+        Args:
+            listener (callable): 见 DownloadQueue.add_listener
+        """
+        with self.components_lock:
+            if self.queue is None:
+                self.queue_listeners.append(listener)
+                return
+        self.queue.add_listener(listener)
+
+    def setup_metrics(self):
+        """队列、缓存等组件已有的统计在输出指标时读取"""
+        self.metrics.queue_jobs.set_function(
+            lambda: {(status,): count for status, count in self.queue.stats().items()}
+        )
+        self.metrics.post_process_pending.set_function(self.post_processor.pending_count)
+        self.metrics.download_speed.set_function(
+            lambda: sum(
+                (job.progress or {}).get("speed", 0) for job in self.queue.list_jobs() if job.status == STATUS_RUNNING
+            )
+        )
+
+        def cache_requests():
+            caches = {"album": self.album_cache, "cover": self.cover_cache, "image_store": self.image_store}
+            values = {}
+            for name, cache in caches.items():
+                if cache is not None:
+                    values[(name, "hit")] = cache.hits
+                    values[(name, "miss")] = cache.misses
+            return values
+
+        self.metrics.cache_requests.set_function(cache_requests)
+        image_limit = self.concurrency.image_limit
+        self.metrics.image_concurrency.set_function(
+            lambda: {("limit",): image_limit.current, ("in_flight",): image_limit.in_flight}
+        )
+
     async def initialize(self):
-        """异步初始化JMComic库"""
+        """
+        异步初始化JMComic库：导入 jmcomic、读取选项、创建客户端都在后台线程中执行，不阻塞事件循环
+        """
+        import asyncio
+
         if self.available:
-            # 使用OptionManager加载配置
-            option_manager = OptionManager()
-            self.option = jmcomic.create_option_by_file(option_manager.option_path)
-            self.client = self.option.build_jm_client()
-            self.initialized = True
-        else:
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.setup)
+            except ImportError as e:
+                print(f"导入 jmcomic 失败: {str(e)}")
+                self.available = False
+            self.init_seconds = time.perf_counter() - started
+        if not self.available:
             self.option = None
             self.client = None
             self.initialized = False
-    
-    def get_album_detail(self, album_id):
-        """获取漫画详情"""
+            # 没有 jmcomic 时仍加载下载队列，供界面显示
+            await asyncio.to_thread(self.setup_components)
+
+    def setup(self):
+        """同步执行的初始化步骤（在后台线程中调用）"""
+        self.setup_components()
+        with profiler.phase("导入 jmcomic"):
+            jmcomic = load_jmcomic()
+            from connection_pool import ConnectionPool, install_connection_pool
+            from rate_limiter import RateLimiter, install_rate_limiter
+            from option import OptionManager
+            from metrics import install_request_metrics
+
+        with profiler.phase("读取 option.yml"):
+            # 使用OptionManager加载配置
+            option_manager = OptionManager(self.option_path)
+            # rate_limit 等字段由本应用处理，不传给 jmcomic
+            self.option = jmcomic.JmOption.construct(option_manager.get_jmcomic_option())
+        with profiler.phase("创建客户端"):
+            self.client = self.option.build_jm_client()
+            self.setup_post_process_option()
+            if self.use_image_store:
+                self.image_store = self.get_image_store()
+            self.connection_pool = ConnectionPool(**self.pool_options)
+            install_connection_pool(self.client, self.connection_pool)
+            # 记录请求数、耗时和字节数，装在限速器内侧，耗时不含限速等待
+            install_request_metrics(self.client, self.metrics)
+            # 所有请求（详情、封面、图片）经过限速器，参数见 option.yml 的 rate_limit
+            self.rate_limiter = RateLimiter(log=self.log, **(option_manager.get("rate_limit") or {}))
+            install_rate_limiter(self.client, self.rate_limiter)
+        self.client_domains = list(self.client.get_domain_list())
+        # 先按上次缓存的探测结果排序，后台探测完成后再重新排序
+        self.apply_domain_ranking()
+        self.domain_health.start(self.get_probe_targets, self.probe_request, self.apply_domain_ranking)
+        self.initialized = True
+        # 按下载目录增量更新书库索引，不阻塞启动
+        with profiler.phase("打开书库索引"):
+            self.get_library()
+        threading.Thread(target=self.rebuild_library, daemon=True).start()
+        self.queue.start()
+        self.prefetch_next_covers()
+
+    def setup_post_process_option(self):
+        """从选项中拆出 after_album 的 PDF/长图 插件，下载完成后交给后处理进程执行"""
+        from post_processor import split_post_process_plugins
+        download_dict, self.post_process_option = split_post_process_plugins(self.option.deconstruct())
+        if self.post_process_option is None:
+            self.download_option = self.option
+        else:
+            from jmcomic import AdvancedDict
+            # 复制选项只替换插件列表：保留 filepath，after_init 插件（如登录）不会再执行一次
+            self.download_option = self.option.copy_option()
+            self.download_option.plugins = AdvancedDict(download_dict["plugins"])
+
+    def get_album_detail(self, album_id, refresh=False):
+        """
+        获取漫画详情，优先读取缓存
+
+        Args:
+            album_id (str): 本子ID
+            refresh (bool): 是否忽略缓存重新请求
+        """
         if not self.available or not self.client:
             raise Exception("JMComic库不可用")
-        return self.client.get_album_detail(album_id)
-    
-    def download_album(self, album_id):
-        """下载漫画"""
+        if not refresh:
+            album = self.album_cache.get(album_id)
+            if album is not None:
+                return album
+
+        begin = time.perf_counter()
+        album = self.client.get_album_detail(album_id)
+        end = time.perf_counter()
+        self.metrics.album_detail_seconds.observe(end - begin)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span("获取本子详情", "album", begin, end, album_id=str(album_id))
+        self.album_cache.put(album_id, album)
+        try:
+            self.get_library().record_album(album)
+        except Exception as e:
+            print(f"更新书库索引失败: {str(e)}")
+        return album
+
+    def parse_album(self, album_id, refresh=False):
+        """
+        界面上的“解析”：以交互通道获取本子详情，下载占满连接池、限速排队时也优先发出
+
+        Args:
+            album_id (str): 本子ID
+            refresh (bool): 是否忽略缓存重新请求
+        """
+        with use_lane(LANE_INTERACTIVE):
+            return self.get_album_detail(album_id, refresh)
+
+    def download_album(self, album_id, album=None, photo_ids=None, progress=None, trace=None, photo_workers=None,
+                       image_workers=None, control=None):
+        """
+        下载漫画
+
+        Args:
+            album_id (str): 本子ID
+            album (JmAlbumDetail, optional): 已获取的本子详情，默认从缓存读取
+            photo_ids (set, optional): 只下载这些章节
+            progress (DownloadProgress, optional): 下载进度
+            trace (JobTrace, optional): 任务追踪，默认为当前线程的追踪记录
+            photo_workers (int, optional): 同时下载的章节数，默认按 concurrency 配置
+            image_workers (int, optional): 本子内同时下载的图片数，默认按 concurrency 配置（仍受所有本子合计的上限限制）
+            control (JobControl, optional): 暂停、取消信号，默认为当前线程的控制信号；中断时抛出 JobStopped
+
+        Returns:
+            Future: 后处理（PDF、长图）任务，没有后处理插件时为None
+        """
         if not self.available or not self.option:
             raise Exception("JMComic库不可用")
-        jmcomic.download_album(album_id, self.option)
-    
+        import jmcomic
+        from downloader import ManagedDownloader
+        if trace is None:
+            trace = current_trace()
+        if control is None:
+            control = current_control()
+        if album is None:
+            album = self.get_album_detail(album_id)
+        kwargs = {}
+        if control is not None and hasattr(jmcomic, "DownloadControl"):
+            # jmcomic>=2.7 自身的检查点也随任务中断
+            kwargs["control"] = jmcomic.DownloadControl()
+            control.attach(kwargs["control"])
+        # 下载清单记录已完成的章节和图片，中断后再次下载时跳过
+        manifest = self.get_album_manifest(album_id)
+        try:
+            jmcomic.download_album(
+                album_id,
+                self.download_option,
+                downloader=partial(
+                    ManagedDownloader,
+                    client=self.client,
+                    album=album,
+                    manifest=manifest,
+                    photo_ids=photo_ids,
+                    progress=progress,
+                    domain_health=self.domain_health,
+                    image_store=self.image_store,
+                    metrics=self.metrics,
+                    trace=trace,
+                    concurrency=self.concurrency.for_album(photo_workers, image_workers),
+                    control=control,
+                ),
+                **kwargs,
+            )
+        except Exception as e:
+            if control is not None and control.stopped:
+                raise JobStopped(control.reason) from e
+            raise
+        finally:
+            manifest.flush(force=True)
+            if progress is not None:
+                progress.finish()
+        if control is not None:
+            # 旧版本 jmcomic 在线程池中吞掉章节、图片线程的异常，这里再检查一次
+            control.check()
+
+        self.update_library_files(album)
+        if self.post_process_option is not None:
+            submitted = time.perf_counter()
+            future = self.post_processor.submit(self.post_process_option, album)
+            future.add_done_callback(partial(self.on_post_process_done, album, trace, submitted))
+            return future
+        return None
+
+    def on_post_process_done(self, album, trace, submitted, future):
+        """记录 PDF/长图 生成耗时；生成后可能删除了原图，重新记录书库中的文件"""
+        end = time.perf_counter()
+        error = future.exception()
+        self.metrics.post_process_seconds.observe(end - submitted, "failed" if error else "done")
+        if trace is not None:
+            trace.add_span("PDF/长图", "post_process", submitted, end, error=str(error) if error else None)
+            # 任务的追踪记录在生成完成后才保存
+            self.metrics.finish_trace(trace)
+        self.update_library_files(album)
+
+    def find_missing_photos(self, album):
+        """
+        对比本子的章节列表与本地文件，找出新增或未完成的章节
+
+        章节在下载清单中标记完成（包括被插件跳过的章节），或（没有清单记录的旧下载）按 dir_rule 得到的章节目录非空，视为已存在
+
+        Args:
+            album (JmAlbumDetail): 本子详情
+
+        Returns:
+            list: 需要下载的章节ID
+        """
+        manifest = self.get_album_manifest(album.album_id)
+        missing = []
+        for photo in album:
+            if manifest.is_photo_complete(photo.photo_id):
+                continue
+            if not manifest.has_photo(photo.photo_id):
+                photo_dir = self.option.decide_image_save_dir(photo, ensure_exists=False)
+                if os.path.isdir(photo_dir) and os.listdir(photo_dir):
+                    continue
+            missing.append(photo.photo_id)
+        return missing
+
+    def sync_album(self, album_id, album=None, progress=None):
+        """
+        同步本子：重新获取章节列表，只下载新增或未完成的章节
+
+        Args:
+            album_id (str): 本子ID
+            album (JmAlbumDetail, optional): 刚获取的最新本子详情，默认重新请求
+            progress (DownloadProgress, optional): 下载进度
+
+        Returns:
+            tuple: (本次下载的章节ID列表，已是最新时为空; 后处理任务或None)
+        """
+        if not self.available or not self.option:
+            raise Exception("JMComic库不可用")
+        if album is None:
+            album = self.get_album_detail(album_id, refresh=True)
+        missing = self.find_missing_photos(album)
+        future = None
+        if missing:
+            future = self.download_album(album_id, album, photo_ids=set(missing), progress=progress)
+            # 旧下载中没有记录的章节可能只是被插件跳过，本次下载后已记入清单，不算作新下载的章节
+            manifest = self.get_album_manifest(album_id)
+            missing = [photo_id for photo_id in missing if not manifest.is_photo_skipped(photo_id)]
+        return missing, future
+
+    def sync_library(self):
+        """
+        将下载目录中的全部本子加入同步队列
+
+        Returns:
+            list: 同步任务
+        """
+        album_ids = sorted(self.album_dir_ids(), key=int)
+        if not album_ids:
+            return []
+        return self.queue.enqueue_many(album_ids, MODE_SYNC)
+
+    def get_album_manifest(self, album_id):
+        """获取本子的下载完成清单，保存在下载目录的 .manifest 文件夹中"""
+        return AlbumManifest(album_id, os.path.join(self.get_base_dir(), ".manifest"))
+
+    def get_image_store(self):
+        """图片仓库，保存在下载目录的 .store 文件夹中，与本子目录位于同一文件系统以便使用硬链接"""
+        if self.image_store is None:
+            from image_store import ImageStore
+            self.image_store = ImageStore(os.path.join(self.get_base_dir(), ".store"))
+        return self.image_store
+
+    def get_library(self):
+        """书库索引，保存在下载目录的 .library.db 中"""
+        if self.library is None:
+            from library_index import LibraryIndex
+            self.library = LibraryIndex(os.path.join(self.get_base_dir(), ".library.db"))
+        return self.library
+
+    def update_library_files(self, album):
+        """
+        下载完成后重新扫描本子的文件并写入书库索引
+
+        章节目录的上一级若是下载目录中的 JM{id}-* 文件夹，记录为本子目录，之后可增量重建
+        """
+        try:
+            base_dir = os.path.abspath(self.get_base_dir())
+            photo_dirs = [
+                os.path.abspath(self.option.decide_image_save_dir(photo, ensure_exists=False)) for photo in album
+            ]
+            album_dir = os.path.commonpath(photo_dirs) if photo_dirs else None
+            if album_dir is None or os.path.dirname(album_dir) != base_dir or \
+                    not re.match(rf'JM{album.album_id}-', os.path.basename(album_dir)):
+                album_dir = None
+            self.get_library().record_files(
+                album.album_id,
+                [album_dir] if album_dir else [path for path in photo_dirs if os.path.isdir(path)],
+                album_dir,
+                album.name,
+            )
+        except Exception as e:
+            print(f"更新书库索引失败: {str(e)}")
+
+    def rebuild_library(self):
+        """
+        按下载目录增量重建书库索引
+
+        Returns:
+            dict: 见 LibraryIndex.rebuild，失败时为None
+        """
+        try:
+            return self.get_library().rebuild(self.get_base_dir())
+        except Exception as e:
+            print(f"重建书库索引失败: {str(e)}")
+            return None
+
+    def enqueue_download(self, album_ids):
+        """
+        将本子加入下载队列
+
+        Args:
+            album_ids (list): 本子ID列表
+
+        Returns:
+            list: 对应的下载任务
+        """
+        return self.queue.enqueue_many(album_ids)
+
+    def batch_enqueue(self, album_ids):
+        """
+        批量入队，跳过重复、已下载以及已在队列中的本子
+
+        Args:
+            album_ids (list): 本子ID列表（可包含重复项，如 extract_album_ids(text, unique=False) 的结果）
+
+        Returns:
+            dict: added(新任务列表)、duplicate、downloaded、queued 各类跳过数量
+        """
+        unique_ids = list(dict.fromkeys(str(album_id) for album_id in album_ids))
+        downloaded = self.downloaded_album_ids(unique_ids)
+        queued = {job.album_id for job in self.queue.list_jobs() if job.active}
+
+        new_ids = [album_id for album_id in unique_ids if album_id not in downloaded and album_id not in queued]
+        return {
+            "added": self.queue.enqueue_many(new_ids) if new_ids else [],
+            "duplicate": len(album_ids) - len(unique_ids),
+            "downloaded": sum(1 for album_id in unique_ids if album_id in downloaded),
+            "queued": sum(1 for album_id in unique_ids if album_id in queued and album_id not in downloaded),
+        }
+
+    def downloaded_album_ids(self, album_ids=None):
+        """
+        已下载完成的本子ID：队列中已完成的任务，以及下载目录中下载清单标记为完成的本子；
+        没有下载清单的本子（旧版本下载）以书库索引为准。失败、取消或中断后留下的本子目录不计入
+
+        Args:
+            album_ids (list, optional): 只检查这些本子，默认检查下载目录中的全部本子
+
+        Returns:
+            set: 本子ID集合
+        """
+        result = {job.album_id for job in self.queue.list_jobs() if job.status == STATUS_DONE}
+        candidates = self.album_dir_ids()
+        if album_ids is not None:
+            candidates &= {str(album_id) for album_id in album_ids}
+        for album_id in candidates - result:
+            manifest = self.get_album_manifest(album_id)
+            if manifest.completed if manifest.exists else self.get_library().has_album(album_id):
+                result.add(album_id)
+        return result
+
+    def album_dir_ids(self):
+        """
+        下载目录下 JM{id}-* 文件夹对应的本子ID（包括未下载完的）
+
+        Returns:
+            set: 本子ID集合
+        """
+        album_ids = set()
+        base_dir = self.get_base_dir()
+        if os.path.isdir(base_dir):
+            for name in os.listdir(base_dir):
+                match = re.match(r'JM(\d+)-', name)
+                if match:
+                    album_ids.add(match.group(1))
+        return album_ids
+
+    def get_base_dir(self):
+        """下载根目录"""
+        if self.option is not None:
+            return self.option.dir_rule.base_dir
+        from option import OptionManager
+        return OptionManager(self.option_path).get("dir_rule.base_dir", os.path.join(os.getcwd(), "download"))
+
+    def set_max_concurrent_downloads(self, count):
+        """调整同时下载的本子数量"""
+        with self.components_lock:
+            self.max_concurrent_downloads = count
+        if self.queue is not None:
+            self.queue.set_max_workers(count)
+
+    def stop_running_jobs(self, timeout=10):
+        """
+        退出前调用：不再开始新的任务，中断运行中的任务并放回队列，下次启动时从中断处继续
+        （正在进行的请求中止，未写完的图片删除，已下载的图片记录在清单中）
+
+        Args:
+            timeout (float): 最长等待秒数
+
+        Returns:
+            bool: 运行中的任务是否都已中断
+        """
+        if self.queue is None:
+            return True
+        self.queue.halt()
+        running = [job for job in self.queue.list_jobs() if job.status == STATUS_RUNNING]
+        for job in running:
+            self.queue.pause(job.job_id)
+        deadline = time.monotonic() + timeout
+        while any(job.status == STATUS_RUNNING for job in running):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        for job in running:
+            # 队列已停止，重新置为等待不会立即开始
+            self.queue.resume(job.job_id)
+        return True
+
+    def run_download_job(self, job):
+        """队列工作线程执行的下载任务"""
+        trace = self.metrics.start_trace(job)
+        begin = time.perf_counter()
+        future = None
+        try:
+            with use_trace(trace), use_control(job.control):
+                # 同步模式需要最新的章节列表
+                album = self.get_album_detail(job.album_id, refresh=job.mode == MODE_SYNC)
+                job.title = album.name
+                self.queue.update_job(job)
+                # 下载器回调更新进度，经队列以 "progress" 事件通知界面、命令行和控制接口
+                progress = DownloadProgress(job.album_id, on_change=partial(self.queue.report_progress, job))
+                if job.mode == MODE_SYNC:
+                    _, future = self.sync_album(job.album_id, album, progress)
+                else:
+                    future = self.download_album(job.album_id, album, progress=progress)
+        except Exception as e:
+            error = e
+            if job.control is not None and job.control.stopped and not isinstance(e, JobStopped):
+                # 中断时正在进行的请求抛出的异常，按暂停、取消处理
+                error = JobStopped(job.control.reason)
+            if trace is not None:
+                trace.add_instant("中断" if isinstance(error, JobStopped) else "失败", "job", error=str(error))
+            if error is not e:
+                raise error from e
+            raise
+        finally:
+            end = time.perf_counter()
+            self.metrics.album_seconds.observe(end - begin, job.mode)
+            if trace is not None:
+                trace.add_span(f"{job.mode} JM{job.album_id}", "job", begin, end)
+                if future is None:
+                    self.metrics.finish_trace(trace)
+        if future is not None:
+            # 转换在后处理进程中进行，队列线程可以直接开始下一个本子
+            future.add_done_callback(partial(self.on_post_processed, job))
+
+    def on_post_processed(self, job, future):
+        """后处理完成，失败原因记录到任务中，并以 "processed" 事件通知"""
+        error = future.exception()
+        if error is not None:
+            job.error = f"PDF/长图生成失败: {str(error)}"
+        self.queue.update_job(job, "processed")
+
+    def wait_post_processing(self):
+        """等待所有 PDF/长图 转换完成"""
+        self.post_processor.wait()
+
+    def get_probe_targets(self):
+        """需要探测的域名：客户端域名和图片域名"""
+        from jmcomic import JmModuleConfig
+        return {
+            "client": self.client_domains,
+            "image": list(JmModuleConfig.DOMAIN_IMAGE_LIST),
+        }
+
+    def probe_request(self, url, timeout):
+        """使用客户端的请求对象探测，沿用选项中的代理、请求头等设置"""
+        return self.client.postman.get(url, timeout=timeout).status_code
+
+    def apply_domain_ranking(self):
+        """按探测结果重新排列客户端域名，请求失败时客户端会按此顺序切换到下一个域名"""
+        if self.client is not None and self.client_domains:
+            self.client.set_domain_list(self.domain_health.rank("client", self.client_domains))
+
+    def get_best_image_domain(self):
+        from jmcomic import JmModuleConfig
+        return self.domain_health.best("image", JmModuleConfig.DOMAIN_IMAGE_LIST)
+
     def get_album_cover(self, album_id):
-        return f'https://{JmModuleConfig.DOMAIN_IMAGE_LIST[0]}/media/albums/{album_id}.jpg'
\ No newline at end of file
+        return f'https://{self.get_best_image_domain()}/media/albums/{album_id}.jpg'
+
+    def fetch_cover_image(self, album_id):
+        """
+        下载封面原图，依次尝试排序后的图片域名
+
+        Returns:
+            bytes: 图片数据
+        """
+        if not self.available or not self.client:
+            raise Exception("JMComic库不可用")
+        from jmcomic import JmModuleConfig
+        error = None
+        with use_lane(LANE_COVER):
+            for domain in self.domain_health.rank("image", JmModuleConfig.DOMAIN_IMAGE_LIST):
+                try:
+                    content = self.client.get_jm_image(f'https://{domain}/media/albums/{album_id}.jpg').content
+                except Exception as e:
+                    # 本子没有封面（404）不是域名故障
+                    if not is_not_found(e):
+                        self.domain_health.record("image", domain, error=True)
+                    error = e
+                else:
+                    self.domain_health.record("image", domain)
+                    return content
+        raise Exception(f"封面下载失败: {str(error)}")
+
+    def on_queue_event(self, event, job):
+        if event in ("added", "started", "resumed", "paused", "cancelled"):
+            self.prefetch_next_covers()
+
+    def prefetch_next_covers(self):
+        """
+        预取排在最前的 prefetch_cover_count 个等待中任务的封面，入队、任务开始等事件时补充；
+        批量导入大量本子时不会一次下载全部封面，与图片下载争用域名和限速
+        """
+        if not self.prefetch_covers or not self.initialized:
+            return
+        with self.cover_prefetch_lock:
+            waiting = [job for job in self.cover_prefetch_jobs if job.status == STATUS_PENDING]
+            if len(waiting) >= self.prefetch_cover_count:
+                # 最前面的任务都已预取，批量入队时不必每次扫描队列
+                self.cover_prefetch_jobs = waiting
+                return
+            self.cover_prefetch_jobs = self.queue.pending_jobs(self.prefetch_cover_count)
+            album_ids = []
+            for job in self.cover_prefetch_jobs:
+                if job.album_id in self.cover_prefetched:
+                    self.cover_prefetched.move_to_end(job.album_id)
+                else:
+                    self.cover_prefetched[job.album_id] = True
+                    album_ids.append(job.album_id)
+            while len(self.cover_prefetched) > COVER_PREFETCHED_LIMIT:
+                self.cover_prefetched.popitem(last=False)
+        self.cover_cache.prefetch(album_ids)
@@ -0,0 +1,97 @@
+import threading
+from contextlib import contextmanager
+
+
+# 任务中断的原因
+STOP_PAUSE = "pause"
+STOP_CANCEL = "cancel"
+
+
+class JobStopped(Exception):
+    def __init__(self, reason):
+        """
+        任务被暂停或取消，由下载线程、请求在检查点抛出
+
+        Args:
+            reason (str): STOP_PAUSE 或 STOP_CANCEL
+        """
+        super().__init__("任务已暂停" if reason == STOP_PAUSE else "任务已取消")
+        self.reason = reason
+
+
+class JobControl:
+    def __init__(self):
+        """
+        运行中任务的暂停、取消信号，在任务的各个下载线程之间共享
+
+        设置后各检查点（章节、图片开始前，发出请求前，接收响应体时，限速等待时）抛出 JobStopped；
+        jmcomic>=2.7 时同时设置其 DownloadControl，jmcomic 自身的检查点也会中断
+        """
+        self.event = threading.Event()
+        self.reason = None
+        self.jm_control = None
+        self.lock = threading.Lock()
+
+    @property
+    def stopped(self):
+        return self.event.is_set()
+
+    def attach(self, jm_control):
+        """关联 jmcomic 的 DownloadControl，已中断时立即同步"""
+        with self.lock:
+            self.jm_control = jm_control
+            reason = self.reason
+        if reason is not None:
+            jm_control.cancel(reason)
+
+    def stop(self, reason):
+        """
+        中断任务，重复调用时保留第一次的原因
+
+        Returns:
+            bool: 是否是第一次中断
+        """
+        with self.lock:
+            if self.reason is not None:
+                return False
+            self.reason = reason
+            jm_control = self.jm_control
+            self.event.set()
+        if jm_control is not None:
+            jm_control.cancel(reason)
+        return True
+
+    def pause(self):
+        return self.stop(STOP_PAUSE)
+
+    def cancel(self):
+        return self.stop(STOP_CANCEL)
+
+    def check(self):
+        """已中断时抛出 JobStopped"""
+        if self.event.is_set():
+            raise JobStopped(self.reason)
+
+    def sleep(self, seconds):
+        """可被中断的等待，中断时抛出 JobStopped"""
+        self.event.wait(seconds)
+        self.check()
+
+
+# 当前线程所属任务的控制信号，由下载器在章节、图片线程中设置，供连接池、限速器在请求时检查
+control_local = threading.local()
+
+
+def current_control():
+    return getattr(control_local, "control", None)
+
+
+@contextmanager
+def use_control(control):
+    """在 with 块中把 control 设为当前线程的控制信号"""
+    previous = current_control()
+    control_local.control = control
+    try:
+        yield control
+    finally:
+        control_local.control = previous
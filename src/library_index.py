@@ -0,0 +1,337 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+class LibraryIndex:
+    def __init__(self, db_path):
+        """
+        本地书库索引：记录解析过的本子信息（标题、作者、标签、章节数、简介）以及已下载文件的位置和大小，
+        支持按ID即时查询和全文搜索，无需遍历下载目录
+
+        Args:
+            db_path (str): SQLite 数据库文件路径
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS albums (
+                album_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL DEFAULT '',
+                author TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '',
+                photo_count INTEGER,
+                description TEXT NOT NULL DEFAULT '',
+                downloaded INTEGER NOT NULL DEFAULT 0,
+                dir_path TEXT,
+                dir_signature TEXT,
+                file_count INTEGER NOT NULL DEFAULT 0,
+                total_bytes INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS album_tags (
+                album_id INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (tag, album_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS album_tags_album ON album_tags (album_id);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                album_id INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_album ON files (album_id);
+            CREATE INDEX IF NOT EXISTS albums_author ON albums (author);
+            """
+        )
+        self.fts = self.create_fts()
+        self.conn.commit()
+
+    def create_fts(self):
+        """
+        创建全文索引；trigram 分词支持中文子串搜索（SQLite>=3.34），否则退回默认分词，不支持 FTS5 时只用 LIKE 搜索
+
+        Returns:
+            bool: 全文索引是否可用
+        """
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                self.conn.executescript(
+                    f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS albums_fts USING fts5(
+                        name, author, tags, description,
+                        content='albums', content_rowid='album_id', tokenize='{tokenizer}'
+                    );
+                    CREATE TRIGGER IF NOT EXISTS albums_ai AFTER INSERT ON albums BEGIN
+                        INSERT INTO albums_fts (rowid, name, author, tags, description)
+                        VALUES (new.album_id, new.name, new.author, new.tags, new.description);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS albums_ad AFTER DELETE ON albums BEGIN
+                        INSERT INTO albums_fts (albums_fts, rowid, name, author, tags, description)
+                        VALUES ('delete', old.album_id, old.name, old.author, old.tags, old.description);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS albums_au AFTER UPDATE OF name, author, tags, description ON albums BEGIN
+                        INSERT INTO albums_fts (albums_fts, rowid, name, author, tags, description)
+                        VALUES ('delete', old.album_id, old.name, old.author, old.tags, old.description);
+                        INSERT INTO albums_fts (rowid, name, author, tags, description)
+                        VALUES (new.album_id, new.name, new.author, new.tags, new.description);
+                    END;
+                    """
+                )
+                return True
+            except sqlite3.OperationalError:
+                continue
+        print("当前 SQLite 不支持 FTS5，书库搜索将使用 LIKE 匹配")
+        return False
+
+    def record_album(self, album):
+        """
+        记录本子信息（解析详情时调用），保留已有的下载记录
+
+        Args:
+            album (JmAlbumDetail): 本子详情
+        """
+        tags = album.tags if isinstance(album.tags, list) else [tag for tag in str(album.tags or "").split(",") if tag]
+        album_id = int(album.album_id)
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO albums (album_id, name, author, tags, photo_count, description, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (album_id) DO UPDATE SET
+                    name = excluded.name, author = excluded.author, tags = excluded.tags,
+                    photo_count = excluded.photo_count, description = excluded.description,
+                    updated_at = excluded.updated_at
+                """,
+                (album_id, album.name, album.author, ",".join(tags), len(album), album.description or "", time.time()),
+            )
+            self.conn.execute("DELETE FROM album_tags WHERE album_id = ?", (album_id,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO album_tags (album_id, tag) VALUES (?, ?)",
+                [(album_id, tag.strip()) for tag in tags if tag.strip()],
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def dir_signature(dir_path):
+        """
+        目录签名：目录及其子目录的修改时间，增删文件后会变化，用于增量重建时跳过未变化的本子
+        """
+        entries = [os.stat(dir_path).st_mtime_ns]
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append(entry.stat(follow_symlinks=False).st_mtime_ns)
+        return f"{len(entries)}:{max(entries)}:{sum(entries)}"
+
+    @staticmethod
+    def scan_files(dirs):
+        """
+        列出目录（含子目录）中的文件，跳过隐藏文件
+
+        Returns:
+            list: (路径, 大小)
+        """
+        files = []
+        for dir_path in dirs:
+            for root, dir_names, file_names in os.walk(dir_path):
+                dir_names[:] = [name for name in dir_names if not name.startswith(".")]
+                for name in file_names:
+                    if name.startswith("."):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((path, os.path.getsize(path)))
+                    except OSError:
+                        pass
+        return files
+
+    def record_files(self, album_id, dirs, dir_path=None, name=None):
+        """
+        重新扫描本子的文件并记录（下载完成时调用）
+
+        Args:
+            album_id (str): 本子ID
+            dirs (list): 本子图片所在的目录
+            dir_path (str, optional): 本子目录（JM{id}-{标题}），用于增量重建
+            name (str, optional): 书库中没有该本子信息时使用的标题
+        """
+        files = self.scan_files(dirs)
+        signature = self.dir_signature(dir_path) if dir_path and os.path.isdir(dir_path) else None
+        album_id = int(album_id)
+        with self.lock:
+            self.conn.execute("INSERT OR IGNORE INTO albums (album_id, name) VALUES (?, ?)", (album_id, name or ""))
+            self.conn.execute(
+                """
+                UPDATE albums SET downloaded = ?, dir_path = ?, dir_signature = ?, file_count = ?, total_bytes = ?,
+                    updated_at = ?
+                WHERE album_id = ?
+                """,
+                (int(bool(files)), dir_path, signature, len(files), sum(size for _, size in files), time.time(),
+                 album_id),
+            )
+            self.conn.execute("DELETE FROM files WHERE album_id = ?", (album_id,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, album_id, size) VALUES (?, ?, ?)",
+                [(path, album_id, size) for path, size in files],
+            )
+            self.conn.commit()
+
+    def rebuild(self, base_dir):
+        """
+        按下载目录增量重建：只重新扫描签名变化的 JM{id}-* 目录，目录已删除的本子标记为未下载
+
+        Args:
+            base_dir (str): 下载根目录
+
+        Returns:
+            dict: scanned(重新扫描数)、unchanged(未变化数)、removed(已删除数)
+        """
+        with self.lock:
+            known = {
+                row["album_id"]: (row["dir_path"], row["dir_signature"])
+                for row in self.conn.execute("SELECT album_id, dir_path, dir_signature FROM albums WHERE downloaded = 1")
+            }
+
+        result = {"scanned": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        if os.path.isdir(base_dir):
+            with os.scandir(base_dir) as it:
+                for entry in it:
+                    match = re.match(r'JM(\d+)-(.*)', entry.name)
+                    if not match or not entry.is_dir():
+                        continue
+                    album_id = int(match.group(1))
+                    seen.add(album_id)
+                    try:
+                        if known.get(album_id) == (entry.path, self.dir_signature(entry.path)):
+                            result["unchanged"] += 1
+                            continue
+                        self.record_files(album_id, [entry.path], entry.path, match.group(2))
+                        result["scanned"] += 1
+                    except OSError as e:
+                        print(f"扫描本子目录失败 {entry.path}: {str(e)}")
+
+        removed = [
+            (album_id,) for album_id, (dir_path, _) in known.items()
+            if album_id not in seen and dir_path and not os.path.isdir(dir_path)
+        ]
+        if removed:
+            with self.lock:
+                self.conn.executemany(
+                    "UPDATE albums SET downloaded = 0, file_count = 0, total_bytes = 0 WHERE album_id = ?", removed
+                )
+                self.conn.executemany("DELETE FROM files WHERE album_id = ?", removed)
+                self.conn.commit()
+        result["removed"] = len(removed)
+        return result
+
+    @staticmethod
+    def row_to_dict(row):
+        data = dict(row)
+        data["album_id"] = str(data["album_id"])
+        data["tags"] = [tag for tag in data["tags"].split(",") if tag]
+        data["downloaded"] = bool(data["downloaded"])
+        data.pop("dir_signature", None)
+        return data
+
+    def get_album(self, album_id):
+        """
+        查询单个本子
+
+        Returns:
+            dict: 本子信息，不在书库中时返回None
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM albums WHERE album_id = ?", (int(album_id),)).fetchone()
+        return self.row_to_dict(row) if row else None
+
+    def has_album(self, album_id):
+        """本子是否已下载"""
+        with self.lock:
+            row = self.conn.execute("SELECT downloaded FROM albums WHERE album_id = ?", (int(album_id),)).fetchone()
+        return bool(row and row[0])
+
+    def list_files(self, album_id):
+        """
+        本子已下载的文件
+
+        Returns:
+            list: {"path", "size"}
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, size FROM files WHERE album_id = ? ORDER BY path", (int(album_id),)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, query="", tag=None, author=None, downloaded=None, limit=50, offset=0):
+        """
+        搜索书库
+
+        Args:
+            query (str): 关键词，空格分隔的多个词需同时匹配标题、作者、标签或简介
+            tag (str, optional): 只返回带有该标签的本子
+            author (str, optional): 只返回该作者的本子
+            downloaded (bool, optional): 只返回已下载（True）或未下载（False）的本子
+            limit (int): 返回数量上限
+            offset (int): 跳过的数量
+
+        Returns:
+            list: 本子信息
+        """
+        conditions = []
+        params = []
+        match_terms = []
+        for term in (query or "").split():
+            # trigram 分词至少需要3个字符，更短的词用 LIKE 匹配
+            if self.fts and len(term) >= 3:
+                match_terms.append('"' + term.replace('"', '""') + '"')
+            else:
+                pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                conditions.append(
+                    "(name LIKE ? ESCAPE '\\' OR author LIKE ? ESCAPE '\\' OR tags LIKE ? ESCAPE '\\' "
+                    "OR description LIKE ? ESCAPE '\\')"
+                )
+                params += [pattern] * 4
+        if match_terms:
+            conditions.append("album_id IN (SELECT rowid FROM albums_fts WHERE albums_fts MATCH ?)")
+            params.append(" ".join(match_terms))
+        if tag:
+            conditions.append("album_id IN (SELECT album_id FROM album_tags WHERE tag = ?)")
+            params.append(tag)
+        if author:
+            conditions.append("author = ?")
+            params.append(author)
+        if downloaded is not None:
+            conditions.append("downloaded = ?")
+            params.append(int(bool(downloaded)))
+
+        sql = "SELECT * FROM albums"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY album_id DESC LIMIT ? OFFSET ?"
+        params += [int(limit), int(offset)]
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self.row_to_dict(row) for row in rows]
+
+    def stats(self):
+        """书库统计：本子数、已下载数、文件总大小"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(downloaded), 0), COALESCE(SUM(total_bytes), 0) FROM albums"
+            ).fetchone()
+        return {"albums": row[0], "downloaded": row[1], "total_bytes": row[2]}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,71 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+
+class LogBuffer:
+    def __init__(self, capacity=500, log_path=None, max_bytes=5 * 1024 * 1024, backup_count=3):
+        """
+        有界日志缓冲区：界面只保留最近 capacity 条，完整历史写入滚动日志文件
+
+        Args:
+            capacity (int): 内存中保留的最大日志条数
+            log_path (str, optional): 日志文件路径，默认为当前目录下的logs/jmcrawler.log
+            max_bytes (int): 单个日志文件的最大字节数，超出后滚动
+            backup_count (int): 保留的历史日志文件数
+        """
+        if log_path is None:
+            log_path = os.path.join(os.getcwd(), "logs", "jmcrawler.log")
+        self.capacity = max(1, int(capacity))
+        self.lines = deque(maxlen=self.capacity)
+        self.pending = deque(maxlen=self.capacity)
+        self.lock = threading.Lock()
+        self.logger = self.create_logger(log_path, max_bytes, backup_count)
+
+    @staticmethod
+    def create_logger(log_path, max_bytes, backup_count):
+        logger = logging.getLogger(f"jmcrawler.{log_path}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            try:
+                os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                logger.addHandler(handler)
+            except OSError as e:
+                print(f"创建日志文件失败: {str(e)}")
+        return logger
+
+    def append(self, message: str) -> str:
+        """
+        追加一条日志，可在任意线程调用
+
+        Args:
+            message (str): 日志内容
+
+        Returns:
+            str: 带时间戳的日志行
+        """
+        timestamp = time.strftime("%H:%M:%S", time.localtime())
+        line = f"[{timestamp}] {message}"
+        with self.lock:
+            self.lines.append(line)
+            self.pending.append(line)
+        self.logger.info(message)
+        return line
+
+    def drain(self) -> list:
+        """
+        取出上次调用以来新增的日志（最多 capacity 条，更早的已被淘汰）
+
+        Returns:
+            list: 日志行
+        """
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+        return lines
@@ -1,40 +1,31 @@
-import asyncio
-import flet as ft
-from app import JMComicApp
+import sys
+import time
+
+# 进程启动时间，用于统计界面可操作和下载功能就绪的耗时
+STARTED_AT = time.perf_counter()
+
+from startup_profile import profiler
+
+if "--profile-startup" in sys.argv:
+    # 记录各模块导入和启动各阶段的耗时，下载功能就绪后输出报告
+    profiler.enable(STARTED_AT)
+
+import multiprocessing
+
+with profiler.phase("导入 flet"):
+    import flet as ft
+with profiler.phase("导入 app"):
+    from app import JMComicApp
 
 
 def main(page: ft.Page):
-    app = JMComicApp(page)
-    
-    # 创建异步任务来初始化JMComicManager
-    async def init_app():
-        # 创建初始化进度对话框
-        progress_dialog = ft.AlertDialog(
-            content_padding=ft.padding.symmetric(vertical=20, horizontal=20),
-            content=ft.Container(
-                content=ft.Row(
-                    [
-                        ft.ProgressRing(width=50, height=50),
-                    ],
-                    alignment=ft.MainAxisAlignment.CENTER,
-                    #spacing=15,
-                ),
-                padding=50,
-            ),
-            modal=True,
-        )
-        
-        # 先显示进度对话框
-        page.open(progress_dialog)
-        page.update()
-        
-        # 等待UI更新完成
-        await asyncio.sleep(0)
-        
-        # 再执行初始化
-        await app.initialize_jm_manager(progress_dialog)
-    
-    # 使用 page.run_task 来执行异步初始化，传递函数引用而不是调用结果
-    page.run_task(init_app)
-
-ft.app(target=main)
\ No newline at end of file
+    profiler.mark("窗口已创建")
+    app = JMComicApp(page, started_at=STARTED_AT)
+
+    # 界面已可操作，jmcomic 在后台初始化，完成后启用下载按钮
+    page.run_task(app.initialize_jm_manager)
+
+if __name__ == "__main__":
+    # PDF/长图 转换在子进程中执行，子进程导入本模块时不能再次启动界面
+    multiprocessing.freeze_support()
+    ft.app(target=main)
@@ -0,0 +1,510 @@
+"""
+运行指标和下载任务追踪
+
+- MetricsRegistry: 计数器、仪表、直方图，输出为 Prometheus 文本格式（控制接口 GET /metrics）
+- JobTrace: 单个下载任务中请求、图片、插件等各步骤的耗时，导出为 Chrome Trace JSON，
+  可在 chrome://tracing 或 https://ui.perfetto.dev 中打开（控制接口 GET /jobs/{job_id}/trace）
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+# 直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# 单个任务最多记录的追踪事件数，超出后丢弃（图片很多的本子避免占用过多内存）
+MAX_TRACE_EVENTS = 200000
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        指标基类
+
+        Args:
+            name (str): 指标名
+            documentation (str): 说明，输出为 # HELP
+            labelnames (tuple): 标签名
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.function = None
+        self.lock = threading.Lock()
+
+    def set_function(self, function):
+        """
+        改为在输出时调用 function 取值，用于读取其他组件已有的统计
+
+        Args:
+            function (callable): 无标签时返回数值，有标签时返回 {标签值元组: 数值}
+        """
+        self.function = function
+
+    def collect(self):
+        """
+        Returns:
+            dict: 标签值元组 -> 数值
+        """
+        if self.function is not None:
+            value = self.function()
+            return value if isinstance(value, dict) else {(): value}
+        with self.lock:
+            return dict(self.values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, *labels):
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # [各分桶计数（非累计）, 总和, 次数]
+                state = self.values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """记录 with 块的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - begin, *labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            states = {labels: (list(state[0]), state[1], state[2]) for labels, state in self.values.items()}
+        labelnames = self.labelnames + ("le",)
+        for labels, (counts, total, count) in sorted(states.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{format_labels(labelnames, labels + (format_value(bound),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, log=None):
+        """
+        指标集合，按注册顺序输出
+
+        Args:
+            log (callable, optional): 读取指标出错时的日志函数，接收一行文字，默认 print
+        """
+        self.metrics = OrderedDict()
+        self.lock = threading.Lock()
+        self.log = log or print
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise Exception(f"指标 {metric.name} 已存在")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Returns:
+            str: Prometheus 文本格式（0.0.4）
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                self.log(f"读取指标 {metric.name} 失败: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+
+class JobTrace:
+    def __init__(self, job_id, album_id, max_events=MAX_TRACE_EVENTS):
+        """
+        单个任务的追踪记录，事件时间相对于任务开始
+
+        Args:
+            job_id (str): 任务ID
+            album_id (str): 本子ID
+            max_events (int): 最多记录的事件数
+        """
+        self.job_id = job_id
+        self.album_id = str(album_id)
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.max_events = max_events
+        self.events = []
+        self.dropped = 0
+        # 线程 ident -> (显示用的编号, 线程名)
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def thread_id(self):
+        # 需持有 self.lock
+        thread = threading.current_thread()
+        entry = self.threads.get(thread.ident)
+        if entry is None:
+            entry = self.threads[thread.ident] = (len(self.threads) + 1, thread.name)
+        return entry[0]
+
+    def add_span(self, name, category, begin, end, **args):
+        """
+        记录一段耗时
+
+        Args:
+            name (str): 名称
+            category (str): 分类，如 network、image、plugin
+            begin (float): 开始时的 time.perf_counter()
+            end (float): 结束时的 time.perf_counter()
+            args: 附加信息，显示在详情中
+        """
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((begin - self.origin) * 1e6, 1),
+                "dur": round((end - begin) * 1e6, 1),
+                "pid": 1,
+                "tid": self.thread_id(),
+                "args": args,
+            })
+
+    def add_instant(self, name, category, **args):
+        """记录一个时间点，如任务失败"""
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "i",
+                "s": "t",
+                "ts": round((time.perf_counter() - self.origin) * 1e6, 1),
+                "pid": 1,
+                "tid": self.thread_id(),
+                "args": args,
+            })
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """记录 with 块的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, begin, time.perf_counter(), **args)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: Chrome Trace Event 格式
+        """
+        with self.lock:
+            events = list(self.events)
+            threads = list(self.threads.values())
+            dropped = self.dropped
+        metadata = [{
+            "name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+            "args": {"name": f"JM{self.album_id} ({self.job_id})"},
+        }]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in threads
+        ]
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "job_id": self.job_id,
+                "album_id": self.album_id,
+                "started_at": self.started_at,
+                "dropped_events": dropped,
+            },
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+
+# 当前线程正在执行的任务的追踪记录，由下载器在章节、图片线程中设置
+trace_local = threading.local()
+
+
+def current_trace():
+    return getattr(trace_local, "trace", None)
+
+
+@contextmanager
+def use_trace(trace):
+    """在 with 块中把 trace 设为当前线程的追踪记录"""
+    previous = current_trace()
+    trace_local.trace = trace
+    try:
+        yield trace
+    finally:
+        trace_local.trace = previous
+
+
+def classify_request(url):
+    """
+    请求类型，用作指标标签（取值有限）
+
+    Returns:
+        str: image、cover、album、photo、chapter、scramble、setting、search 或 other
+    """
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if parts[:2] == ["media", "photos"]:
+        return "image"
+    if parts[:2] == ["media", "albums"]:
+        return "cover"
+    if not parts:
+        return "other"
+    if parts[0] == "chapter_view_template":
+        return "scramble"
+    if parts[0] in ("album", "photo", "chapter", "setting", "search"):
+        return parts[0]
+    return "other"
+
+
+class AppMetrics:
+    def __init__(self, trace_jobs=20, trace_dir=None, log=None):
+        """
+        JMComicManager 的运行指标和任务追踪
+
+        Args:
+            trace_jobs (int): 内存中保留最近多少个任务的追踪记录，为0时不记录
+            trace_dir (str, optional): 设置后任务结束时把追踪记录保存为 {trace_dir}/JM{本子ID}-{任务ID}.json
+            log (callable, optional): 读取指标、保存追踪出错时的日志函数，接收一行文字，默认 print
+        """
+        self.log = log or print
+        self.registry = MetricsRegistry(log=self.log)
+        registry = self.registry
+        self.requests = registry.counter(
+            "jmcrawler_http_requests_total", "HTTP 请求数，status 为 error 表示请求异常", ("domain", "endpoint", "status"),
+        )
+        self.request_seconds = registry.histogram(
+            "jmcrawler_http_request_duration_seconds", "HTTP 请求耗时（不含限速等待）", ("domain", "endpoint"),
+        )
+        self.response_bytes = registry.counter(
+            "jmcrawler_http_response_bytes_total", "响应体字节数", ("domain", "endpoint"),
+        )
+        self.download_speed = registry.gauge(
+            "jmcrawler_download_bytes_per_second", "正在下载的任务的瞬时速度之和",
+        )
+        self.images = registry.counter(
+            "jmcrawler_images_total", "处理的图片数，result 为 downloaded、reused（本地已有）或 failed", ("result",),
+        )
+        self.image_seconds = registry.histogram(
+            "jmcrawler_image_duration_seconds", "单张图片耗时，stage 为 total（下载+解码+写入）或 save（解码+写入）", ("stage",),
+        )
+        self.plugin_seconds = registry.histogram(
+            "jmcrawler_plugin_duration_seconds", "下载过程中 jmcomic 插件的耗时", ("stage",),
+        )
+        self.album_detail_seconds = registry.histogram(
+            "jmcrawler_album_detail_duration_seconds", "请求本子详情的耗时（未命中缓存）",
+        )
+        self.album_seconds = registry.histogram(
+            "jmcrawler_album_download_duration_seconds", "单个本子的下载耗时（不含 PDF/长图 生成）", ("mode",),
+        )
+        self.post_process_seconds = registry.histogram(
+            "jmcrawler_post_process_duration_seconds", "PDF/长图 生成耗时（含排队）", ("result",),
+        )
+        self.post_process_pending = registry.gauge(
+            "jmcrawler_post_process_pending", "等待或正在生成 PDF/长图 的本子数",
+        )
+        self.queue_jobs = registry.gauge("jmcrawler_queue_jobs", "下载队列中各状态的任务数", ("status",))
+        self.image_concurrency = registry.gauge(
+            "jmcrawler_image_concurrency", "图片下载并发，kind 为 limit（自动调整的上限）或 in_flight（正在下载）", ("kind",),
+        )
+        self.cache_requests = registry.counter(
+            "jmcrawler_cache_requests_total", "缓存查询次数，cache 为 album、cover 或 image_store", ("cache", "result"),
+        )
+
+        self.trace_jobs = max(0, int(trace_jobs or 0))
+        self.trace_dir = trace_dir
+        self.traces = OrderedDict()
+        self.trace_lock = threading.Lock()
+
+    def render(self):
+        return self.registry.render()
+
+    def record_request(self, url, begin, end, status, size=0):
+        """记录一次 HTTP 请求，并加入当前线程的任务追踪"""
+        domain = urlsplit(url).netloc
+        endpoint = classify_request(url)
+        self.requests.inc(domain, endpoint, str(status))
+        self.request_seconds.observe(end - begin, domain, endpoint)
+        if size:
+            self.response_bytes.inc(domain, endpoint, amount=size)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span(f"{endpoint} {domain}", "network", begin, end, url=url, status=status, bytes=size)
+        # 供下载器计算图片解码、写入的耗时，以及判断图片下载过程中是否被限流或出错（即使重试后成功）
+        trace_local.last_request_end = end
+        if status == "error" or status >= 400:
+            trace_local.request_errors = getattr(trace_local, "request_errors", 0) + 1
+
+    def start_trace(self, job):
+        """
+        为任务新建追踪记录，超出 trace_jobs 时丢弃最早的记录
+
+        Returns:
+            JobTrace: 不记录追踪时为None
+        """
+        if not self.trace_jobs and not self.trace_dir:
+            return None
+        trace = JobTrace(job.job_id, job.album_id)
+        with self.trace_lock:
+            self.traces.pop(job.job_id, None)
+            self.traces[job.job_id] = trace
+            while len(self.traces) > max(self.trace_jobs, 1):
+                self.traces.popitem(last=False)
+        return trace
+
+    def get_trace(self, job_id):
+        with self.trace_lock:
+            return self.traces.get(job_id)
+
+    def finish_trace(self, trace):
+        """任务结束，设置了 trace_dir 时保存追踪记录"""
+        if trace is None or not self.trace_dir:
+            return
+        try:
+            trace.save(os.path.join(self.trace_dir, f"JM{trace.album_id}-{trace.job_id}.json"))
+        except Exception as e:
+            self.log(f"保存任务追踪失败: {str(e)}")
+
+
+class InstrumentedPostman:
+    def __init__(self, postman, metrics):
+        """
+        包装 jmcomic 客户端的 Postman，记录请求数、耗时和字节数；其他属性和方法转发给原 Postman
+
+        Args:
+            postman: 原 Postman
+            metrics (AppMetrics): 运行指标
+        """
+        self.postman = postman
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        if name == "postman":
+            raise AttributeError(name)
+        return getattr(self.postman, name)
+
+    def request(self, method, url, **kwargs):
+        begin = time.perf_counter()
+        try:
+            resp = getattr(self.postman, method)(url, **kwargs)
+        except Exception:
+            self.metrics.record_request(url, begin, time.perf_counter(), "error")
+            raise
+        self.metrics.record_request(
+            url, begin, time.perf_counter(), resp.status_code, len(getattr(resp, "content", b"") or b""),
+        )
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def copy(self):
+        return self.__class__(self.postman.copy(), self.metrics)
+
+
+def install_request_metrics(client, metrics):
+    """
+    记录 jmcomic 客户端的请求（在连接池之后、限速器之前安装，耗时不含限速等待）
+
+    Args:
+        client (JmcomicClient): jmcomic 客户端
+        metrics (AppMetrics): 运行指标
+    """
+    client.postman = InstrumentedPostman(client.postman, metrics)
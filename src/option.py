@@ -2,6 +2,10 @@ import yaml
 import os
 
 
+# 只由本应用使用的选项字段，传给 jmcomic 前需要去掉（JmOption 不接受未知字段）
+APP_OPTION_KEYS = ("rate_limit",)
+
+
 class OptionManager:
     def __init__(self, option_path=None):
         """
@@ -14,6 +18,8 @@ class OptionManager:
             self.option_path = os.path.join(os.getcwd(), "option.yml")
         else:
             self.option_path = option_path
+        # 读取选项文件失败时的异常，此时使用默认选项
+        self.load_error = None
             
         # 确保download目录存在
         download_dir = os.path.join(os.getcwd(), "download")
@@ -62,7 +68,21 @@ class OptionManager:
                         }
                     }
                 ]
-            }
+            },
+            # 下载限速，所有上限为0时表示不限；收到 429/5xx 时总会对该域名退避
+            "rate_limit": {
+                "requests_per_second": 0,
+                "bytes_per_second": 0,
+                "per_domain": {
+                    "requests_per_second": 0,
+                    "bytes_per_second": 0,
+                },
+                "domains": {},
+                "backoff": {
+                    "initial": 2,
+                    "max": 60,
+                },
+            },
         }
         self.option = self.load_option()
         
@@ -84,6 +104,7 @@ class OptionManager:
                 return yaml.safe_load(f) or self.default_option
         except Exception as e:
             # 如果读取失败，返回默认配置
+            self.load_error = e
             return self.default_option
     
     def save_option(self, option_data=None):
@@ -117,6 +138,19 @@ class OptionManager:
         except Exception as e:
             raise Exception(f"保存选项文件失败: {str(e)}")
             
+    def get_jmcomic_option(self):
+        """
+        传给 jmcomic 的选项字典，去掉了只由本应用使用的字段
+
+        Returns:
+            dict: 可用于 JmOption.construct 的字典
+        """
+        if self.load_error is not None:
+            raise Exception(f"读取选项文件失败: {str(self.load_error)}")
+        option = {key: value for key, value in self.option.items() if key not in APP_OPTION_KEYS}
+        option.setdefault("filepath", self.option_path)
+        return option
+
     def get(self, key_path, default=None):
         """
         根据路径获取配置值
@@ -0,0 +1,119 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+# 交给后处理进程执行的 after_album 插件（CPU 密集）
+POST_PROCESS_PLUGINS = ("img2pdf", "long_img")
+
+
+def run_album_plugins(option_dict, album):
+    """
+    在后处理进程中执行 after_album 插件
+
+    Args:
+        option_dict (dict): 只包含后处理插件的 jmcomic 选项
+        album (JmAlbumDetail): 已下载的本子
+    """
+    from jmcomic import JmOption
+    from album_export import register_streaming_plugins
+    register_streaming_plugins()
+    option = JmOption.construct(option_dict)
+    option.call_all_plugin("after_album", album=album, downloader=None)
+
+
+def split_post_process_plugins(option_dict):
+    """
+    将 jmcomic 选项拆分为下载用和后处理用两份
+
+    Args:
+        option_dict (dict): JmOption.deconstruct() 的结果
+
+    Returns:
+        tuple: (下载用选项字典, 后处理用选项字典)；没有需要后处理的插件时后者为None
+    """
+    plugins = option_dict.get("plugins") or {}
+    after_album = plugins.get("after_album") or []
+    offloaded = [pinfo for pinfo in after_album if pinfo.get("plugin") in POST_PROCESS_PLUGINS]
+    if not offloaded:
+        return option_dict, None
+
+    download_dict = dict(option_dict)
+    download_dict["plugins"] = dict(plugins)
+    download_dict["plugins"]["after_album"] = [pinfo for pinfo in after_album if pinfo not in offloaded]
+
+    process_dict = dict(option_dict)
+    # safe 为 False 时插件异常会抛出，由调用方记录到任务中
+    process_dict["plugins"] = {"after_album": [dict(pinfo, safe=False) for pinfo in offloaded]}
+    return download_dict, process_dict
+
+
+class PostProcessor:
+    def __init__(self, max_workers=1, max_pending=4, use_processes=True):
+        """
+        后处理队列：PDF、长图转换在独立进程中执行，不阻塞下一个本子的下载
+
+        Args:
+            max_workers (int): 同时转换的本子数
+            max_pending (int): 排队等待转换的本子上限，超出后提交方阻塞等待，避免积压
+            use_processes (bool): 为False时改用线程执行（用于不支持多进程的环境）
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.use_processes = use_processes
+        self.slots = threading.BoundedSemaphore(max(1, int(max_pending)) + self.max_workers)
+        self.futures = set()
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                if self.use_processes:
+                    # 进程池模块较大，首次转换时才导入
+                    from concurrent.futures import ProcessPoolExecutor
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="post")
+            return self.executor
+
+    def submit(self, option_dict, album):
+        """
+        提交本子的后处理任务，队列已满时阻塞
+
+        Args:
+            option_dict (dict): 后处理用选项字典
+            album (JmAlbumDetail): 已下载的本子
+
+        Returns:
+            concurrent.futures.Future
+        """
+        self.slots.acquire()
+        try:
+            future = self.get_executor().submit(run_album_plugins, option_dict, album)
+        except Exception:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self.on_done)
+        return future
+
+    def on_done(self, future):
+        with self.lock:
+            self.futures.discard(future)
+        self.slots.release()
+
+    def pending_count(self):
+        with self.lock:
+            return len(self.futures)
+
+    def wait(self):
+        """等待所有已提交的后处理任务完成"""
+        with self.lock:
+            futures = list(self.futures)
+        wait(futures)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
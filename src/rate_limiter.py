@@ -0,0 +1,332 @@
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from scheduler import LANE_INTERACTIVE, current_lane
+from job_control import current_control
+
+
+# 触发退避的状态码：请求过多以及服务端错误
+BACKOFF_STATUS = {429, 500, 502, 503, 504, 520, 521, 522, 524}
+
+# 限速被触发后速率降低的比例，以及每次成功后恢复的幅度
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.05
+MIN_FACTOR = 0.1
+
+# 未设置请求数上限时，统计最近多少秒内的实际请求速率，被限流后以此为基准临时限速
+OBSERVE_WINDOW = 10
+
+# 同一域名退避提示的最短间隔（秒），期间再次触发只计数，合并到下一条提示
+LOG_INTERVAL = 30
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """
+        令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个
+
+        取令牌时允许透支（单张大图可以超过 burst），透支部分由之后的请求等待补足
+
+        Args:
+            rate (float): 每秒补充的令牌数
+            burst (float, optional): 令牌上限，默认为 1 秒的补充量
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(self.rate, 1))
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        # 需持有 self.lock
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount=1, priority=False):
+        """
+        取出令牌
+
+        Args:
+            amount (float): 令牌数，为0时只检查是否有透支
+            priority (bool): 插队：只等待本次所需的令牌，不排在已预留（透支）的请求之后，透支顺延给它们
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        with self.lock:
+            self.refill()
+            available = self.tokens
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            if priority:
+                return max(0.0, amount - max(available, 0.0)) / self.rate
+            return -self.tokens / self.rate
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.refill()
+            self.rate = float(rate)
+
+    def drain(self):
+        """清空积攒的令牌，之后的请求按当前速率发出"""
+        with self.lock:
+            self.refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class LimitState:
+    def __init__(self, requests_per_second=0, bytes_per_second=0):
+        """
+        一组限速（全局或单个域名）：请求数、字节数两个令牌桶，以及被限流后的退避状态
+
+        Args:
+            requests_per_second (float): 每秒请求数上限，为0时不限
+            bytes_per_second (float): 每秒下载字节数上限，为0时不限
+        """
+        self.requests_per_second = float(requests_per_second or 0)
+        self.requests = TokenBucket(self.requests_per_second) if self.requests_per_second > 0 else None
+        self.bytes = TokenBucket(bytes_per_second) if bytes_per_second else None
+        # 请求速率相对于配置值的比例，被限流时降低，请求成功后逐步恢复
+        self.factor = 1.0
+        self.backoff_delay = 0.0
+        self.backoff_until = 0.0
+        # 未设置请求数上限时被限流，按实际请求速率临时限速，速率恢复后取消
+        self.temporary_rate = 0.0
+        self.recent = deque()
+        self.lock = threading.Lock()
+
+    def reserve(self, priority=False):
+        """
+        预留一次请求
+
+        Args:
+            priority (bool): 界面解析等交互请求：不等待批量下载透支的字节数，请求令牌插队
+
+        Returns:
+            float: 需要等待的秒数
+        """
+        wait = 0.0
+        if self.bytes is not None and not priority:
+            # 上一个响应透支的字节数需先补足
+            wait = max(wait, self.bytes.reserve(0))
+        if not self.requests_per_second:
+            self.observe()
+        requests = self.requests
+        if requests is not None:
+            wait = max(wait, requests.reserve(1, priority))
+        return wait
+
+    def observe(self):
+        """记录一次请求的时间，用于统计实际请求速率"""
+        now = time.monotonic()
+        with self.lock:
+            self.recent.append(now)
+            while self.recent and now - self.recent[0] > OBSERVE_WINDOW:
+                self.recent.popleft()
+
+    def observed_rate(self):
+        # 需持有 self.lock
+        if not self.recent:
+            return 1.0
+        span = max(1.0, time.monotonic() - self.recent[0])
+        return max(1.0, len(self.recent) / span)
+
+    def consume_bytes(self, size):
+        if self.bytes is not None and size:
+            self.bytes.reserve(size)
+
+    def throttled(self, retry_after, initial, maximum):
+        """被限流或服务端出错：指数退避，并降低请求速率"""
+        with self.lock:
+            self.backoff_delay = min(maximum, self.backoff_delay * 2 if self.backoff_delay else initial)
+            delay = max(self.backoff_delay, min(maximum, retry_after or 0))
+            self.backoff_until = max(self.backoff_until, time.monotonic() + delay)
+            self.factor = max(MIN_FACTOR, self.factor * DECREASE_FACTOR)
+            self.apply_factor()
+            if self.requests is not None:
+                self.requests.drain()
+        return delay
+
+    def slow_down(self):
+        """降低请求速率但不退避；未设置请求数上限时，以被限流前的实际请求速率为基准临时限速"""
+        with self.lock:
+            if self.requests is None:
+                self.temporary_rate = self.observed_rate()
+                self.requests = TokenBucket(self.temporary_rate)
+            self.factor = max(MIN_FACTOR, self.factor * DECREASE_FACTOR)
+            self.apply_factor()
+            self.requests.drain()
+
+    def succeeded(self):
+        """请求成功：清除退避，逐步恢复请求速率，临时限速在完全恢复后取消"""
+        with self.lock:
+            self.backoff_delay = 0.0
+            if self.factor < 1.0:
+                self.factor = min(1.0, self.factor + INCREASE_STEP)
+                self.apply_factor()
+                if self.factor >= 1.0 and self.temporary_rate:
+                    self.requests = None
+                    self.temporary_rate = 0.0
+
+    def apply_factor(self):
+        # 需持有 self.lock
+        if self.requests is not None:
+            self.requests.set_rate((self.requests_per_second or self.temporary_rate) * self.factor)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_second=0, bytes_per_second=0, per_domain=None, domains=None, backoff=None,
+                 log=None):
+        """
+        下载限速：全局和单个域名分别限制每秒请求数、每秒字节数；收到 429/5xx 时对该域名指数退避并降低速率，
+        收到 429 时全局速率也降低（未设置全局上限时以实际请求速率为基准临时限速）
+
+        参数对应 option.yml 中的 rate_limit 配置，所有上限为0时表示不限
+
+        Args:
+            requests_per_second (float): 全局每秒请求数
+            bytes_per_second (float): 全局每秒下载字节数
+            per_domain (dict, optional): 每个域名的默认上限 {"requests_per_second", "bytes_per_second"}
+            domains (dict, optional): 指定域名的上限，覆盖 per_domain，如 {"cdn-msp.jmapiproxy3.cc": {"requests_per_second": 2}}
+            backoff (dict, optional): 退避时间（秒）{"initial": 2, "max": 60}
+            log (callable, optional): 退避提示的日志函数，接收一行文字，默认 print
+        """
+        self.global_state = LimitState(requests_per_second, bytes_per_second)
+        self.per_domain = per_domain or {}
+        self.domain_overrides = domains or {}
+        backoff = backoff or {}
+        self.backoff_initial = float(backoff.get("initial", 2))
+        self.backoff_max = float(backoff.get("max", 60))
+        self.domains = {}
+        self.lock = threading.Lock()
+        self.log = log or print
+        # 域名 -> (上次提示的时间, 之后未提示的退避次数)
+        self.throttle_logs = {}
+
+    def domain_state(self, domain):
+        with self.lock:
+            state = self.domains.get(domain)
+            if state is None:
+                limits = dict(self.per_domain, **self.domain_overrides.get(domain, {}))
+                state = self.domains[domain] = LimitState(
+                    limits.get("requests_per_second", 0),
+                    limits.get("bytes_per_second", 0),
+                )
+            return state
+
+    def before_request(self, domain):
+        """请求前调用，按全局和域名的限速等待；交互通道的请求不排在批量下载之后，任务被暂停或取消时停止等待"""
+        domain_state = self.domain_state(domain)
+        priority = current_lane() == LANE_INTERACTIVE
+        control = current_control()
+        sleep = control.sleep if control is not None else time.sleep
+        wait = max(self.global_state.reserve(priority), domain_state.reserve(priority))
+        if wait > 0:
+            sleep(wait)
+        # 等待期间退避可能被其他请求延长（令牌已预留，只需等到退避结束）
+        while True:
+            remaining = domain_state.backoff_until - time.monotonic()
+            if remaining <= 0:
+                return
+            sleep(remaining)
+
+    def after_response(self, domain, status, size=0, retry_after=None):
+        """
+        响应后调用：记录下载字节数，根据状态码调整退避
+
+        Args:
+            domain (str): 域名
+            status (int): HTTP 状态码
+            size (int): 响应体字节数
+            retry_after (str, optional): 响应头 Retry-After
+        """
+        domain_state = self.domain_state(domain)
+        self.global_state.consume_bytes(size)
+        domain_state.consume_bytes(size)
+        if status in BACKOFF_STATUS:
+            delay = domain_state.throttled(parse_retry_after(retry_after), self.backoff_initial, self.backoff_max)
+            if status == 429:
+                # 按IP限流时全局速率也一并降低（不退避，其他域名照常请求）；未设置全局上限时按实际速率临时限速
+                self.global_state.slow_down()
+            self.report_throttle(domain, status, delay)
+        else:
+            domain_state.succeeded()
+            self.global_state.succeeded()
+
+    def report_throttle(self, domain, status, delay):
+        """记录退避提示，同一域名每 LOG_INTERVAL 秒最多一条，持续限流时不刷屏"""
+        now = time.monotonic()
+        with self.lock:
+            logged_at, suppressed = self.throttle_logs.get(domain, (None, 0))
+            if logged_at is not None and now - logged_at < LOG_INTERVAL:
+                self.throttle_logs[domain] = (logged_at, suppressed + 1)
+                return
+            self.throttle_logs[domain] = (now, 0)
+        message = f"{domain} 返回 {status}，{delay:.1f} 秒后再请求该域名"
+        if suppressed:
+            message += f"（上次提示后又触发 {suppressed} 次）"
+        try:
+            self.log(message)
+        except Exception as e:
+            print(f"记录限速日志失败: {str(e)}")
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 响应头（秒数），无法解析时返回None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedPostman:
+    def __init__(self, postman, limiter):
+        """
+        包装 jmcomic 客户端的 Postman，请求前后经过限速器；其他属性和方法转发给原 Postman
+
+        Args:
+            postman: 原 Postman
+            limiter (RateLimiter): 限速器
+        """
+        self.postman = postman
+        self.limiter = limiter
+
+    def __getattr__(self, name):
+        if name == "postman":
+            raise AttributeError(name)
+        return getattr(self.postman, name)
+
+    def request(self, method, url, **kwargs):
+        domain = urlsplit(url).netloc
+        self.limiter.before_request(domain)
+        resp = getattr(self.postman, method)(url, **kwargs)
+        self.limiter.after_response(
+            domain,
+            resp.status_code,
+            len(getattr(resp, "content", b"") or b""),
+            resp.headers.get("Retry-After"),
+        )
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request("get", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("post", url, **kwargs)
+
+    def copy(self):
+        return self.__class__(self.postman.copy(), self.limiter)
+
+
+def install_rate_limiter(client, limiter):
+    """
+    让 jmcomic 客户端的请求经过限速器（在连接池之后安装）
+
+    Args:
+        client (JmcomicClient): jmcomic 客户端
+        limiter (RateLimiter): 限速器
+    """
+    client.postman = RateLimitedPostman(client.postman, limiter)
@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+# 请求的优先级通道，按优先级从高到低排列
+LANE_INTERACTIVE = "interactive"
+LANE_COVER = "cover"
+LANE_BULK = "bulk"
+LANES = (LANE_INTERACTIVE, LANE_COVER, LANE_BULK)
+
+# 当前线程发出的请求所属的通道；下载线程由 jmcomic 创建，未设置时按批量下载处理
+lane_local = threading.local()
+
+
+def current_lane():
+    return getattr(lane_local, "lane", LANE_BULK)
+
+
+@contextmanager
+def use_lane(lane):
+    """
+    在当前线程中以指定通道发出请求
+
+    Args:
+        lane (str): LANE_INTERACTIVE、LANE_COVER 或 LANE_BULK
+    """
+    if lane not in LANES:
+        raise ValueError(f"unknown lane: {lane}")
+    previous = getattr(lane_local, "lane", None)
+    lane_local.lane = lane
+    try:
+        yield
+    finally:
+        lane_local.lane = previous if previous is not None else LANE_BULK
+
+
+class PrioritySemaphore:
+    def __init__(self, capacity, reserved=0):
+        """
+        按通道优先级分配的信号量：有名额空出时先分给优先级高的通道，同一通道内按到达顺序分配
+
+        Args:
+            capacity (int): 名额数
+            reserved (int): 每低一级的通道少用的名额数，为高优先级请求预留；
+                如 capacity=16、reserved=1 时，界面解析最多16个，封面15个，批量下载14个
+        """
+        self.capacity = max(1, int(capacity))
+        self.reserved = max(0, int(reserved))
+        self.in_use = 0
+        # 各通道等待者的票据，按到达顺序排列，只有队首可以取得名额
+        self.waiters = {lane: deque() for lane in LANES}
+        self.condition = threading.Condition()
+
+    def limit_for(self, lane):
+        return max(1, self.capacity - self.reserved * LANES.index(lane))
+
+    def can_acquire(self, lane, ticket=None):
+        # 需持有 self.condition
+        if self.in_use >= self.limit_for(lane):
+            return False
+        # 有更高优先级的请求在等待时让其先取
+        if any(self.waiters[other] for other in LANES[:LANES.index(lane)]):
+            return False
+        # 同一通道内先到先得：新来的请求不越过已在等待的请求，等待者只有排到队首时才能取
+        waiters = self.waiters[lane]
+        return not waiters if ticket is None else waiters[0] is ticket
+
+    def acquire(self, lane=None):
+        lane = lane or current_lane()
+        with self.condition:
+            if not self.can_acquire(lane):
+                ticket = object()
+                waiters = self.waiters[lane]
+                waiters.append(ticket)
+                try:
+                    while not self.can_acquire(lane, ticket):
+                        self.condition.wait()
+                finally:
+                    waiters.remove(ticket)
+                    # 队首变化，下一个等待者（或低优先级通道）可能已经可以取得名额
+                    self.condition.notify_all()
+            self.in_use += 1
+
+    def release(self):
+        with self.condition:
+            self.in_use -= 1
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self, lane=None):
+        self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release()
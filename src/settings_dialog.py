@@ -3,7 +3,7 @@ import os
 from option import OptionManager
 
 
-def create_settings_dialog(page: ft.Page, config_manager):
+def create_settings_dialog(page: ft.Page, config_manager, on_save=None):
     """创建设置对话框"""
     # 获取当前下载路径
     option_manager = OptionManager()
@@ -38,6 +38,14 @@ def create_settings_dialog(page: ft.Page, config_manager):
         on_click=pick_directory,
     )
     
+    # 创建并发下载数量选择
+    concurrency_dropdown = ft.Dropdown(
+        label="同时下载本子数",
+        value=str(config_manager.get("max_concurrent_downloads", 2)),
+        options=[ft.dropdown.Option(str(i)) for i in range(1, 9)],
+        width=300,
+    )
+    
     # 创建插件开关
     # 定义插件信息
     plugin_info = {
@@ -153,6 +161,13 @@ def create_settings_dialog(page: ft.Page, config_manager):
             option_manager.set("plugins", {})
         
         option_manager.save_option()
+        
+        # 保存应用配置
+        config_manager.set("max_concurrent_downloads", int(concurrency_dropdown.value))
+        config_manager.save_config()
+        if on_save:
+            on_save()
+        
         dlg.open = False
         page.update()
         
@@ -183,6 +198,7 @@ def create_settings_dialog(page: ft.Page, config_manager):
                     ],
                     alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                 ),
+                concurrency_dropdown,
                 ft.Divider(),
             ] + plugin_controls,
             tight=True,
@@ -0,0 +1,204 @@
+"""
+启动耗时分析：python src/main.py --profile-startup（打包后的程序同样支持该参数）
+
+记录每个模块的导入耗时和启动各阶段的耗时，下载功能就绪后输出到控制台并写入 logs/startup_profile.json
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TimedLoader:
+    def __init__(self, loader, timer):
+        """包装模块加载器，记录 exec_module（执行模块顶层代码，含其中的导入）的耗时"""
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # 模块执行期间换回原加载器，避免影响依赖 __loader__ 读取资源的代码
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.timer.begin(module.__name__)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.end(module.__name__)
+
+
+class ImportTimer:
+    def __init__(self, started_at):
+        """
+        放在 sys.meta_path 最前面的查找器：把查找交给其他查找器，只替换找到的加载器以计时
+
+        Args:
+            started_at (float): 启动时的 time.perf_counter()
+        """
+        self.started_at = started_at
+        self.records = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def begin(self, name):
+        # [模块名, 开始时间, 子模块耗时]
+        self.stack().append([name, time.perf_counter(), 0.0])
+
+    def end(self, name):
+        stack = self.stack()
+        _, begin, children = stack.pop()
+        elapsed = time.perf_counter() - begin
+        if stack:
+            stack[-1][2] += elapsed
+        with self.lock:
+            self.records.append({
+                "module": name,
+                "start": round(begin - self.started_at, 4),
+                "cumulative": round(elapsed, 4),
+                "self": round(elapsed - children, 4),
+                "depth": len(stack),
+                "thread": threading.current_thread().name,
+            })
+
+
+class StartupProfiler:
+    def __init__(self):
+        """
+        启动耗时记录器，未启用时所有方法都不做任何事
+        """
+        self.enabled = False
+        self.started_at = None
+        self.import_timer = None
+        self.phases = []
+        self.marks = []
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def enable(self, started_at=None):
+        """
+        开始记录，应在导入其他模块之前调用
+
+        Args:
+            started_at (float, optional): 进程启动时的 time.perf_counter()，默认为当前时间
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.import_timer = ImportTimer(self.started_at)
+        sys.meta_path.insert(0, self.import_timer)
+
+    @contextmanager
+    def phase(self, name):
+        """
+        记录一个阶段的耗时
+
+        Args:
+            name (str): 阶段名
+        """
+        if not self.enabled:
+            yield
+            return
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.phases.append({
+                    "phase": name,
+                    "start": round(begin - self.started_at, 4),
+                    "duration": round(end - begin, 4),
+                    "thread": threading.current_thread().name,
+                })
+
+    def mark(self, name):
+        """记录一个时间点，如界面可操作、下载功能就绪"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.marks.append({"mark": name, "at": round(time.perf_counter() - self.started_at, 4)})
+
+    def report(self, path=None, top=25):
+        """
+        输出并保存耗时报告，只执行一次
+
+        Args:
+            path (str, optional): 报告文件路径，默认为当前目录下的logs/startup_profile.json
+            top (int): 控制台中显示的最慢模块数量
+
+        Returns:
+            dict: 报告内容，未启用时为None
+        """
+        if not self.enabled or self.reported:
+            return None
+        self.reported = True
+        sys.meta_path.remove(self.import_timer)
+        if path is None:
+            path = os.path.join(os.getcwd(), "logs", "startup_profile.json")
+
+        with self.lock:
+            phases = sorted(self.phases, key=lambda item: item["start"])
+            marks = list(self.marks)
+        with self.import_timer.lock:
+            imports = list(self.import_timer.records)
+        top_level = sorted((item for item in imports if item["depth"] == 0), key=lambda item: -item["cumulative"])
+        slowest = sorted(imports, key=lambda item: -item["self"])[:top]
+        report = {
+            "total": round(time.perf_counter() - self.started_at, 4),
+            "marks": marks,
+            "phases": phases,
+            "top_level_imports": top_level,
+            "slowest_modules": slowest,
+            "imports": imports,
+        }
+
+        lines = ["启动耗时分析（秒）:"]
+        lines += [f"  [{item['at']:8.3f}] {item['mark']}" for item in marks]
+        lines.append("阶段:")
+        lines += [
+            f"  {item['start']:8.3f} +{item['duration']:.3f}  {item['phase']} ({item['thread']})" for item in phases
+        ]
+        lines.append("顶层导入（含子模块）:")
+        lines += [f"  {item['cumulative']:8.3f}  {item['module']} ({item['thread']})" for item in top_level[:top]]
+        lines.append("自身耗时最多的模块:")
+        lines += [f"  {item['self']:8.3f}  {item['module']}" for item in slowest]
+        print("\n".join(lines), flush=True)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"启动耗时报告已保存到 {path}", flush=True)
+        except OSError as e:
+            print(f"保存启动耗时报告失败: {str(e)}")
+        return report
+
+
+# 全局记录器，由 main.py 在 --profile-startup 时启用
+profiler = StartupProfiler()
@@ -7,11 +7,15 @@ class UIComponents:
         self.id_input = None
         self.download_button = None
         self.parse_button = None
+        self.import_button = None
+        self.sync_button = None
         self.progress_bar = None
         self.status_text = None
         self.status_container = None
         self.logs = None
         self.view = None
+        self.queue_list = None
+        self.queue_summary = None
         self.album_info = None
         self.create_all_components()
     
@@ -20,6 +24,7 @@ class UIComponents:
         self.create_input_components()
         self.create_info_components()
         self.create_log_components()
+        self.create_queue_components()
     
     def create_input_components(self):
         """创建输入相关组件"""
@@ -52,6 +57,20 @@ class UIComponents:
             )
         )
 
+        # 批量导入按钮
+        self.import_button = ft.IconButton(
+            icon=ft.Icons.PLAYLIST_ADD,
+            tooltip="批量导入",
+            icon_size=28,
+        )
+
+        # 同步按钮
+        self.sync_button = ft.IconButton(
+            icon=ft.Icons.SYNC,
+            tooltip="同步已下载的本子（只下载新章节）",
+            icon_size=28,
+        )
+
         # 进度条
         self.progress_bar = ft.ProgressBar(
             width=500,
@@ -92,6 +111,18 @@ class UIComponents:
             )
         ])
     
+    def create_queue_components(self):
+        """创建下载队列相关组件"""
+        # 队列概况
+        self.queue_summary = ft.Text("队列为空", size=14)
+
+        # 任务列表
+        self.queue_list = ft.ListView(
+            expand=True,
+            spacing=5,
+            padding=10
+        )
+
     def create_info_components(self):
         """创建信息展示组件"""
         # 漫画详情信息区域
@@ -137,7 +168,7 @@ class UIComponents:
                             [
                                 ft.Row([self.id_input,
                                 ft.Container(
-                                    content=ft.Row([self.parse_button,self.download_button ], spacing=10),
+                                    content=ft.Row([self.parse_button,self.download_button,self.import_button,self.sync_button ], spacing=10),
                                     alignment=ft.alignment.bottom_center,
                                     padding=15,
                                 ),]),
@@ -171,16 +202,37 @@ class UIComponents:
         # 创建日志信息卡片
         logs_card = ft.Card(
             content=ft.Container(
-                content=ft.Column([
-                    ft.Container(
-                        content=ft.Text("日志信息:", size=18, weight=ft.FontWeight.BOLD),
-                        padding=ft.padding.only(bottom=10),
-                    ),
-                    ft.Container(
-                        content=self.view,
-                        expand=True,
-                    )
-                ]),
+                content=ft.Tabs(
+                    tabs=[
+                        ft.Tab(
+                            text="日志信息",
+                            content=ft.Container(
+                                content=self.view,
+                                padding=ft.padding.only(top=10),
+                                expand=True,
+                            ),
+                        ),
+                        ft.Tab(
+                            text="下载队列",
+                            content=ft.Column(
+                                [
+                                    ft.Container(
+                                        content=self.queue_summary,
+                                        padding=ft.padding.only(top=10),
+                                    ),
+                                    ft.Container(
+                                        content=self.queue_list,
+                                        border=ft.border.all(1, ft.Colors.GREY_400),
+                                        padding=15,
+                                        expand=True,
+                                    ),
+                                ],
+                                expand=True,
+                            ),
+                        ),
+                    ],
+                    expand=True,
+                ),
                 padding=15,
                 expand=True,
             ),
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+
+class UIUpdateDispatcher:
+    def __init__(self, page, interval=0.05):
+        """
+        界面更新调度器：后台线程只标记发生变化的控件，
+        由页面事件循环每帧最多发送一次，且只发送被标记的控件
+
+        Args:
+            page (ft.Page): 页面
+            interval (float): 帧间隔（秒）
+        """
+        self.page = page
+        self.interval = interval
+        self.dirty = {}
+        self.flush_hooks = []
+        self.lock = threading.Lock()
+        self.running = False
+
+    def mark(self, *controls):
+        """
+        标记需要更新的控件，可在任意线程调用
+
+        Args:
+            *controls: 发生变化的控件
+        """
+        with self.lock:
+            for control in controls:
+                self.dirty[id(control)] = control
+
+    def add_flush_hook(self, hook):
+        """
+        注册每帧发送前调用的钩子，钩子在事件循环中执行，可在其中修改并标记控件
+
+        Args:
+            hook (callable): 无参函数
+        """
+        self.flush_hooks.append(hook)
+
+    def start(self):
+        """在页面事件循环中启动调度"""
+        if not self.running:
+            self.running = True
+            self.page.run_task(self.run)
+
+    async def run(self):
+        while self.running:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"界面更新失败: {str(e)}")
+
+    def flush(self):
+        """执行钩子并一次性发送本帧所有被标记的控件"""
+        for hook in self.flush_hooks:
+            hook()
+
+        with self.lock:
+            if not self.dirty:
+                return
+            controls = list(self.dirty.values())
+            self.dirty.clear()
+
+        # 未挂载到页面的控件（如已关闭的对话框中的控件）无需发送
+        controls = [control for control in controls if control.page is not None]
+        if controls:
+            self.page.update(*controls)
+
+    def stop(self):
+        self.running = False
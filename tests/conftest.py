@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    """在临时目录中运行，下载目录、清单、config.json 等都写在其中"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def make_manager(work_dir):
+    """
+    创建连接本地模拟服务器的 JMComicManager，测试结束时停止队列和服务器
+
+    用法: manager, server = make_manager(MockJmServer(...))
+    """
+    pytest.importorskip("jmcomic")
+    from run_benchmark import configure_jmcomic, write_option
+
+    created = []
+
+    def factory(server, max_concurrent_downloads=1):
+        import asyncio
+        from jm_manager import JMComicManager
+
+        server.start()
+        configure_jmcomic(server.address)
+        manager = JMComicManager(
+            max_concurrent_downloads,
+            option_path=write_option(str(work_dir), server.address, False),
+            domain_probe_interval=86400,
+        )
+        created.append((manager, server))
+        asyncio.run(manager.initialize())
+        return manager
+
+    yield factory
+    for manager, server in created:
+        manager.stop_running_jobs(5)
+        server.stop()
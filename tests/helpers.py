@@ -0,0 +1,23 @@
+import time
+
+from mock_server import MockJmServer
+
+from download_queue import STATUS_DONE, STATUS_FAILED
+
+
+class FewImagesServer(MockJmServer):
+    """第一话只有一张图片，会被默认配置的 skip_photo_with_few_images 插件跳过"""
+
+    def photo_data(self, photo_id, album_id):
+        data = super().photo_data(photo_id, album_id)
+        if photo_id - album_id == 1:
+            data["images"] = data["images"][:1]
+        return data
+
+
+def wait_status(job, statuses=(STATUS_DONE, STATUS_FAILED), timeout=30):
+    """等待任务进入指定状态之一"""
+    deadline = time.monotonic() + timeout
+    while job.status not in statuses:
+        assert time.monotonic() < deadline, f"任务未在 {timeout} 秒内结束: {job.status}"
+        time.sleep(0.02)
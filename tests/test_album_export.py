@@ -0,0 +1,110 @@
+import re
+
+from PIL import Image
+
+import album_export
+from album_export import PdfStreamWriter, PngStreamWriter, StreamingLongImgPlugin, plan_segments, write_long_image, write_pdf
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]
+
+
+def make_images(directory, sizes, image_format="PNG"):
+    paths = []
+    for index, (size, color) in enumerate(zip(sizes, COLORS)):
+        path = str(directory / f"{index:05}.{image_format.lower()}")
+        Image.new("RGB", size, color).save(path, image_format)
+        paths.append(path)
+    return paths
+
+
+def test_png_stream_writer_output(tmp_path):
+    path = str(tmp_path / "long.png")
+    writer = PngStreamWriter(path, 20, 30)
+    for color in COLORS:
+        writer.write_image(Image.new("RGB", (20, 10), color))
+    writer.close()
+
+    with Image.open(path) as img:
+        img.load()
+        assert img.size == (20, 30)
+        assert [img.getpixel((10, y)) for y in (5, 15, 25)] == COLORS
+
+
+def test_write_long_image_scales_to_narrowest(tmp_path):
+    paths = make_images(tmp_path, [(40, 20), (20, 10), (20, 10)])
+    output = str(tmp_path / "out.png")
+
+    assert write_long_image(paths, output, max_height=0) == [output]
+    with Image.open(output) as img:
+        assert img.size == (20, 30)
+        assert img.getpixel((10, 25)) == COLORS[2]
+
+
+def test_write_long_image_segments(tmp_path):
+    paths = make_images(tmp_path, [(20, 10)] * 3)
+    output = str(tmp_path / "out.png")
+
+    assert plan_segments([10, 10, 10], 20) == [(0, 2, 20), (2, 3, 10)]
+    written = write_long_image(paths, output, max_height=20)
+    assert written == [str(tmp_path / "out_1.png"), str(tmp_path / "out_2.png")]
+    with Image.open(written[1]) as img:
+        assert img.size == (20, 10)
+
+
+def check_pdf_structure(path, pages):
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data.startswith(b"%PDF-1.4")
+    assert data.rstrip().endswith(b"%%EOF")
+    xref_offset = int(re.search(rb"startxref\n(\d+)\n", data).group(1))
+    assert data[xref_offset:].startswith(b"xref\n")
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[xref_offset:]).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n ", data[xref_offset:])
+    assert len(entries) == count - 1
+    for obj_id, offset in enumerate(entries, 1):
+        assert data[int(offset):].startswith(f"{obj_id} 0 obj".encode())
+    assert f"/Count {pages}".encode() in data
+
+
+def test_pdf_stream_writer_output(tmp_path):
+    paths = make_images(tmp_path, [(20, 10), (30, 15)]) + make_images(tmp_path, [(20, 10)], "JPEG")
+    path = str(tmp_path / "out.pdf")
+
+    assert write_pdf(paths, path) == paths
+    check_pdf_structure(path, 3)
+
+
+def test_pdf_stream_writer_empty(tmp_path):
+    path = str(tmp_path / "empty.pdf")
+    PdfStreamWriter(path).close()
+    check_pdf_structure(path, 0)
+
+
+class FakeDetail:
+    def alias_cn(self):
+        return "本子"
+
+    def __str__(self):
+        return "JM1"
+
+
+class FakeDownloader:
+    def __init__(self):
+        self.exported = []
+
+    def record_export_filepath(self, detail, filepath):
+        self.exported.append(filepath)
+
+
+def test_long_img_plugin_records_segments(tmp_path, monkeypatch):
+    paths = make_images(tmp_path, [(20, 10)] * 3)
+    output = str(tmp_path / "album.png")
+    monkeypatch.setattr(album_export, "collect_album_images", lambda option, album, photo: paths)
+    plugin = StreamingLongImgPlugin(None)
+    plugin.log_enable = False
+    monkeypatch.setattr(plugin, "decide_filepath", lambda *args: output)
+    downloader = FakeDownloader()
+
+    plugin.invoke(album=FakeDetail(), downloader=downloader, max_height=20)
+
+    assert downloader.exported == [str(tmp_path / "album_1.png"), str(tmp_path / "album_2.png")]
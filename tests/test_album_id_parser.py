@@ -0,0 +1,26 @@
+from album_id_parser import extract_album_ids, parse_album_id
+
+
+def test_extract_mixed_formats_in_order():
+    text = (
+        "https://18comic.vip/album/350234/title\n"
+        "JM123456, jm654321；777\n"
+        "https://jmcomic.me/photo/888888.html\n"
+    )
+    assert extract_album_ids(text) == ["350234", "123456", "654321", "777", "888888"]
+
+
+def test_extract_deduplicates_unless_asked():
+    text = "350234\nhttps://18comic.vip/album/350234/\nJM350234"
+    assert extract_album_ids(text) == ["350234"]
+    assert extract_album_ids(text, unique=False) == ["350234"] * 3
+
+
+def test_extract_ignores_numbers_inside_words():
+    assert extract_album_ids("abc123 第3话 v2.0") == []
+
+
+def test_parse_single_input():
+    assert parse_album_id(" 350234 ") == "350234"
+    assert parse_album_id("https://18comic.vip/album/350234/") == "350234"
+    assert parse_album_id("no id here") is None
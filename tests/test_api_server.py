@@ -0,0 +1,146 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from api_server import ApiServer, MAX_BODY_SIZE
+from download_queue import DownloadQueue, MODE_SYNC, STATUS_CANCELLED, STATUS_PAUSED, STATUS_PENDING
+from metrics import AppMetrics
+
+
+class FakeLibrary:
+    def __init__(self):
+        self.searches = []
+
+    def search(self, query, **kwargs):
+        self.searches.append((query, kwargs))
+        return [{"album_id": "1", "name": query}]
+
+    def get_album(self, album_id):
+        return {"album_id": album_id} if album_id == "1" else None
+
+    def list_files(self, album_id):
+        return ["a.jpg"]
+
+
+class FakeManager:
+    def __init__(self, queue_path):
+        self.queue = DownloadQueue(lambda job: None, queue_path)
+        self.library = FakeLibrary()
+        self.metrics = AppMetrics()
+
+    def batch_enqueue(self, album_ids):
+        return {"added": self.queue.enqueue_many([album_id for album_id in album_ids if album_id != "1"])}
+
+    def get_library(self):
+        return self.library
+
+
+@pytest.fixture
+def server(tmp_path):
+    return ApiServer(FakeManager(str(tmp_path / "queue.json")), port=0, token="secret")
+
+
+def post(server, path, data):
+    return server.route("POST", path, json.dumps(data).encode("utf-8"))
+
+
+def test_submit_and_list_jobs(server):
+    status, payload = post(server, "/jobs", {"ids": ["350234", "https://18comic.vip/album/1/"], "text": "JM350234"})
+    assert status == HTTPStatus.ACCEPTED
+    assert [job["album_id"] for job in payload["jobs"]] == ["350234", "1"]
+    assert all("progress" in job for job in payload["jobs"])
+
+    status, payload = post(server, "/jobs", {"ids": ["1", "2"], "skip_downloaded": True})
+    assert [job["album_id"] for job in payload["jobs"]] == ["2"]
+
+    status, payload = post(server, "/jobs", {"ids": ["3"], "mode": MODE_SYNC})
+    assert payload["jobs"][0]["mode"] == MODE_SYNC
+
+    status, payload = server.route("GET", "/jobs", b"")
+    assert status == HTTPStatus.OK
+    assert [job["album_id"] for job in payload["jobs"]] == ["350234", "1", "2", "3"]
+
+
+def test_submit_rejects_bad_requests(server):
+    with pytest.raises(ValueError):
+        post(server, "/jobs", {"ids": ["no id"]})
+    with pytest.raises(ValueError):
+        post(server, "/jobs", {"ids": ["1"], "mode": "unknown"})
+    with pytest.raises(ValueError):
+        post(server, "/jobs", ["1"])
+
+
+def test_job_actions(server):
+    job = server.manager.queue.enqueue("1")
+
+    assert server.route("GET", f"/jobs/{job.job_id}", b"")[1]["album_id"] == "1"
+    assert server.route("POST", f"/jobs/{job.job_id}/pause", b"")[1]["status"] == STATUS_PAUSED
+    assert server.route("POST", f"/jobs/{job.job_id}/pause", b"")[0] == HTTPStatus.CONFLICT
+    assert server.route("POST", f"/jobs/{job.job_id}/resume", b"")[1]["status"] == STATUS_PENDING
+    assert server.route("DELETE", f"/jobs/{job.job_id}", b"")[1]["status"] == STATUS_CANCELLED
+    assert server.route("DELETE", f"/jobs/{job.job_id}", b"")[0] == HTTPStatus.CONFLICT
+    assert server.route("GET", "/jobs/missing", b"")[0] == HTTPStatus.NOT_FOUND
+    assert server.route("GET", f"/jobs/{job.job_id}/trace", b"")[0] == HTTPStatus.NOT_FOUND
+    assert server.route("GET", "/stats", b"")[1][STATUS_CANCELLED] == 1
+
+
+def test_library_routes(server):
+    status, payload = server.route("GET", "/library", b"", {"q": ["关键词"], "downloaded": ["1"], "limit": ["5"]})
+    assert status == HTTPStatus.OK and payload["albums"][0]["name"] == "关键词"
+    assert server.manager.library.searches[0][1]["downloaded"] is True
+    assert server.manager.library.searches[0][1]["limit"] == 5
+
+    assert server.route("GET", "/library/1", b"")[1]["files"] == ["a.jpg"]
+    assert server.route("GET", "/library/2", b"")[0] == HTTPStatus.NOT_FOUND
+    with pytest.raises(ValueError):
+        server.route("GET", "/library/abc", b"")
+
+
+def test_unknown_routes(server):
+    assert server.route("GET", "/nothing", b"")[0] == HTTPStatus.NOT_FOUND
+    assert server.route("PUT", "/jobs", b"")[0] == HTTPStatus.METHOD_NOT_ALLOWED
+
+
+async def request(server, data):
+    host, port = server.server.sockets[0].getsockname()[:2]
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), body
+
+
+def test_http_token_and_body_size(server):
+    async def main():
+        await server.start()
+        try:
+            unauthorized = await request(server, b"GET /jobs HTTP/1.1\r\n\r\n")
+            too_large = await request(
+                server,
+                f"POST /jobs HTTP/1.1\r\nAuthorization: Bearer secret\r\nContent-Length: {MAX_BODY_SIZE + 1}\r\n\r\n"
+                .encode("latin-1"),
+            )
+            body = b'{"ids": ["42"]}'
+            accepted = await request(
+                server,
+                b"POST /jobs HTTP/1.1\r\nAuthorization: Bearer secret\r\nContent-Length: "
+                + str(len(body)).encode() + b"\r\n\r\n" + body,
+            )
+            invalid = await request(
+                server, b"POST /jobs HTTP/1.1\r\nAuthorization: Bearer secret\r\nContent-Length: 3\r\n\r\n{x}",
+            )
+            return unauthorized, too_large, accepted, invalid
+        finally:
+            server.server.close()
+            await server.server.wait_closed()
+
+    unauthorized, too_large, accepted, invalid = asyncio.run(main())
+    assert unauthorized[0] == HTTPStatus.UNAUTHORIZED
+    assert too_large[0] == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert accepted[0] == HTTPStatus.ACCEPTED
+    assert json.loads(accepted[1])["jobs"][0]["album_id"] == "42"
+    assert invalid[0] == HTTPStatus.BAD_REQUEST
@@ -0,0 +1,21 @@
+import pytest
+
+import cli
+
+
+def test_download_fails_fast_on_bad_option(work_dir, capsys):
+    pytest.importorskip("jmcomic")
+    option_path = work_dir / "option.yml"
+    option_path.write_text("client: [unclosed\n", encoding="utf-8")
+
+    assert cli.main(["--option", str(option_path), "download", "350234"]) == 2
+    assert "初始化失败" in capsys.readouterr().out
+
+
+def test_serve_fails_fast_on_bad_option(work_dir, capsys):
+    pytest.importorskip("jmcomic")
+    option_path = work_dir / "option.yml"
+    option_path.write_text("client: [unclosed\n", encoding="utf-8")
+
+    assert cli.main(["--option", str(option_path), "serve", "--no-api"]) == 2
+    assert "初始化失败" in capsys.readouterr().out
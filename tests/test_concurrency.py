@@ -0,0 +1,52 @@
+import pytest
+
+from concurrency import DECREASE_FACTOR, AdaptiveLimit
+
+
+def fill_window(limit, latency, errors=0, saturated=True):
+    """记录一个窗口的样本，saturated 为True时模拟并发已用满"""
+    if saturated:
+        limit.saturated = True
+    count = max(limit.window, limit.current)
+    for index in range(count):
+        limit.record(latency, error=index < errors)
+
+
+def test_increase_when_saturated():
+    limit = AdaptiveLimit(initial=4, minimum=1, maximum=6, window=10)
+    fill_window(limit, 0.1)
+    assert limit.current == 5
+    fill_window(limit, 0.1)
+    fill_window(limit, 0.1)
+    assert limit.current == 6
+
+
+def test_no_increase_when_not_saturated():
+    limit = AdaptiveLimit(initial=4, window=10)
+    fill_window(limit, 0.1, saturated=False)
+    assert limit.current == 4
+
+
+def test_decrease_on_latency_rise():
+    limit = AdaptiveLimit(initial=10, minimum=2, window=10)
+    fill_window(limit, 0.1)
+    assert limit.limit == 11
+    fill_window(limit, 0.2)
+    assert limit.limit == pytest.approx(11 * DECREASE_FACTOR)
+
+
+def test_decrease_on_errors_down_to_minimum():
+    limit = AdaptiveLimit(initial=4, minimum=2, window=10)
+    for _ in range(5):
+        fill_window(limit, 0.1, errors=3)
+    assert limit.current == 2
+
+
+def test_baseline_drifts_towards_current_latency():
+    limit = AdaptiveLimit(initial=4, maximum=4, window=10)
+    fill_window(limit, 0.1)
+    for _ in range(60):
+        fill_window(limit, 0.14)
+    # 持续稍高的延迟不会一直判定为拥塞
+    assert limit.baseline == pytest.approx(0.14)
+    assert limit.current == 4
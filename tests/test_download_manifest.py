@@ -0,0 +1,63 @@
+import os
+
+from download_manifest import AlbumManifest
+
+
+def write_image(directory, name, content=b"image"):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_album_completed_after_all_photos(tmp_path):
+    manifest = AlbumManifest("100", str(tmp_path / "manifest"))
+    for photo_id in ("101", "102"):
+        for index in range(2):
+            path = write_image(str(tmp_path), f"{photo_id}_{index}.jpg")
+            manifest.record_image(photo_id, f"{index}.jpg", path)
+        manifest.record_photo(photo_id, 2)
+
+    manifest.record_album(["101", "102"])
+
+    assert manifest.completed
+    assert manifest.is_photo_complete("101")
+    assert AlbumManifest("100", str(tmp_path / "manifest")).completed
+
+
+def test_photo_incomplete_when_images_missing(tmp_path):
+    manifest = AlbumManifest("100", str(tmp_path / "manifest"))
+    path = write_image(str(tmp_path), "1.jpg")
+    manifest.record_image("101", "1.jpg", path)
+    manifest.record_photo("101", 2)
+    manifest.record_album(["101"])
+
+    assert not manifest.is_photo_complete("101")
+    assert not manifest.completed
+
+
+def test_image_incomplete_after_file_changed(tmp_path):
+    manifest = AlbumManifest("100", str(tmp_path / "manifest"))
+    path = write_image(str(tmp_path), "1.jpg")
+    manifest.record_image("101", "1.jpg", path)
+    manifest.record_photo("101", 1)
+    assert manifest.is_image_complete("101", "1.jpg")
+
+    write_image(str(tmp_path), "1.jpg", b"im")
+
+    assert not manifest.is_image_complete("101", "1.jpg")
+    assert not manifest.is_photo_complete("101")
+
+
+def test_skipped_photo_counts_as_complete(tmp_path):
+    manifest = AlbumManifest("100", str(tmp_path / "manifest"))
+    path = write_image(str(tmp_path), "1.jpg")
+    manifest.record_image("101", "1.jpg", path)
+    manifest.record_photo("101", 1)
+    manifest.record_skipped_photo("102")
+
+    manifest.record_album(["101", "102"])
+
+    assert manifest.is_photo_skipped("102")
+    assert manifest.is_photo_complete("102")
+    assert manifest.completed
@@ -0,0 +1,104 @@
+import json
+import threading
+
+from helpers import wait_status
+
+from download_queue import (
+    DownloadJob, DownloadQueue, STATUS_CANCELLED, STATUS_DONE, STATUS_FAILED, STATUS_PAUSED, STATUS_PENDING,
+    STATUS_RUNNING,
+)
+
+
+class BlockingHandler:
+    """运行到 release 被设置为止，期间像下载线程一样检查暂停、取消信号"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, job):
+        self.calls.append(job.album_id)
+        if job.album_id == "bad":
+            raise Exception("下载失败")
+        while not self.release.is_set():
+            job.control.sleep(0.01)
+
+
+def make_queue(tmp_path, handler, max_workers=1):
+    queue = DownloadQueue(handler, str(tmp_path / "queue.json"), max_workers)
+    events = []
+    queue.add_listener(lambda event, job: events.append((event, job.status)))
+    return queue, events
+
+
+def test_pause_resume_cancel_pending(tmp_path):
+    queue, events = make_queue(tmp_path, BlockingHandler())
+    job = queue.enqueue("1")
+
+    assert queue.pause(job.job_id)
+    assert job.status == STATUS_PAUSED
+    assert not queue.pause(job.job_id)
+    assert queue.resume(job.job_id)
+    assert job.status == STATUS_PENDING
+    assert not queue.resume(job.job_id)
+    assert queue.pause(job.job_id)
+    assert queue.cancel(job.job_id)
+    assert job.status == STATUS_CANCELLED
+    assert not queue.cancel(job.job_id)
+    assert [event for event, _ in events] == ["added", "paused", "resumed", "paused", "cancelled"]
+
+
+def test_pause_and_resume_running_job(tmp_path):
+    handler = BlockingHandler()
+    queue, events = make_queue(tmp_path, handler)
+    job = queue.enqueue("1")
+    queue.start()
+    wait_status(job, (STATUS_RUNNING,))
+
+    assert queue.pause(job.job_id)
+    wait_status(job, (STATUS_PAUSED,))
+    assert ("finished", STATUS_PAUSED) in events
+    # 再次入队同一本子时恢复原任务
+    assert queue.enqueue("1") is job
+    wait_status(job, (STATUS_RUNNING,))
+    handler.release.set()
+    wait_status(job, (STATUS_DONE,))
+    assert handler.calls == ["1", "1"]
+    assert not queue.cancel(job.job_id)
+    queue.halt()
+
+
+def test_cancel_running_job_and_failure(tmp_path):
+    handler = BlockingHandler()
+    queue, _ = make_queue(tmp_path, handler)
+    job, bad = queue.enqueue_many(["1", "bad"])
+    queue.start()
+    wait_status(job, (STATUS_RUNNING,))
+
+    assert queue.cancel(job.job_id)
+    wait_status(job, (STATUS_CANCELLED,))
+    wait_status(bad, (STATUS_FAILED,))
+    assert bad.error == "下载失败"
+    assert not queue.resume(job.job_id)
+    queue.halt()
+
+
+def test_queue_persistence_without_progress(tmp_path):
+    queue, _ = make_queue(tmp_path, BlockingHandler())
+    job, paused = queue.enqueue_many(["1", "2"])
+    queue.pause(paused.job_id)
+    job.status = STATUS_RUNNING
+    queue.report_progress(job, {"fraction": 0.5})
+    queue.update_job(job)
+
+    with open(tmp_path / "queue.json", encoding="utf-8") as f:
+        saved = json.load(f)["jobs"]
+    assert all("progress" not in item for item in saved)
+    assert job.to_dict(include_progress=True)["progress"] == {"fraction": 0.5}
+
+    loaded = {item.album_id: item for item in make_queue(tmp_path, BlockingHandler())[0].list_jobs()}
+    # 上次退出时运行中的任务重新等待
+    assert loaded["1"].status == STATUS_PENDING
+    assert loaded["2"].status == STATUS_PAUSED
+    assert loaded["1"].progress is None
+    assert DownloadJob.from_dict(job.to_dict()).to_dict() == job.to_dict()
@@ -0,0 +1,82 @@
+import io
+import os
+
+from helpers import FewImagesServer, wait_status
+from jmcomic import JmImageTool
+from mock_server import MockJmServer
+from PIL import Image
+
+from download_queue import STATUS_DONE, STATUS_FAILED, STATUS_PAUSED
+from job_control import current_control
+
+
+def test_album_completed_with_skipped_photo(make_manager):
+    server = FewImagesServer(albums=1, photos_per_album=3, images_per_photo=4, image_size=(40, 60))
+    manager = make_manager(server)
+    album_id = server.album_ids()[0]
+
+    job = manager.queue.enqueue(album_id)
+    wait_status(job)
+
+    assert job.status == STATUS_DONE, job.error
+    manifest = manager.get_album_manifest(album_id)
+    assert manifest.is_photo_skipped(str(int(album_id) + 1))
+    assert manifest.completed
+
+
+def test_pause_mid_image_leaves_no_partial_file(make_manager, monkeypatch):
+    server = MockJmServer(albums=1, photos_per_album=2, images_per_photo=6, image_size=(40, 60))
+    manager = make_manager(server)
+    album_id = server.album_ids()[0]
+    saved = []
+    original_save = JmImageTool.save_image.__func__
+
+    def save_image(cls, image, filepath):
+        if len(saved) == 4:
+            # 第5张图片只写入一半时任务被暂停
+            buffer = io.BytesIO()
+            image.save(buffer, format=os.path.splitext(filepath)[1][1:].replace("jpg", "jpeg"))
+            with open(filepath, "wb") as f:
+                f.write(buffer.getvalue()[:buffer.tell() // 2])
+            saved.append(filepath)
+            manager.queue.pause(job.job_id)
+            current_control().check()
+        original_save(cls, image, filepath)
+        saved.append(filepath)
+
+    monkeypatch.setattr(JmImageTool, "save_image", classmethod(save_image))
+    job = manager.queue.enqueue(album_id)
+    wait_status(job, (STATUS_PAUSED, STATUS_DONE, STATUS_FAILED))
+    assert job.status == STATUS_PAUSED, job.error
+
+    files = image_files(manager, album_id)
+    assert saved[4] not in files
+    assert files and all(is_valid_image(path) for path in files)
+    completed = {path: os.stat(path).st_mtime_ns for path in files}
+
+    monkeypatch.undo()
+    assert manager.queue.resume(job.job_id)
+    wait_status(job)
+    assert job.status == STATUS_DONE, job.error
+    files = image_files(manager, album_id)
+    assert len(files) == 12 and all(is_valid_image(path) for path in files)
+    # 暂停前已完成的图片没有重新下载
+    assert {path: os.stat(path).st_mtime_ns for path in completed} == completed
+
+
+def image_files(manager, album_id):
+    files = []
+    for photo in manager.get_album_detail(album_id):
+        photo_dir = manager.option.decide_image_save_dir(photo, ensure_exists=False)
+        if os.path.isdir(photo_dir):
+            files += [os.path.join(photo_dir, name) for name in sorted(os.listdir(photo_dir))]
+    return files
+
+
+def is_valid_image(path):
+    try:
+        with Image.open(path) as img:
+            img.load()
+        return True
+    except OSError:
+        return False
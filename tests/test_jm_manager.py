@@ -0,0 +1,73 @@
+import os
+
+from helpers import FewImagesServer, wait_status
+
+from download_queue import STATUS_DONE
+
+
+def test_batch_enqueue_skips_album_with_skipped_photo(make_manager):
+    server = FewImagesServer(albums=2, photos_per_album=3, images_per_photo=4, image_size=(40, 60))
+    manager = make_manager(server)
+    downloaded_id, new_id = server.album_ids()
+    job = manager.queue.enqueue(downloaded_id)
+    wait_status(job)
+    assert job.status == STATUS_DONE, job.error
+    # 移除已完成的任务，只能依据下载清单判断
+    manager.queue.clear_finished()
+    manager.queue.halt()
+
+    assert manager.downloaded_album_ids([downloaded_id, new_id]) == {downloaded_id}
+    result = manager.batch_enqueue([downloaded_id, new_id, new_id])
+    assert [job.album_id for job in result["added"]] == [new_id]
+    assert result["downloaded"] == 1
+    assert result["duplicate"] == 1
+    assert result["queued"] == 0
+
+
+def test_sync_does_not_report_skipped_photo(make_manager):
+    server = FewImagesServer(albums=1, photos_per_album=3, images_per_photo=4, image_size=(40, 60))
+    manager = make_manager(server)
+    album_id = server.album_ids()[0]
+    job = manager.queue.enqueue(album_id)
+    wait_status(job)
+    assert job.status == STATUS_DONE, job.error
+    album = manager.get_album_detail(album_id)
+
+    assert manager.find_missing_photos(album) == []
+    assert manager.sync_album(album_id, album) == ([], None)
+
+
+def test_sync_records_skipped_photo_of_old_download(make_manager):
+    server = FewImagesServer(albums=1, photos_per_album=3, images_per_photo=4, image_size=(40, 60))
+    manager = make_manager(server)
+    album_id = server.album_ids()[0]
+    job = manager.queue.enqueue(album_id)
+    wait_status(job)
+    assert job.status == STATUS_DONE, job.error
+    # 模拟没有下载清单的旧版本下载：被跳过的第一话既没有目录也没有记录
+    os.remove(manager.get_album_manifest(album_id).manifest_path)
+    album = manager.get_album_detail(album_id)
+    skipped_id = str(int(album_id) + 1)
+    assert manager.find_missing_photos(album) == [skipped_id]
+
+    assert manager.sync_album(album_id, album)[0] == []
+    assert manager.find_missing_photos(album) == []
+
+
+def test_cover_prefetch_is_limited_and_bounded(work_dir, monkeypatch):
+    import jm_manager
+
+    monkeypatch.setattr(jm_manager, "COVER_PREFETCHED_LIMIT", 4)
+    manager = jm_manager.JMComicManager(prefetch_covers=True, prefetch_cover_count=2)
+    manager.setup_components()
+    manager.initialized = True
+    prefetched = []
+    monkeypatch.setattr(manager.cover_cache, "prefetch", prefetched.extend)
+
+    jobs = manager.queue.enqueue_many([str(album_id) for album_id in range(1, 11)])
+    assert prefetched == ["1", "2"]
+
+    for job in jobs[:8]:
+        manager.queue.cancel(job.job_id)
+    assert prefetched == [str(album_id) for album_id in range(1, 11)]
+    assert list(manager.cover_prefetched) == ["7", "8", "9", "10"]
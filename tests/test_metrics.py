@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from metrics import AppMetrics, MetricsRegistry
+
+
+def test_registry_render_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "计数", ("status",))
+    histogram = registry.histogram("demo_seconds", "耗时", buckets=(0.1, 1))
+    counter.inc("ok")
+    counter.inc("ok", amount=2)
+    histogram.observe(0.5)
+
+    lines = registry.render().splitlines()
+
+    assert 'demo_total{status="ok"} 3' in lines
+    assert 'demo_seconds_bucket{le="0.1"} 0' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 1' in lines
+    assert "demo_seconds_count 1" in lines
+
+
+def test_render_errors_go_to_log():
+    logs = []
+    metrics = AppMetrics(log=logs.append)
+    metrics.queue_jobs.set_function(lambda: 1 / 0)
+
+    text = metrics.render()
+
+    assert "jmcrawler_queue_jobs" not in text
+    assert "jmcrawler_images_total" in text
+    assert len(logs) == 1 and "jmcrawler_queue_jobs" in logs[0]
+
+
+def test_trace_save_errors_go_to_log(tmp_path):
+    logs = []
+    # trace_dir 是一个文件，无法在其中保存追踪记录
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    metrics = AppMetrics(trace_dir=str(blocker), log=logs.append)
+    trace = metrics.start_trace(SimpleNamespace(job_id="job", album_id="1"))
+
+    metrics.finish_trace(trace)
+
+    assert len(logs) == 1 and logs[0].startswith("保存任务追踪失败")
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from rate_limiter import LimitState, RateLimiter, TokenBucket
+
+
+def test_token_bucket_burst_then_wait():
+    bucket = TokenBucket(10, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    # 透支的令牌由之后的请求补足
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_priority_does_not_queue_behind_overdraft():
+    bucket = TokenBucket(10, burst=1)
+    bucket.reserve(5)
+    assert bucket.reserve(1) == pytest.approx(0.5, abs=0.01)
+    assert bucket.reserve(1, priority=True) == pytest.approx(0.1, abs=0.01)
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(100, burst=1)
+    bucket.reserve()
+    time.sleep(0.05)
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_drain_and_set_rate():
+    bucket = TokenBucket(10, burst=5)
+    bucket.drain()
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    bucket.set_rate(1)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_slow_down_without_limit_uses_observed_rate():
+    state = LimitState()
+    for _ in range(20):
+        assert state.reserve() == 0.0
+
+    state.slow_down()
+
+    assert state.requests is not None
+    assert state.requests.rate == pytest.approx(state.temporary_rate * 0.5)
+    assert state.reserve() > 0
+
+    for _ in range(20):
+        state.succeeded()
+    assert state.factor == 1.0
+    assert state.requests is None
+
+
+def test_slow_down_with_limit_scales_configured_rate():
+    state = LimitState(requests_per_second=8)
+    state.slow_down()
+    assert state.requests.rate == pytest.approx(4)
+    state.succeeded()
+    assert state.requests.rate == pytest.approx(8 * 0.55)
+
+
+def test_429_slows_down_global_rate():
+    logs = []
+    limiter = RateLimiter(log=logs.append)
+    limiter.before_request("a.example")
+    limiter.after_response("a.example", 429, retry_after="1")
+
+    assert limiter.global_state.requests is not None
+    assert limiter.domain_state("a.example").backoff_until > time.monotonic()
+    assert limiter.domain_state("b.example").backoff_until == 0.0
+    assert len(logs) == 1
+
+    limiter.after_response("a.example", 503)
+    assert len(logs) == 1
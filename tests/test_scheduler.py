@@ -0,0 +1,81 @@
+import threading
+import time
+
+from scheduler import LANE_BULK, LANE_COVER, LANE_INTERACTIVE, PrioritySemaphore, current_lane, use_lane
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def run_waiters(semaphore, lanes):
+    """名额占满时依次排队，全部排好后释放名额，返回取得名额的顺序"""
+    order = []
+    threads = []
+
+    def worker(index, lane):
+        with semaphore.slot(lane):
+            order.append(index)
+
+    for index, lane in enumerate(lanes):
+        queued = len(semaphore.waiters[lane])
+        thread = threading.Thread(target=worker, args=(index, lane))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: len(semaphore.waiters[lane]) > queued)
+    return order, threads
+
+
+def test_same_lane_in_arrival_order():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire(LANE_BULK)
+    order, threads = run_waiters(semaphore, [LANE_BULK] * 6)
+
+    semaphore.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == list(range(6))
+    assert semaphore.in_use == 0
+
+
+def test_higher_lane_first():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire(LANE_BULK)
+    lanes = [LANE_BULK, LANE_COVER, LANE_BULK, LANE_INTERACTIVE, LANE_COVER, LANE_INTERACTIVE]
+    order, threads = run_waiters(semaphore, lanes)
+
+    semaphore.release()
+    for thread in threads:
+        thread.join()
+
+    assert order == [3, 5, 1, 4, 0, 2]
+
+
+def test_reserved_slots_for_higher_lanes():
+    semaphore = PrioritySemaphore(3, reserved=1)
+    assert [semaphore.limit_for(lane) for lane in (LANE_INTERACTIVE, LANE_COVER, LANE_BULK)] == [3, 2, 1]
+    semaphore.acquire(LANE_BULK)
+    order, threads = run_waiters(semaphore, [LANE_BULK])
+    # 批量下载已用满自己的名额，封面和界面请求仍可直接取得
+    semaphore.acquire(LANE_COVER)
+    semaphore.acquire(LANE_INTERACTIVE)
+    assert semaphore.in_use == 3 and order == []
+
+    for _ in range(3):
+        semaphore.release()
+    for thread in threads:
+        thread.join()
+    assert order == [0]
+
+
+def test_use_lane_restores_previous():
+    assert current_lane() == LANE_BULK
+    with use_lane(LANE_COVER):
+        with use_lane(LANE_INTERACTIVE):
+            assert current_lane() == LANE_INTERACTIVE
+        assert current_lane() == LANE_COVER
+    assert current_lane() == LANE_BULK